@@ -0,0 +1,129 @@
+"""
+Times rendering the game board, scoreboard and winners.
+
+Before: the board was rebuilt line by line with string concatenation on every guess, turning every
+digit into emoji through an if/elif chain.
+After: googlefeud.BoardRenderer, with precomputed emoji, lines cached per session and one join.
+
+Run with `python -m benchmarks.bench_board_rendering [rounds]`
+"""
+import sys
+from timeit import timeit
+
+from googlefeud.BoardRenderer import BoardRenderer
+
+phrase = "why is my cat"
+suggestions = {
+    suggestion: {"solved": i % 2 == 0, "score": 1000 - i * 100, "solvedBy": str(i % 3)}
+    for i, suggestion in enumerate(
+        [
+            "sneezing",
+            "throwing up",
+            "meowing so much",
+            "drooling",
+            "peeing everywhere",
+            "coughing",
+            "yowling",
+            "so clingy",
+        ]
+    )
+}
+scores = {str(i): {"score": 1000 + i * 100, "display_name": f"player {i}"} for i in range(3)}
+
+
+def legacyEmojiNumber(number, fill=False):
+    digits = str(number).zfill(2) if fill else str(number)
+    emoji = str()
+    for digit in digits:
+        if digit == "1":
+            emoji += ":one:"
+        elif digit == "2":
+            emoji += ":two:"
+        elif digit == "3":
+            emoji += ":three:"
+        elif digit == "4":
+            emoji += ":four:"
+        elif digit == "5":
+            emoji += ":five:"
+        elif digit == "6":
+            emoji += ":six:"
+        elif digit == "7":
+            emoji += ":seven:"
+        elif digit == "8":
+            emoji += ":eight:"
+        elif digit == "9":
+            emoji += ":nine:"
+        elif digit == "0":
+            emoji += ":zero:"
+    return emoji
+
+
+def legacyBoard(turns=3, message="\n**Great answer**"):
+    board = f"""
+>>> **Google Feud** - How does Google autocomplete this:question: Do `gf a <your-guess>`
+```css\n{phrase} ...\n```{message}
+        """
+    rank = 1
+    for key in suggestions:
+        if rank > 8:
+            break
+        if not suggestions[key]["solved"]:
+            board += (
+                "\n"
+                + legacyEmojiNumber(rank, True)
+                + "  "
+                + (":small_orange_diamond::small_blue_diamond:" * 4)
+            )
+        else:
+            solved_by_username = scores[suggestions[key]["solvedBy"]]["display_name"]
+            board += f'\n{legacyEmojiNumber(rank, True)}  **{phrase} {key}** | Solved By: *{solved_by_username}* :diamonds:{legacyEmojiNumber(suggestions[key]["score"])}'
+        rank += 1
+    if not turns == 5:
+        board += "\n\n" + f"***{turns} turns left***"
+    return board
+
+
+def legacyScoreboard():
+    ordered_scores = dict(
+        sorted(scores.items(), key=lambda score_dict: score_dict[1]["score"], reverse=True)
+    )
+    return ">>> ***Scoreboard***\n" + "\n".join(
+        [
+            f"{legacyEmojiNumber(i + 1)}  **{ordered_scores[user_id]['display_name']}**  :diamonds:{legacyEmojiNumber(ordered_scores[user_id]['score'])}"
+            for i, user_id in enumerate(ordered_scores)
+        ]
+    )
+
+
+def legacyWinners(winners):
+    label = "Winners" if len(winners) > 1 else "Winner"
+    winners = " - ".join(list(winners))
+    return f">>> **{label}** {winners}  :fireworks: :100:"
+
+
+def main(rounds):
+    renderer = BoardRenderer()
+    key = ("guild", "channel")
+    cases = [
+        (
+            "board",
+            lambda: legacyBoard(),
+            lambda: renderer.renderBoard(key, phrase, suggestions, scores, 3, "Great answer"),
+        ),
+        ("scoreboard", legacyScoreboard, lambda: renderer.renderScoreboard(scores)),
+        (
+            "winners",
+            lambda: legacyWinners(["player 2"]),
+            lambda: renderer.renderWinners(["player 2"]),
+        ),
+    ]
+    print(f"{'render':<12}{'before (us)':>14}{'after (us)':>14}")
+    for name, before, after in cases:
+        assert before() == after(), name
+        before_time = timeit(before, number=rounds) / rounds
+        after_time = timeit(after, number=rounds) / rounds
+        print(f"{name:<12}{before_time * 1e6:>14.2f}{after_time * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
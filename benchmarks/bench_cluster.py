@@ -0,0 +1,103 @@
+"""
+Shows guess throughput scaling with the number of cluster workers.
+
+Guesses from many guilds are routed to the worker that owns the guild's shard (googlefeud.Cluster),
+which keeps the guild's games in its own memory and matches and renders every guess like the bot does.
+No worker ever sees another worker's guilds, so they share nothing and need no locks.
+Throughput only scales up to the number of cores.
+
+Run with `python -m benchmarks.bench_cluster [guesses] [max workers]`
+"""
+import multiprocessing
+import os
+import random
+import sys
+from time import perf_counter
+
+from googlefeud.BoardRenderer import BoardRenderer
+from googlefeud.Cluster import workerOfGuild
+from googlefeud.GoogleFeud import buildSuggestions, meaningless_words
+from googlefeud.TokenIndex import buildTokenIndex, matchGuess
+
+SHARD_COUNT = 16
+GUILDS = 2000
+phrase = "why is my cat"
+suggestions = [
+    "sneezing",
+    "throwing up",
+    "meowing so much",
+    "drooling",
+    "peeing everywhere",
+    "coughing",
+    "yowling",
+    "so clingy",
+]
+scores = {"1": {"score": 0, "display_name": "player"}}
+guesses = ["sneezing", "clingy", "spaghetti", "drooling", "lasagna", "coughing"]
+
+
+def generateEvents(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        ((rng.randrange(GUILDS) + 1) << 22, rng.randrange(4), rng.choice(guesses))
+        for _ in range(count)
+    ]
+
+
+def runWorker(events, done):
+    sessions = {}
+    renderer = BoardRenderer(max_sessions=GUILDS * 4)
+    for guild_id, channel, guess in events:
+        key = (guild_id, channel)
+        session = sessions.get(key)
+        if session is None:
+            session = sessions[key] = {
+                "suggestions": buildSuggestions(suggestions),
+                "token_index": buildTokenIndex(suggestions, meaningless_words),
+            }
+        for suggestion in matchGuess(session["token_index"], guess, meaningless_words):
+            info = session["suggestions"][suggestion]
+            if not info["solved"]:
+                info["solved"], info["solvedBy"] = True, "1"
+                break
+        renderer.renderBoard(key, phrase, session["suggestions"], scores, 3)
+    done.put(len(events))
+
+
+def run(events, workers):
+    routed = [[] for _ in range(workers)]
+    for event in events:
+        routed[workerOfGuild(event[0], SHARD_COUNT, workers)].append(event)
+    done = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=runWorker, args=(worker_events, done))
+        for worker_events in routed
+    ]
+    start_time = perf_counter()
+    for process in processes:
+        process.start()
+    handled = sum(done.get() for _ in processes)
+    elapsed = perf_counter() - start_time
+    for process in processes:
+        process.join()
+    return handled / elapsed
+
+
+def main(count, max_workers):
+    events = generateEvents(count)
+    print(f"{count} guesses over {GUILDS} guilds and {SHARD_COUNT} shards, {os.cpu_count()} cores")
+    print(f"{'workers':<10}{'guesses/s':>12}{'speedup':>10}")
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        throughput = run(events, workers)
+        baseline = baseline or throughput
+        print(f"{workers:<10}{throughput:>12.0f}{throughput / baseline:>9.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else min(8, os.cpu_count() or 1),
+    )
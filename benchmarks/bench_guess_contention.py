@@ -0,0 +1,160 @@
+"""
+Times guesses fired at once by several players in the same channels, and checks none of them is lost.
+
+Before: every `gf a` loaded the session, applied its guess, committed and sent its own board,
+concurrently with the other guesses of the channel.
+After: the guesses of a channel go through its actor (googlefeud.ChannelActor), which plays the
+guesses that arrived together against the one game, commits once and sends one board.
+
+MongoDB and Discord are simulated with MONGO_LATENCY and SEND_LATENCY seconds per call.
+Run with `python -m benchmarks.bench_guess_contention [channels] [players] [rounds]`
+"""
+import asyncio
+import copy
+import sys
+from time import perf_counter
+from unittest.mock import Mock
+
+from googlefeud.ChannelActor import ChannelActors
+from googlefeud.GoogleFeud import GoogleFeud, buildSuggestions
+from googlefeud.GoogleFeudDB import newSession
+from googlefeud.SessionStore import SessionStore
+
+MONGO_LATENCY = 0.002
+SEND_LATENCY = 0.03
+TURNS = 100000
+suggestions = ["sneezing", "throwing up", "meowing so much", "drooling"]
+
+
+class SimulatedSessions:
+    """
+    The sessions collection, applying commitGuess the way find_one_and_update does
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def handle(self, channel):
+        sessions = self
+        gfeuddb = Mock(guild="guild", channel=channel)
+
+        async def getSession():
+            await asyncio.sleep(MONGO_LATENCY)
+            return copy.deepcopy(sessions.documents.get(channel))
+
+        async def saveSession(session):
+            await asyncio.sleep(MONGO_LATENCY)
+            sessions.documents[channel] = copy.deepcopy(session)
+
+        async def commitGuess(suggestion=None, user_id=None, display_name=None, score=0, turns=0):
+            await asyncio.sleep(MONGO_LATENCY)
+            document = sessions.documents[channel]
+            document["turns"] += turns
+            return copy.deepcopy(document)
+
+        gfeuddb.getSession = getSession
+        gfeuddb.saveSession = saveSession
+        gfeuddb.commitGuess = commitGuess
+        return gfeuddb
+
+
+class Channel:
+    def __init__(self, name, sessions):
+        self.name = name
+        self.id = name
+        self.sent = 0
+        self.gfeuddb = sessions.handle(name)
+
+    async def send(self, message):
+        await asyncio.sleep(SEND_LATENCY)
+        self.sent += 1
+
+
+def context(channel, player):
+    ctx = Mock()
+    ctx.channel = channel
+    ctx.author.id = player
+    ctx.author.display_name = f"player {player}"
+    ctx.send = channel.send
+    return ctx
+
+
+def game(ctx, store):
+    gfeud = GoogleFeud(ctx, Mock())
+    gfeud.gfeuddb = ctx.channel.gfeuddb
+    gfeud.sessionStore = store
+    return gfeud
+
+
+async def legacyGuess(ctx, store, phrase):
+    gfeud = game(ctx, store)
+    if await gfeud.loadSession():
+        await gfeud.checkPhraseInSuggestions(phrase, ctx.author)
+        await ctx.send(gfeud.getGFeudBoard())
+
+
+def actorGuesses(store):
+    async def playGuesses(guesses):
+        ctx = guesses[-1][0]
+        gfeud = game(ctx, store)
+        if await gfeud.loadSession():
+            await gfeud.checkGuesses(guesses)
+            await ctx.send(gfeud.getGFeudBoard())
+
+    actors = ChannelActors(playGuesses)
+
+    async def guess(ctx, store, phrase):
+        await actors.submit(ctx.channel.name, (ctx, phrase))
+
+    return guess
+
+
+async def run(guess, store, channel_count, players, rounds):
+    sessions = SimulatedSessions()
+    channels = [Channel(f"channel {i}", sessions) for i in range(channel_count)]
+    for channel in channels:
+        session = newSession("guild", channel.name, "why is my cat", buildSuggestions(suggestions))
+        session["turns"] = TURNS
+        sessions.documents[channel.name] = session
+
+    start_time = perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(
+            *[
+                guess(context(channel, player), store, "spaghetti")
+                for channel in channels
+                for player in range(players)
+            ]
+        )
+    await store.flush()
+    elapsed = perf_counter() - start_time
+
+    guesses = channel_count * players * rounds
+    lost = sum(
+        sessions.documents[channel.name]["turns"] - (TURNS - players * rounds)
+        for channel in channels
+    )
+    boards = sum(channel.sent for channel in channels)
+    return guesses / elapsed, lost, boards
+
+
+async def main(channels, players, rounds):
+    print(f"{channels} channels, {players} players guessing at once, {rounds} rounds")
+    print(f"{'handler':<24}{'guesses/s':>12}{'lost turns':>12}{'boards':>10}")
+    for flush_delay in [0, 0.05]:
+        for name in ["before", "after"]:
+            store = SessionStore(flush_delay=flush_delay)
+            guess = legacyGuess if name == "before" else actorGuesses(store)
+            throughput, lost, boards = await run(guess, store, channels, players, rounds)
+            label = f"{name} (flush {flush_delay}s)"
+            print(f"{label:<24}{throughput:>12.0f}{lost:>12}{boards:>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+            int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+        )
+    )
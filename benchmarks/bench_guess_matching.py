@@ -0,0 +1,57 @@
+"""
+Times matching a guess against the suggestions of a game.
+
+Before: checkPhraseInSuggestions walked every suggestion, splitting it into a list of words
+and testing the guess against that list and against the meaningless words list.
+After: one lookup in the session's token index (googlefeud.TokenIndex).
+
+Run with `python -m benchmarks.bench_guess_matching [rounds]`
+"""
+import sys
+from timeit import timeit
+
+from googlefeud.GoogleFeud import meaningless_phrases, meaningless_words
+from googlefeud.TokenIndex import buildTokenIndex, matchGuess
+
+suggestions = [
+    "sneezing",
+    "throwing up",
+    "meowing so much",
+    "drooling",
+    "peeing everywhere",
+    "coughing",
+    "yowling",
+    "so clingy",
+]
+# A hit at the front, a hit at the back and a miss that walks every suggestion
+guesses = ["sneezing", "clingy", "spaghetti"]
+
+
+def legacy_match(guess):
+    for suggestion in suggestions:
+        if guess in [word for word in suggestion.split()] and not guess in meaningless_phrases:
+            return suggestion
+    return None
+
+
+def indexed_match(index, guess):
+    matches = matchGuess(index, guess, meaningless_words)
+    return matches[0] if len(matches) > 0 else None
+
+
+def main(rounds):
+    index = buildTokenIndex(suggestions, meaningless_words)
+    for guess in guesses:
+        assert legacy_match(guess) == indexed_match(index, guess)
+
+    print(f"{'guess':<12}{'before (us)':>14}{'after (us)':>14}")
+    for guess in guesses:
+        before = timeit(lambda: legacy_match(guess), number=rounds) / rounds
+        after = timeit(lambda: indexed_match(index, guess), number=rounds) / rounds
+        print(f"{guess:<12}{before * 1e6:>14.2f}{after * 1e6:>14.2f}")
+    build = timeit(lambda: buildTokenIndex(suggestions, meaningless_words), number=rounds)
+    print(f"building the index once per game: {build / rounds * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
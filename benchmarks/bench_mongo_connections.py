@@ -0,0 +1,92 @@
+"""
+Counts the MongoDB clients and pooled connections opened while simulating guesses.
+
+Before: every guess builds its own MongoClient, like GoogleFeudDB used to.
+After: every guess borrows the database from the shared MongoConnectionManager.
+
+Requires MONGO_SERVER to point at a running MongoDB.
+Run with `python -m benchmarks.bench_mongo_connections [guesses]`
+"""
+import sys
+from time import monotonic
+
+from pymongo import MongoClient, monitoring
+
+from googlefeud.GoogleFeudDB import GoogleFeudDB
+from googlefeud.MongoConnection import MONGO_DATABASE, MONGO_SERVER, MongoConnectionManager
+
+guild = "bench-guild"
+channel = "bench-channel"
+
+
+class ConnectionCounter(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.created = 0
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def guess(gfeuddb):
+    gfeuddb.getSession()
+    gfeuddb.updateTurn()
+
+
+def run_before(guesses):
+    counter = ConnectionCounter()
+    clients = 0
+    start = monotonic()
+    for _ in range(guesses):
+        client = MongoClient(MONGO_SERVER, event_listeners=[counter])
+        clients += 1
+        guess(GoogleFeudDB(guild, channel, db=client[MONGO_DATABASE]))
+        client.close()
+    return clients, counter.created, monotonic() - start
+
+
+def run_after(guesses):
+    counter = ConnectionCounter()
+    manager = MongoConnectionManager(event_listeners=[counter])
+    start = monotonic()
+    for _ in range(guesses):
+        guess(GoogleFeudDB(guild, channel, db=manager.getDatabase()))
+    elapsed = monotonic() - start
+    manager.close()
+    return 1, counter.created, elapsed
+
+
+if __name__ == "__main__":
+    guesses = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for label, run in (("before", run_before), ("after", run_after)):
+        clients, connections, elapsed = run(guesses)
+        print(
+            f"{label:>6}: {clients} clients, {connections} connections opened, "
+            f"{elapsed:.2f}s for {guesses} guesses"
+        )
@@ -0,0 +1,89 @@
+"""
+Counts the MongoDB commands sent per guess.
+
+Before: the field-by-field writes a correct guess used to make
+(unscoped find_one, score update_one, solved update_one, solvedBy update_one).
+After: GoogleFeudDB.commitGuess, one find_one_and_update.
+
+Requires MONGO_SERVER to point at a running MongoDB.
+Run with `python -m benchmarks.bench_mongo_ops_per_guess [guesses]`
+"""
+import sys
+from collections import Counter
+from time import monotonic
+
+from pymongo import monitoring
+
+from googlefeud.GoogleFeudDB import GoogleFeudDB, newSession
+from googlefeud.MongoConnection import MongoConnectionManager
+
+guild = "bench-guild"
+channel = "bench-channel"
+user_id = "12345"
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_correct_guess(gfeuddb, suggestion):
+    sessions = gfeuddb.db.sessions
+    query = {"guild": guild, "channel": channel}
+    if sessions.find_one({f"scores.{user_id}": {"$exists": True}}):
+        sessions.update_one(query, {"$inc": {f"scores.{user_id}.score": 100}})
+    else:
+        sessions.update_one(
+            query,
+            {"$set": {f"scores.{user_id}": {"score": 100, "display_name": "bench"}}},
+        )
+    sessions.update_one(query, {"$set": {f"suggestions.{suggestion}.solved": True}})
+    sessions.update_one(query, {"$set": {f"suggestions.{suggestion}.solvedBy": user_id}})
+
+
+def commit_correct_guess(gfeuddb, suggestion):
+    gfeuddb.commitGuess(
+        suggestion=suggestion, user_id=user_id, display_name="bench", score=100
+    )
+
+
+def run(guess, guesses):
+    counter = CommandCounter()
+    manager = MongoConnectionManager(event_listeners=[counter])
+    gfeuddb = GoogleFeudDB(guild, channel, db=manager.getDatabase())
+    suggestions = {
+        f"answer{i}": {"solved": False, "score": 100, "solvedBy": ""}
+        for i in range(guesses)
+    }
+    gfeuddb.terminateSession()
+    gfeuddb.saveSession(newSession(guild, channel, "bench", suggestions))
+    counter.commands.clear()
+
+    start = monotonic()
+    for i in range(guesses):
+        guess(gfeuddb, f"answer{i}")
+    elapsed = monotonic() - start
+
+    gfeuddb.terminateSession()
+    manager.close()
+    return counter.commands, elapsed
+
+
+if __name__ == "__main__":
+    guesses = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for label, guess in (("before", legacy_correct_guess), ("after", commit_correct_guess)):
+        commands, elapsed = run(guess, guesses)
+        total = sum(commands.values())
+        print(
+            f"{label:>6}: {total / guesses:.1f} ops per guess {dict(commands)}, "
+            f"{elapsed / guesses * 1000:.2f}ms per guess"
+        )
@@ -0,0 +1,57 @@
+"""
+Measures what a span costs on the hot path, with and without the stage histogram and trace file.
+
+Run with `python -m benchmarks.bench_tracing [spans]`
+"""
+import os
+import sys
+import tempfile
+from timeit import timeit
+
+from prometheus_client import CollectorRegistry
+
+from googlefeud.AppMetrics import AppMetrics
+from googlefeud.Tracing import Tracer
+
+
+def spansPerCommand(tracer, commands):
+    for _ in range(commands):
+        trace = tracer.startTrace("a")
+        with tracer.span("load_session"):
+            with tracer.span("mongo.getSession"):
+                pass
+        with tracer.span("match"):
+            pass
+        tracer.endTrace(trace)
+
+
+def spanOutsideCommand(tracer):
+    with tracer.span("match"):
+        pass
+
+
+def main(spans):
+    commands = spans // 3
+    appMetrics = AppMetrics(registry=CollectorRegistry())
+    with tempfile.TemporaryDirectory() as directory:
+        tracers = {
+            "outside a command": None,
+            "no exporters": Tracer(trace_file=""),
+            "histogram": Tracer(appMetrics, trace_file=""),
+            "histogram and trace file": Tracer(
+                appMetrics, trace_file=os.path.join(directory, "trace.json")
+            ),
+        }
+        for name, tracer in tracers.items():
+            if tracer is None:
+                idle = Tracer(appMetrics, trace_file="")
+                seconds = timeit(lambda: spanOutsideCommand(idle), number=spans)
+            else:
+                seconds = timeit(lambda: spansPerCommand(tracer, commands), number=1)
+                seconds = seconds * spans / (commands * 3)
+                tracer.flush()
+            print(f"{name:<26}{seconds / spans * 1e6:>8.2f} us per span")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300000)
@@ -0,0 +1,417 @@
+"""
+Load test of the bot's command handlers, to measure capacity before a deploy.
+
+Commands are invoked through main.bot.invoke like on_message does, with synthetic messages from
+GUILDS x CHANNELS channels arriving at RATE commands per second. Each command goes to a random channel,
+which plays `gf start`, GUESSES `gf a` and `gf end` in turn. Arrivals, channels and guesses are drawn
+from SEED, so two runs send the same commands in the same order.
+
+MongoDB is an in-memory stand-in (benchmarks.memory_mongo) unless --mongo is given, suggestions come
+from the --providers chain, whose http provider asks a local fake suggestqueries endpoint, and Discord
+is a fake HTTP client, each answering after its configured latency.
+
+Writes a JSON report with the throughput, p50/p95/p99 latency and MongoDB calls of every command,
+to compare between commits:
+    python -m benchmarks.loadtest --guilds 1000 --rate 200 --duration 30 --output after.json
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+from collections import Counter
+from time import perf_counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from discord.ext.commands.view import StringView
+from pymongo import monitoring
+
+from benchmarks.memory_mongo import MemoryMongoClient
+from googlefeud.MongoConnection import getConnectionManager
+from googlefeud.PhraseDeck import getPhraseBank
+from googlefeud.SessionStore import getSessionStore
+from googlefeud.SuggestionClient import getSuggestionClient
+from googlefeud.SuggestionProvider import buildSuggestionProvider, setSuggestionProvider
+from googlefeud.Tracing import getTracer
+
+# The fake endpoint completes every phrase with these, and the first 8 make a game's answers
+ANSWERS = [
+    "sneezing",
+    "purring",
+    "hiding",
+    "biting",
+    "staring",
+    "shedding",
+    "scratching",
+    "yawning",
+    "limping",
+    "sleeping",
+]
+MISSES = ["spaghetti", "umbrella", "saxophone"]
+COMMANDS = ["start", "a", "end"]
+_ids = itertools.count(1)
+
+
+class FakeSuggestServer:
+    """
+    Answers GET /complete/search like suggestqueries.google.com does with output=firefox.
+    Drawn from seed, error_rate of the requests are answered with a 503 and slow_rate of them
+    take ten times the latency, to see how the suggestion client copes.
+    """
+
+    def __init__(self, latency, error_rate=0.0, slow_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.server = None
+
+    async def search(self, request):
+        self.requests += 1
+        slow = self.random.random() < self.slow_rate
+        await asyncio.sleep(self.latency * (10 if slow else 1))
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+        query = request.query["q"].lower()
+        return web.json_response([query, [query + answer for answer in ANSWERS]])
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/complete/search", self.search)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return str(self.server.make_url("/complete/search"))
+
+    async def close(self):
+        await self.server.close()
+
+
+class FakeDiscordHTTP:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = Counter()
+
+    async def call(self, name):
+        self.calls[name] += 1
+        await asyncio.sleep(self.latency)
+
+    async def send_message(self, channel_id, *, params):
+        await self.call("send")
+        return {"id": next(_ids), "content": params.payload.get("content")}
+
+
+class FakeMessage:
+    def __init__(self, state, channel, content, author=None):
+        self.id = next(_ids)
+        self._state = state
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments = []
+
+    async def edit(self, content=None, **kwargs):
+        await self._state.http.call("edit")
+        self.content = content
+        return self
+
+    async def add_reaction(self, emoji):
+        await self._state.http.call("react")
+
+
+class FakeDiscordState:
+    """
+    The parts of discord.py's connection state Messageable.send uses
+    """
+
+    allowed_mentions = None
+
+    def __init__(self, latency):
+        self.http = FakeDiscordHTTP(latency)
+
+    def create_message(self, *, channel, data):
+        return FakeMessage(self, channel, data["content"])
+
+
+class Guild:
+    def __init__(self, guild_id, shard_id):
+        self.id = guild_id
+        self.shard_id = shard_id
+
+    def __str__(self):
+        return f"guild {self.id}"
+
+
+class Channel:
+    def __init__(self, guild, channel_id):
+        self.guild = guild
+        self.id = channel_id
+
+    def __str__(self):
+        return f"channel {self.id}"
+
+
+class Player:
+    bot = False
+
+    def __init__(self, player_id):
+        self.id = player_id
+        self.display_name = f"player {player_id}"
+
+    def __str__(self):
+        return self.display_name
+
+
+class StageCounter:
+    """
+    Counts the MongoDB calls made in every command's trace and passes the stages on
+    """
+
+    def __init__(self, appMetrics):
+        self.appMetrics = appMetrics
+        self.mongo_calls = Counter()
+
+    def recordStage(self, command, stage, time):
+        if stage.startswith("mongo."):
+            self.mongo_calls[command] += 1
+        if self.appMetrics:
+            self.appMetrics.recordStage(command, stage, time)
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.ops = Counter()
+
+    def started(self, event):
+        self.ops[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def percentile(latencies, percent):
+    """
+    Nearest-rank percentile of sorted latencies
+    """
+    if len(latencies) == 0:
+        return None
+    return latencies[max(0, math.ceil(percent / 100 * len(latencies)) - 1)]
+
+
+def commitOf() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def generateCommands(options):
+    """
+    Yields (arrival time, command, channel index, guess) for every command of the run
+    """
+    rng = random.Random(options.seed)
+    steps = [0] * (options.guilds * options.channels)
+    at = rng.expovariate(options.rate)
+    while at < options.duration:
+        channel = rng.randrange(len(steps))
+        step = steps[channel]
+        steps[channel] = (step + 1) % (options.guesses + 2)
+        if step == 0:
+            yield at, "start", channel, None
+        elif step <= options.guesses:
+            yield at, "a", channel, rng.choice(ANSWERS[:8] + MISSES)
+        else:
+            yield at, "end", channel, None
+        at += rng.expovariate(options.rate)
+
+
+class LoadTest:
+    def __init__(self, main, options):
+        self.main = main
+        self.options = options
+        self.discord = FakeDiscordState(options.discord_latency)
+        shard_count = max(1, main.bot.shard_count or 1)
+        self.channels = [
+            Channel(Guild(guild_id, guild_id % shard_count), guild_id * 100 + index)
+            for guild_id in range(1, options.guilds + 1)
+            for index in range(options.channels)
+        ]
+        self.players = [Player(player_id) for player_id in range(1, options.players + 1)]
+        self.latencies = {command: [] for command in COMMANDS}
+        self.errors = Counter()
+
+    def context(self, channel, command, argument, player):
+        content = f"gf {command}" + (f" {argument}" if argument else "")
+        message = FakeMessage(self.discord, channel, content, player)
+        return self.main.GFeudContext(
+            message=message,
+            bot=self.main.bot,
+            view=StringView(argument or ""),
+            prefix="gf ",
+            invoked_with=command,
+            command=self.main.bot.get_command(command),
+        )
+
+    async def invoke(self, command, channel, argument, player):
+        ctx = self.context(channel, command, argument, player)
+        start_time = perf_counter()
+        try:
+            await self.main.bot.invoke(ctx)
+        except Exception:
+            ctx.command_failed = True
+        self.latencies[command].append(perf_counter() - start_time)
+        if ctx.command_failed:
+            self.errors[command] += 1
+
+    async def run(self) -> float:
+        rng = random.Random(self.options.seed + 1)
+        tasks = []
+        start_time = perf_counter()
+        for at, command, channel, argument in generateCommands(self.options):
+            delay = start_time + at - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            player = rng.choice(self.players)
+            tasks.append(
+                asyncio.create_task(self.invoke(command, self.channels[channel], argument, player))
+            )
+        await asyncio.gather(*tasks)
+        return perf_counter() - start_time
+
+
+async def loadTest(options) -> dict:
+    import main
+
+    manager = getConnectionManager()
+    manager.database = options.database
+    mongoCounter = None
+    if options.mongo:
+        manager.server = options.mongo
+        mongoCounter = MongoCommandCounter()
+        monitoring.register(mongoCounter)
+    else:
+        manager.setClient(MemoryMongoClient(options.mongo_latency, options.seed))
+    db = manager.getDatabase()
+    for collection in ["sessions", "searchphrases", "leaderboard"]:
+        db.drop_collection(collection)
+    db.searchphrases.insert_many(
+        [{"phrase": f"load test phrase {i}"} for i in range(options.phrases)]
+    )
+
+    suggestServer = FakeSuggestServer(
+        options.suggest_latency, options.suggest_error_rate, options.suggest_slow_rate, options.seed
+    )
+    getSuggestionClient().url = await suggestServer.start()
+    suggestionProvider = buildSuggestionProvider(options.providers.split(","), main.appMetrics)
+    setSuggestionProvider(suggestionProvider)
+    stageCounter = StageCounter(main.appMetrics)
+    getTracer().appMetrics = stageCounter
+    getPhraseBank().random.seed(options.seed)
+    await getPhraseBank().refresh(main.phraseBankDB)
+    main.gamePool.start()
+
+    ops = lambda: Counter(mongoCounter.ops if mongoCounter else db.ops)
+    setup_ops = ops()
+    test = LoadTest(main, options)
+    try:
+        elapsed = await test.run()
+        await getSessionStore().flush()
+    finally:
+        await main.gamePool.stop()
+        await getSuggestionClient().close()
+        await suggestServer.close()
+    mongo_ops = ops() - setup_ops
+
+    commands = sum(len(latencies) for latencies in test.latencies.values())
+    report = {
+        "commit": commitOf(),
+        "options": vars(options),
+        "elapsed": round(elapsed, 3),
+        "commands": commands,
+        "throughput": round(commands / elapsed, 2),
+        "per_command": {},
+        "mongo_ops": dict(mongo_ops),
+        "mongo_ops_per_command": round(sum(mongo_ops.values()) / max(1, commands), 3),
+        # Write-behind flushes and refills of the game pool, made outside any command
+        "background_mongo_calls": sum(mongo_ops.values()) - sum(stageCounter.mongo_calls.values()),
+        "suggest_requests": suggestServer.requests,
+        "suggest_errors": suggestServer.errors,
+        "suggest_client": getSuggestionClient().stats(),
+        "suggestion_providers": suggestionProvider.stats(),
+        "discord_calls": dict(test.discord.http.calls),
+    }
+    for command, latencies in test.latencies.items():
+        latencies.sort()
+        report["per_command"][command] = {
+            "count": len(latencies),
+            "errors": test.errors[command],
+            "throughput": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+            "mongo_calls_per_command": round(
+                stageCounter.mongo_calls[command] / max(1, len(latencies)), 3
+            ),
+        }
+    return report
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=2, help="channels per guild")
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="commands per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of arrivals")
+    parser.add_argument("--guesses", type=int, default=8, help="guesses per game")
+    parser.add_argument("--phrases", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo", default="", help="MongoDB URL, in memory when empty")
+    parser.add_argument("--database", default="gfeud_loadtest")
+    parser.add_argument("--mongo-latency", type=float, default=0.002)
+    parser.add_argument("--suggest-latency", type=float, default=0.1)
+    parser.add_argument("--suggest-error-rate", type=float, default=0.0, help="share of 503 answers")
+    parser.add_argument(
+        "--suggest-slow-rate", type=float, default=0.0, help="share of answers ten times slower"
+    )
+    parser.add_argument(
+        "--providers", default="cache,http", help="suggestion providers, fake to skip the endpoint"
+    )
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument("--output", default="", help="file to write the report to, stdout when empty")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parseArgs(argv)
+    with contextlib.ExitStack() as stack:
+        if not options.verbose:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        report = asyncio.run(loadTest(options))
+    output = json.dumps(report, indent=2, default=str)
+    if options.output:
+        with open(options.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
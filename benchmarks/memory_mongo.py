@@ -0,0 +1,315 @@
+"""
+In-memory stand-in for the MongoDB collections the bot uses, for load tests run without a MongoDB.
+
+Supports the queries and updates GoogleFeudDB makes: equality on dotted fields, $gt, $in and $exists,
+$set and $inc updates, upserts, find_one_and_update, sort and limit on find, and $sample aggregations.
+Every operation is counted under the name of the MongoDB command it would send, and can be slowed
+down by latency seconds to stand in for the round trip.
+"""
+import copy
+import random
+import threading
+import time
+from collections import Counter
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+MISSING = object()
+
+# Fields the real collections have a unique index on
+INDEXED_FIELDS = {
+    "sessions": ("guild", "channel"),
+    "searchphrases": ("phrase",),
+    "leaderboard": ("user_id",),
+    "suggestioncache": ("phrase",),
+}
+
+
+def getField(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def setField(document, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def matches(document, query) -> bool:
+    for path, condition in (query or {}).items():
+        value = getField(document, path)
+        if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            for op, argument in condition.items():
+                if op == "$gt":
+                    ok = value is not MISSING and value > argument
+                elif op == "$in":
+                    ok = value is not MISSING and value in argument
+                elif op == "$exists":
+                    ok = (value is not MISSING) == argument
+                else:
+                    raise NotImplementedError(f"Query operator {op}")
+                if not ok:
+                    return False
+        elif value is MISSING or value != condition:
+            return False
+    return True
+
+
+def applyUpdate(document, update):
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                setField(document, path, copy.deepcopy(value))
+            elif op == "$inc":
+                current = getField(document, path)
+                setField(document, path, (0 if current is MISSING else current) + value)
+            else:
+                raise NotImplementedError(f"Update operator {op}")
+
+
+def project(document, projection):
+    if not projection:
+        return copy.deepcopy(document)
+    projected = {"_id": document["_id"]}
+    for field, keep in projection.items():
+        if keep and field in document:
+            projected[field] = copy.deepcopy(document[field])
+    return projected
+
+
+class MemoryCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction=1):
+        self.documents.sort(key=lambda document: getField(document, key), reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        if count > 0:
+            self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def __getitem__(self, index):
+        return self.documents[index]
+
+
+class MemoryCollection:
+    """
+    Documents are looked up by the fields in indexed when a query has them all, like the
+    unique indexes of the real collections, and scanned otherwise
+    """
+
+    def __init__(self, database, indexed=()):
+        self.database = database
+        self.indexed = indexed
+        self.documents = {}
+        self.index = {}
+
+    def _op(self, command):
+        self.database.countOp(command)
+
+    def _indexKey(self, document):
+        return tuple(str(getField(document, field)) for field in self.indexed)
+
+    def _insert(self, document):
+        document.setdefault("_id", ObjectId())
+        self.documents[id(document)] = document
+        if self.indexed:
+            self.index.setdefault(self._indexKey(document), {})[id(document)] = document
+        return document
+
+    def _remove(self, document):
+        del self.documents[id(document)]
+        if self.indexed:
+            key = self._indexKey(document)
+            del self.index[key][id(document)]
+            if len(self.index[key]) == 0:
+                del self.index[key]
+
+    def _modify(self, document, update):
+        self._remove(document)
+        applyUpdate(document, update)
+        self._insert(document)
+
+    def _find(self, query):
+        query = query or {}
+        candidates = self.documents
+        if self.indexed and all(
+            field in query and not isinstance(query[field], dict) for field in self.indexed
+        ):
+            candidates = self.index.get(self._indexKey(query), {})
+        return [document for document in candidates.values() if matches(document, query)]
+
+    def _upsert(self, query, update):
+        document = {
+            path: value
+            for path, value in query.items()
+            if not (isinstance(value, dict) and any(op.startswith("$") for op in value))
+        }
+        applyUpdate(document, update)
+        return self._insert(document)
+
+    def find_one(self, query=None, projection=None):
+        self._op("find")
+        with self.database.lock:
+            found = self._find(query)
+            return project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None):
+        self._op("find")
+        with self.database.lock:
+            return MemoryCursor([project(document, projection) for document in self._find(query)])
+
+    def count_documents(self, query):
+        self._op("count")
+        with self.database.lock:
+            return len(self._find(query))
+
+    def insert_one(self, document):
+        self._op("insert")
+        document.setdefault("_id", ObjectId())
+        with self.database.lock:
+            self._insert(copy.deepcopy(document))
+        return InsertOneResult(document["_id"], True)
+
+    insert = insert_one
+
+    def insert_many(self, documents, ordered=True):
+        self._op("insert")
+        with self.database.lock:
+            for document in documents:
+                document.setdefault("_id", ObjectId())
+                self._insert(copy.deepcopy(document))
+        return InsertManyResult([document["_id"] for document in documents], True)
+
+    def replace_one(self, query, replacement, upsert=False):
+        self._op("update")
+        replacement = copy.deepcopy(replacement)
+        with self.database.lock:
+            found = self._find(query)
+            if found:
+                replacement["_id"] = found[0]["_id"]
+                self._remove(found[0])
+                self._insert(replacement)
+                return UpdateResult({"n": 1, "nModified": 1}, True)
+            if upsert:
+                document = self._insert(replacement)
+                return UpdateResult({"n": 1, "nModified": 0, "upserted": document["_id"]}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    def update_one(self, query, update, upsert=False):
+        self._op("update")
+        with self.database.lock:
+            found = self._find(query)
+            if found:
+                self._modify(found[0], update)
+                return UpdateResult({"n": 1, "nModified": 1}, True)
+            if upsert:
+                document = self._upsert(query, update)
+                return UpdateResult({"n": 1, "nModified": 0, "upserted": document["_id"]}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=ReturnDocument.BEFORE):
+        self._op("findAndModify")
+        with self.database.lock:
+            found = self._find(query)
+            if not found:
+                if not upsert:
+                    return None
+                document = self._upsert(query, update)
+                return copy.deepcopy(document) if return_document == ReturnDocument.AFTER else None
+            before = copy.deepcopy(found[0])
+            self._modify(found[0], update)
+            return copy.deepcopy(found[0]) if return_document == ReturnDocument.AFTER else before
+
+    def delete_one(self, query):
+        self._op("delete")
+        with self.database.lock:
+            found = self._find(query)[:1]
+            for document in found:
+                self._remove(document)
+            return DeleteResult({"n": len(found)}, True)
+
+    def delete_many(self, query):
+        self._op("delete")
+        with self.database.lock:
+            found = self._find(query)
+            for document in found:
+                self._remove(document)
+            return DeleteResult({"n": len(found)}, True)
+
+    def aggregate(self, pipeline):
+        self._op("aggregate")
+        with self.database.lock:
+            documents = list(self.documents.values())
+            for stage in pipeline:
+                if "$sample" not in stage:
+                    raise NotImplementedError(f"Aggregation stage {list(stage)}")
+                size = min(stage["$sample"]["size"], len(documents))
+                documents = self.database.random.sample(documents, size)
+            return MemoryCursor([copy.deepcopy(document) for document in documents])
+
+    def create_index(self, *args, **kwargs):
+        self._op("createIndexes")
+
+
+class MemoryDatabase:
+    def __init__(self, name, latency=0.0, seed=None):
+        self.name = name
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.collections = {}
+        self.ops = Counter()
+        self.lock = threading.RLock()
+
+    def countOp(self, command):
+        with self.lock:
+            self.ops[command] += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def __getitem__(self, name) -> MemoryCollection:
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = MemoryCollection(self, INDEXED_FIELDS.get(name, ()))
+            return self.collections[name]
+
+    def __getattr__(self, name) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def drop_collection(self, name):
+        with self.lock:
+            self.collections.pop(name, None)
+
+
+class MemoryMongoClient:
+    """
+    Stands in for a MongoClient, handing out in-memory databases
+    """
+
+    def __init__(self, latency=0.0, seed=None):
+        self.latency = latency
+        self.seed = seed
+        self.databases = {}
+
+    def __getitem__(self, name) -> MemoryDatabase:
+        if name not in self.databases:
+            self.databases[name] = MemoryDatabase(name, self.latency, self.seed)
+        return self.databases[name]
+
+    def close(self):
+        pass
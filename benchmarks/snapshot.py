@@ -0,0 +1,148 @@
+"""
+Lookup latency and memory footprint of a suggestion snapshot of PHRASES synthetic phrases (1M by default).
+
+Builds the snapshot in a temporary directory, opens it and looks up --lookups phrases drawn from SEED,
+then --lookups phrases that aren't in it. The same entries are then loaded from a JSON lines
+FileSuggestionStore, the persistent cache tier, for comparison. Memory is the resident set size added
+by each, split into the process's own memory and the pages of the file mapped in, which the kernel
+can drop and shares between processes. Run it in a process of its own:
+    python -m benchmarks.snapshot --phrases 1000000 --output snapshot.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+from benchmarks.loadtest import ANSWERS, commitOf, percentile
+from googlefeud.SuggestionCache import FileSuggestionStore
+from googlefeud.SuggestionSnapshot import SuggestionSnapshot, writeSnapshot
+
+
+def residentMB() -> dict:
+    """
+    Returns the anonymous and file-backed resident memory of the process in MB
+    """
+    resident = {}
+    with open("/proc/self/status") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                resident[name] = int(value.split()[0]) / 1024
+    return {"anon": resident["RssAnon"], "file": resident["RssFile"]}
+
+
+def residentSince(before) -> dict:
+    now = residentMB()
+    return {f"{kind}_mb": round(now[kind] - before[kind], 1) for kind in now}
+
+
+def generateEntries(count, seed):
+    """
+    Yields (phrase, suggestions) for count phrases with 8 suggestions each
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        yield f"synthetic phrase {i}", rng.sample(ANSWERS, 8)
+
+
+def timeLookups(get, keys) -> dict:
+    latencies = []
+    found = 0
+    for key in keys:
+        start_time = perf_counter()
+        suggestions = get(key)
+        latencies.append(perf_counter() - start_time)
+        found += suggestions is not None
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "lookups": len(keys),
+        "found": found,
+        "mean_us": round(total / len(keys) * 1e6, 2),
+        "p50_us": round(percentile(latencies, 50) * 1e6, 2),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 2),
+        "max_us": round(latencies[-1] * 1e6, 2),
+    }
+
+
+def benchmark(options) -> dict:
+    rng = random.Random(options.seed)
+    hits = [f"synthetic phrase {rng.randrange(options.phrases)}" for _ in range(options.lookups)]
+    misses = [f"missing phrase {i}" for i in range(options.lookups)]
+    directory = tempfile.mkdtemp()
+    report = {"commit": commitOf(), "options": vars(options)}
+
+    path = os.path.join(directory, "suggestions.snap")
+    start_time = perf_counter()
+    writeSnapshot(path, generateEntries(options.phrases, options.seed))
+    build_time = perf_counter() - start_time
+
+    resident = residentMB()
+    start_time = perf_counter()
+    snapshot = SuggestionSnapshot(path)
+    open_time = perf_counter() - start_time
+    opened = residentSince(resident)
+    report["snapshot"] = {
+        "build_s": round(build_time, 2),
+        "file_mb": round(os.path.getsize(path) / 2**20, 1),
+        "open_ms": round(open_time * 1000, 3),
+        "rss_after_open": opened,
+        "hits": timeLookups(snapshot.get, hits),
+        "misses": timeLookups(snapshot.get, misses),
+        "rss_after_lookups": residentSince(resident),
+    }
+    snapshot.close()
+    os.remove(path)
+
+    if options.compare:
+        path = os.path.join(directory, "suggestion_cache.jsonl")
+        with open(path, "w") as file:
+            for phrase, suggestions in generateEntries(options.phrases, options.seed):
+                entry = {"phrase": phrase, "suggestions": suggestions, "expires_at": 0}
+                file.write(json.dumps(entry) + "\n")
+        resident = residentMB()
+        start_time = perf_counter()
+        store = FileSuggestionStore(path, max_entries=options.phrases)
+        open_time = perf_counter() - start_time
+        report["jsonl_store"] = {
+            "file_mb": round(os.path.getsize(path) / 2**20, 1),
+            "open_ms": round(open_time * 1000, 3),
+            "rss_after_open": residentSince(resident),
+            "hits": timeLookups(store.get, hits),
+            "misses": timeLookups(store.get, misses),
+        }
+        os.remove(path)
+    os.rmdir(directory)
+    return report
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--phrases", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--no-compare",
+        dest="compare",
+        action="store_false",
+        help="skip loading the same entries from a JSON lines store",
+    )
+    parser.add_argument("--output", default="", help="file to write the report to, stdout when empty")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parseArgs(argv)
+    output = json.dumps(benchmark(options), indent=2)
+    if options.output:
+        with open(options.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
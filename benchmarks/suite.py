@@ -0,0 +1,263 @@
+"""
+Micro-benchmarks of the pure functions on the game's hot paths: curating suggestions, matching guesses,
+rendering the board, scoreboard and winners, with the "why is my cat" payload of the tests and
+scaled-up fixtures (long suggestion lists, scoreboards of 1000 players).
+
+Every case is timed against benchmarks/baseline.json. Timings are divided by a fixed pure-Python
+calibration loop timed in the same run, so a baseline recorded on another machine still compares.
+The run fails when a case is more than --threshold (default 0.25, i.e. 25%) slower than its baseline.
+
+Run with `python -m benchmarks.suite`, `--filter render` to run only the matching cases,
+and `--save` to record the timings as the new baseline. With `--filter`, `--save` only replaces the
+baselines of the matching cases.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+from timeit import Timer
+from unittest.mock import Mock
+
+from googlefeud.BoardRenderer import BoardRenderer
+from googlefeud.GoogleFeud import (
+    GoogleFeud,
+    buildSuggestions,
+    getEmojiNumber,
+    getWinners,
+    meaningless_words,
+    removeDuplicatesFromSuggestions,
+    trimSuggestions,
+)
+from googlefeud.TokenIndex import buildTokenIndex, matchGuess
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+REPEAT = 7
+
+phrase = "why is my cat"
+payload = [
+    "why is my cat  ",
+    [
+        "why is my cat sneezing",
+        "why is my cat throwing up",
+        "why is my cat meowing so much",
+        "why is my cat drooling",
+        "why is my cat peeing everywhere",
+        "why is my cat coughing",
+        "why is my cat peeing on my bed",
+        "why is my cat yowling",
+        "why is my cat so clingy",
+        "why is my cat licking me",
+    ],
+]
+rng = random.Random(1)
+words = ["sneezing", "throwing", "up", "meowing", "so", "much", "drooling", "peeing", "on", "my"]
+words += [f"word{i}" for i in range(200)]
+long_payload = [
+    phrase,
+    [f"{phrase} {' '.join(rng.sample(words, rng.randint(1, 4)))}" for _ in range(200)]
+    + [f"how to pet {phrase}" for _ in range(20)],
+]
+curated = removeDuplicatesFromSuggestions(trimSuggestions(phrase, payload))[0]
+suggestions = buildSuggestions(curated)
+for rank, suggestion in enumerate(suggestions):
+    if rank % 2 == 0:
+        suggestions[suggestion]["solved"] = True
+        suggestions[suggestion]["solvedBy"] = str(rank % 4)
+# Three players share the top score
+big_scores = {
+    str(player_id): {"score": rng.randrange(0, 9000, 100), "display_name": f"player {player_id}"}
+    for player_id in range(1000)
+}
+for player_id in ["10", "500", "990"]:
+    big_scores[player_id]["score"] = 10000
+small_scores = {str(rank): {"score": 1000 - rank * 100, "display_name": f"player {rank}"} for rank in range(4)}
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def game(scores):
+    gfeud = GoogleFeud(Mock(), Mock())
+    gfeud.phrase = phrase
+    gfeud.suggestions = suggestions
+    gfeud.scores = scores
+    gfeud.turns = 3
+    return gfeud
+
+
+@case("calibration")
+def calibration():
+    return lambda: sum([i * i for i in range(1000)])
+
+
+@case("trim_suggestions[10]")
+def trim():
+    return lambda: trimSuggestions(phrase, payload)
+
+
+@case("trim_suggestions[220]")
+def trimLong():
+    return lambda: trimSuggestions(phrase, long_payload)
+
+
+@case("remove_duplicates[10]")
+def removeDuplicates():
+    trimmed = trimSuggestions(phrase, payload)
+    return lambda: removeDuplicatesFromSuggestions(trimmed)
+
+
+@case("remove_duplicates[200]")
+def removeDuplicatesLong():
+    trimmed = trimSuggestions(phrase, long_payload)
+    return lambda: removeDuplicatesFromSuggestions(trimmed)
+
+
+@case("match_guess")
+def match():
+    index = buildTokenIndex(suggestions, meaningless_words)
+    guesses = ["sneezing", "clingy", "spaghetti", "the"]
+    return lambda: [matchGuess(index, guess, meaningless_words) for guess in guesses]
+
+
+@case("render_board")
+def renderBoard():
+    return game(small_scores).getGFeudBoard
+
+
+@case("render_board_cold")
+def renderBoardCold():
+    gfeud = game(small_scores)
+
+    def render():
+        gfeud.boardRenderer = BoardRenderer()
+        return gfeud.getGFeudBoard()
+
+    return render
+
+
+@case("scoreboard[4]")
+def scoreboard():
+    return game(small_scores).getScoreboard
+
+
+@case("scoreboard[1000]")
+def scoreboardBig():
+    return game(big_scores).getScoreboard
+
+
+@case("winners[1000]")
+def winners():
+    return lambda: getWinners(big_scores)
+
+
+@case("winner_response[1000]")
+def winnerResponse():
+    return game(big_scores).getWinnerResponse
+
+
+@case("emoji_number")
+def emojiNumber():
+    return lambda: [getEmojiNumber(number, fill) for number in (1, 8, 42, 1234) for fill in (False, True)]
+
+
+def timeCase(setup) -> tuple:
+    """
+    Returns the case's best timing in microseconds per call, and its best ratio to the calibration loop.
+    The two are timed in turns so each ratio compares timings made on the same, equally busy machine.
+    """
+    timers = [Timer(setup()), Timer(CASES["calibration"]())]
+    numbers = [timer.autorange()[0] for timer in timers]
+    best, ratio = float("inf"), float("inf")
+    for _ in range(REPEAT):
+        timing, calibration = [
+            timer.timeit(number) / number * 1e6 for timer, number in zip(timers, numbers)
+        ]
+        best = min(best, timing)
+        ratio = min(ratio, timing / calibration)
+    return best, ratio
+
+
+def loadBaseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def run(names, baseline, threshold):
+    """
+    Times the cases and returns their ratios to the calibration loop with the names of the ones that regressed
+    """
+    ratios = {}
+    regressions = []
+    print(f"{'case':<26}{'us':>10}{'baseline':>10}{'change':>9}")
+    for name in names:
+        timing, ratio = timeCase(CASES[name])
+        line = f"{name:<26}{timing:>10.2f}"
+        if baseline is not None and name in baseline["relative"]:
+            change = ratio / baseline["relative"][name] - 1
+            if change > threshold:
+                # Time it again before calling it a regression, a busy machine slows down single runs
+                timing, ratio = min((timing, ratio), timeCase(CASES[name]), key=lambda timed: timed[1])
+                change = ratio / baseline["relative"][name] - 1
+            expected = timing / (1 + change)
+            line = f"{name:<26}{timing:>10.2f}{expected:>10.2f}{change:>+9.0%}"
+            if change > threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        ratios[name] = ratio
+        print(line)
+    return ratios, regressions
+
+
+def save(path, ratios, merge=False):
+    """
+    Writes the ratios as the baseline. With merge, the baselines of the other cases are kept.
+    """
+    relative = {}
+    if merge:
+        relative = (loadBaseline(path) or {}).get("relative", {})
+    relative.update({name: round(ratio, 5) for name, ratio in ratios.items()})
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "relative": relative,
+    }
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2)
+        file.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--filter", default="", help="only run the cases containing this")
+    parser.add_argument("--save", action="store_true", help="record the timings as the baseline")
+    options = parser.parse_args(argv)
+
+    names = [name for name in CASES if name != "calibration" and options.filter in name]
+    baseline = None if options.save else loadBaseline(options.baseline)
+    if baseline is None and not options.save:
+        print(f"No baseline at {options.baseline}, run with --save to record one")
+    ratios, regressions = run(names, baseline, options.threshold)
+    if options.save:
+        save(options.baseline, ratios, merge=options.filter != "")
+        print(f"Saved the baseline to {options.baseline}")
+    if len(regressions) > 0:
+        print(f"{len(regressions)} cases are more than {options.threshold:.0%} slower than the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,30 +1,232 @@
-from prometheus_client import Counter, Gauge, Info, Summary
+import logging
+import os
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, Info, Summary
+from pymongo import monitoring
+
+# Also export the old series labelled with every player's username, id, guild and channel.
+# Their number grows with the players, so only turn this on while dashboards still need them.
+METRICS_LEGACY_USER_LABELS = os.getenv('METRICS_LEGACY_USER_LABELS', 'false').lower() in ['1', 'true', 'yes']
+
+# Seconds, from a Mongo op on a warm connection up to a Discord send that is being rate limited
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Circuit breaker states, in the order of their gauge values
+BREAKER_STATES = ('closed', 'half_open', 'open')
+# Discord API calls made for one game, from its first board to its winners
+API_CALLS_PER_GAME_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def shardOf(discord_ctx) -> str:
+    shard_id = getattr(getattr(discord_ctx, 'guild', None), 'shard_id', None)
+    return str(shard_id) if isinstance(shard_id, int) else '0'
+
+
+def commandOf(discord_ctx) -> str:
+    command = getattr(discord_ctx, 'command', None)
+    name = getattr(command, 'name', None)
+    return name if isinstance(name, str) else 'none'
 
 
 class AppMetrics():
-    def __init__(self) -> None:
-        labels = ['username', 'id', 'guild', 'channel']
-        self.game_start = Counter('gfeud_game_start', 'Number of times the game was started', labels)
-        self.answer_provided = Counter('gfeud_answer_provided', 'Number of times an answer was given', labels)
-        self.provided_guess_phrase = Info('gfeud_provided_guess_phrase', 'Info about the phrase that was given', labels)
-        self.guess_phrase = Summary('gfeud_guess_phrase', 'Summary about the guess phrase', labels)
-        self.exception_occurred = Info('gfeud_exception_occurred', 'Info about fatal exception', labels)
-        self.active_servers = Gauge('gfeud_active_servers', 'Gauge of active servers with the bot invited')
+    """
+    Every label takes a bounded set of values (command, outcome, shard, op), so the number of series
+    doesn't grow with the players, guilds or guesses.
+    Gauges add up the live processes of a cluster, whose workers each report their own shards.
+    """
+
+    def __init__(self, registry=REGISTRY, legacy_user_labels=METRICS_LEGACY_USER_LABELS) -> None:
+        self.legacy_user_labels = legacy_user_labels
+        self.commands = Counter('gfeud_commands', 'Number of commands handled', ['command', 'outcome', 'shard'], registry=registry)
+        self.command_latency = Histogram('gfeud_command_latency_seconds', 'Seconds taken to handle a command', ['command', 'shard'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.games_started = Counter('gfeud_games_started', 'Number of games started', ['shard'], registry=registry)
+        self.answers = Counter('gfeud_answers', 'Number of answers given', ['outcome', 'shard'], registry=registry)
+        self.exceptions = Counter('gfeud_exceptions', 'Number of fatal exceptions', ['command', 'shard'], registry=registry)
+        self.mongo_latency = Histogram('gfeud_mongo_op_latency_seconds', 'Seconds taken by a MongoDB command', ['op', 'outcome'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.suggestion_latency = Histogram('gfeud_suggestion_request_latency_seconds', 'Seconds taken by an auto-complete suggestions request', ['outcome'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.suggestion_requests_repeated = Counter('gfeud_suggestion_requests_repeated_total', 'Number of auto-complete suggestions requests sent again', ['reason'], registry=registry)
+        self.suggestion_breaker_state = Gauge('gfeud_suggestion_breaker_state', 'State of the circuit breaker of the auto-complete suggestions requests, 0 closed, 1 half open, 2 open', multiprocess_mode='livemax', registry=registry)
+        self.suggestion_provider_latency = Histogram('gfeud_suggestion_provider_latency_seconds', 'Seconds taken by a suggestion provider to answer', ['provider', 'outcome'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.discord_send_latency = Histogram('gfeud_discord_send_latency_seconds', 'Seconds taken to send a message to Discord', ['shard'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.discord_api_calls = Counter('gfeud_discord_api_calls', 'Number of Discord API calls made', ['call', 'shard'], registry=registry)
+        self.discord_api_calls_per_game = Histogram('gfeud_discord_api_calls_per_game', 'Number of Discord API calls made for a game', ['mode'], buckets=API_CALLS_PER_GAME_BUCKETS, registry=registry)
+        self.discord_rate_limited = Counter('gfeud_discord_rate_limited', 'Number of Discord API calls answered with 429 Too Many Requests', ['method'], registry=registry)
+        self.discord_rate_limit_wait = Counter('gfeud_discord_rate_limit_wait_seconds', 'Seconds spent waiting out Discord rate limits', registry=registry)
+        self.outbound_queue_depth = Gauge('gfeud_outbound_queue_depth', 'Number of Discord API calls waiting to be made', ['priority'], multiprocess_mode='livesum', registry=registry)
+        self.outbound_wait = Histogram('gfeud_outbound_wait_seconds', 'Seconds a Discord API call waited in its channel queue', ['priority'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.outbound_coalesced = Counter('gfeud_outbound_coalesced', 'Number of queued Discord API calls replaced by a newer one', registry=registry)
+        self.stage_latency = Histogram('gfeud_stage_latency_seconds', 'Seconds taken by a stage of handling a command', ['command', 'stage'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.active_servers = Gauge('gfeud_active_servers', 'Gauge of active servers with the bot invited', multiprocess_mode='livesum', registry=registry)
+        self.shard_latency = Gauge('gfeud_shard_latency_seconds', 'Heartbeat latency of a gateway shard', ['shard'], multiprocess_mode='livesum', registry=registry)
+        self.shard_guilds = Gauge('gfeud_shard_guilds', 'Number of guilds connected through a gateway shard', ['shard'], multiprocess_mode='livesum', registry=registry)
+        self.shard_connected = Gauge('gfeud_shard_connected', 'Whether a gateway shard is connected', ['shard'], multiprocess_mode='livesum', registry=registry)
+        self.shard_messages = Counter('gfeud_shard_messages', 'Number of messages received through a gateway shard', ['shard'], registry=registry)
+        self.game_pool_depth = Gauge('gfeud_game_pool_depth', 'Number of prepared games waiting in the game pool', multiprocess_mode='livesum', registry=registry)
+        self.game_pool_refill = Summary('gfeud_game_pool_refill', 'Seconds taken to prepare a game for the game pool', registry=registry)
+        self.game_pool_underflow = Counter('gfeud_game_pool_underflow', 'Number of times a game was started with an empty game pool', registry=registry)
+        self.game_pool_phrase_skipped = Counter('gfeud_game_pool_phrase_skipped', 'Number of sampled phrases skipped for having no suggestions', registry=registry)
+
+        if legacy_user_labels:
+            labels = ['username', 'id', 'guild', 'channel']
+            self.game_start = Counter('gfeud_game_start', 'Number of times the game was started', labels, registry=registry)
+            self.answer_provided = Counter('gfeud_answer_provided', 'Number of times an answer was given', labels, registry=registry)
+            self.provided_guess_phrase = Info('gfeud_provided_guess_phrase', 'Info about the phrase that was given', labels, registry=registry)
+            self.guess_phrase = Summary('gfeud_guess_phrase', 'Summary about the guess phrase', labels, registry=registry)
+            self.exception_occurred = Info('gfeud_exception_occurred', 'Info about fatal exception', labels, registry=registry)
+
+    def _userLabels(self, discord_ctx):
+        return (discord_ctx.author.name, discord_ctx.author.id, discord_ctx.guild, discord_ctx.channel)
 
     def gameStarted(self, discord_ctx):
-        self.game_start.labels(discord_ctx.author.name, discord_ctx.author.id, discord_ctx.guild, discord_ctx.channel).inc()
+        self.games_started.labels(shardOf(discord_ctx)).inc()
+        if self.legacy_user_labels:
+            self.game_start.labels(*self._userLabels(discord_ctx)).inc()
 
     def setActiveServerCount(self, server_count: int):
         self.active_servers.set(server_count)
 
-    def answerGiven(self, discord_ctx):
-        self.answer_provided.labels(discord_ctx.author.name, discord_ctx.author.id, discord_ctx.guild, discord_ctx.channel).inc()
+    def setShardLatency(self, shard_id: int, latency: float):
+        self.shard_latency.labels(str(shard_id)).set(latency)
+
+    def setShardGuildCount(self, shard_id: int, guild_count: int):
+        self.shard_guilds.labels(str(shard_id)).set(guild_count)
+
+    def setShardConnected(self, shard_id: int, connected: bool):
+        self.shard_connected.labels(str(shard_id)).set(1 if connected else 0)
+
+    def messageReceived(self, message):
+        # Direct messages have no guild and always arrive through shard 0
+        self.shard_messages.labels(shardOf(message)).inc()
+
+    def answerGiven(self, discord_ctx, outcome: str = 'correct'):
+        """
+        outcome is one of correct, already_given or miss
+        """
+        self.answers.labels(outcome, shardOf(discord_ctx)).inc()
+        if self.legacy_user_labels:
+            self.answer_provided.labels(*self._userLabels(discord_ctx)).inc()
 
     def phraseGiven(self, discord_ctx, info: dict):
-        self.provided_guess_phrase.labels(discord_ctx.author.name, discord_ctx.author.id, discord_ctx.guild, discord_ctx.channel).info(info)
+        # One series per guess, only kept for the legacy dashboards
+        if self.legacy_user_labels:
+            self.provided_guess_phrase.labels(*self._userLabels(discord_ctx)).info(info)
 
     def recordPhraseGuessTime(self, discord_ctx, time: float):
-        self.guess_phrase.labels(discord_ctx.author.name, discord_ctx.author.id, discord_ctx.guild, discord_ctx.channel).observe(time)
+        if self.legacy_user_labels:
+            self.guess_phrase.labels(*self._userLabels(discord_ctx)).observe(time)
+
+    def recordCommand(self, discord_ctx, outcome: str, time: float):
+        """
+        outcome is ok or error
+        """
+        command, shard = commandOf(discord_ctx), shardOf(discord_ctx)
+        self.commands.labels(command, outcome, shard).inc()
+        self.command_latency.labels(command, shard).observe(time)
+
+    def recordStage(self, command: str, stage: str, time: float):
+        self.stage_latency.labels(command, stage).observe(time)
+
+    def recordMongoOp(self, op: str, outcome: str, time: float):
+        self.mongo_latency.labels(op, outcome).observe(time)
+
+    def recordSuggestionRequest(self, outcome: str, time: float):
+        self.suggestion_latency.labels(outcome).observe(time)
+
+    def suggestionRequestRepeated(self, reason: str):
+        """
+        reason is hedge or retry
+        """
+        self.suggestion_requests_repeated.labels(reason).inc()
+
+    def setSuggestionBreakerState(self, state: str):
+        """
+        state is closed, half_open or open
+        """
+        self.suggestion_breaker_state.set(BREAKER_STATES.index(state))
+
+    def recordSuggestionProvider(self, provider: str, outcome: str, time: float):
+        """
+        outcome is hit, miss or error
+        """
+        self.suggestion_provider_latency.labels(provider, outcome).observe(time)
+
+    def recordDiscordSend(self, discord_ctx, time: float):
+        self.discord_send_latency.labels(shardOf(discord_ctx)).observe(time)
+
+    def discordApiCall(self, discord_ctx, call: str):
+        """
+        call is send, edit or react
+        """
+        self.discord_api_calls.labels(call, shardOf(discord_ctx)).inc()
+
+    def recordApiCallsPerGame(self, mode: str, calls: int):
+        self.discord_api_calls_per_game.labels(mode).observe(calls)
+
+    def discordRateLimited(self, method: str, retry_after: float):
+        """
+        method is the HTTP method of the call, POST for sends, PATCH for edits and PUT for reactions
+        """
+        self.discord_rate_limited.labels(method).inc()
+        self.discord_rate_limit_wait.inc(retry_after)
+
+    def setOutboundQueueDepth(self, priority: str, depth: int):
+        self.outbound_queue_depth.labels(priority).set(depth)
+
+    def recordOutboundWait(self, priority: str, time: float):
+        self.outbound_wait.labels(priority).observe(time)
+
+    def outboundCoalesced(self):
+        self.outbound_coalesced.inc()
+
+    def setGamePoolDepth(self, depth: int):
+        self.game_pool_depth.set(depth)
+
+    def recordGamePoolRefillTime(self, time: float):
+        self.game_pool_refill.observe(time)
+
+    def gamePoolUnderflow(self):
+        self.game_pool_underflow.inc()
+
+    def gamePoolPhraseSkipped(self):
+        self.game_pool_phrase_skipped.inc()
 
     def recordFatalException(self, discord_ctx, info: dict):
-        self.exception_occurred.labels(discord_ctx.author.name, discord_ctx.author.id, discord_ctx.guild, discord_ctx.channel).info(info)
\ No newline at end of file
+        self.exceptions.labels(commandOf(discord_ctx), shardOf(discord_ctx)).inc()
+        if self.legacy_user_labels:
+            self.exception_occurred.labels(*self._userLabels(discord_ctx)).info(info)
+
+
+class MongoLatencyListener(monitoring.CommandListener):
+    """
+    Records the latency of every command MongoDB answers, labelled by command name.
+    Register it with pymongo.monitoring.register before the MongoClient is created.
+    """
+
+    def __init__(self, appMetrics: AppMetrics):
+        self.appMetrics = appMetrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.appMetrics.recordMongoOp(event.command_name, 'ok', event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.appMetrics.recordMongoOp(event.command_name, 'error', event.duration_micros / 1e6)
+
+
+class RateLimitLogHandler(logging.Handler):
+    """
+    Counts the 429s discord.py reports while it waits them out. Add it to the discord.http logger.
+    """
+
+    def __init__(self, appMetrics: AppMetrics):
+        super().__init__(logging.WARNING)
+        self.appMetrics = appMetrics
+
+    def emit(self, record):
+        # 'We are being rate limited. %s %s responded with 429. ...' with the method, url and retry_after
+        if isinstance(record.msg, str) and record.msg.startswith('We are being rate limited') and len(record.args) == 3:
+            method, _, retry_after = record.args
+            # A retry_after over max_ratelimit_timeout is raised instead of waited out
+            waited = 0.0 if 'erroring instead' in record.msg else float(retry_after)
+            self.appMetrics.discordRateLimited(str(method), waited)
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo.command_cursor import CommandCursor
+from pymongo.cursor import Cursor
+
+from googlefeud.GoogleFeudDB import GoogleFeudDB
+from googlefeud.MongoConnection import MONGO_MAX_POOL_SIZE
+from googlefeud.Tracing import span
+
+MONGO_EXECUTOR_WORKERS = int(
+    os.getenv("MONGO_EXECUTOR_WORKERS", str(MONGO_MAX_POOL_SIZE))
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def getExecutor() -> ThreadPoolExecutor:
+    """
+    Returns the bounded thread pool that every blocking pymongo call runs on.
+    It is sized to the Mongo connection pool so workers never queue on a connection.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MONGO_EXECUTOR_WORKERS, thread_name_prefix="gfeuddb"
+                )
+    return _executor
+
+
+class AsyncGoogleFeudDB:
+    """
+    Awaitable GoogleFeudDB. Every GoogleFeudDB method is available under the same name and
+    arguments, but runs on the bounded executor so one slow query doesn't freeze the event loop.
+    Cursors are read to lists inside the worker thread.
+    """
+
+    def __init__(self, guild, channel, db=None, executor=None):
+        self.guild = guild
+        self.channel = channel
+        self._db = db
+        self._executor = executor
+        self._gfeuddb = None
+        self._gfeuddb_lock = threading.Lock()
+
+    def _getSyncDB(self) -> GoogleFeudDB:
+        """
+        Getting the database may create the Mongo client, so the handle is built lazily off the event loop
+        """
+        if self._gfeuddb is None:
+            with self._gfeuddb_lock:
+                if self._gfeuddb is None:
+                    self._gfeuddb = GoogleFeudDB(self.guild, self.channel, db=self._db)
+        return self._gfeuddb
+
+    @property
+    def db(self):
+        return self._getSyncDB().db
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) on the executor and returns its result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor or getExecutor(), functools.partial(func, *args, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        if name.startswith("_") or not callable(getattr(GoogleFeudDB, name, None)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            result = getattr(self._getSyncDB(), name)(*args, **kwargs)
+            if isinstance(result, (Cursor, CommandCursor)):
+                return list(result)
+            return result
+
+        @functools.wraps(getattr(GoogleFeudDB, name))
+        async def method(*args, **kwargs):
+            with span("mongo." + name):
+                return await self.run(call, *args, **kwargs)
+
+        return method
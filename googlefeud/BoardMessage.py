@@ -0,0 +1,208 @@
+import asyncio
+import itertools
+import os
+from collections import OrderedDict
+
+from googlefeud.BoardRenderer import BOARD_CACHE_SIZE
+from googlefeud.LoggerPrint import logger
+from googlefeud.OutboundScheduler import CRITICAL, INFO
+from googlefeud.Tracing import detachTrace
+
+print = logger(print)
+
+# Show each game's board in one message that is edited as the game goes, instead of sending a new board
+# for every guess. Guesses are answered with a reaction.
+BOARD_EDIT_IN_PLACE = os.getenv("BOARD_EDIT_IN_PLACE", "false").lower() in ["1", "true", "yes"]
+# Seconds an edit of the board waits for more changes to the board, which are made in the same edit
+BOARD_EDIT_DEBOUNCE = float(os.getenv("BOARD_EDIT_DEBOUNCE", "0.5"))
+
+GUESS_REACTIONS = {
+    "correct": "✅",
+    "already_given": "🔁",
+    "miss": "❌",
+    "game_over": "⌛",
+}
+
+
+class BoardMessage:
+    def __init__(self, key, game):
+        self.key = key
+        # Tells the boards of a channel's games apart, so a new game's board never replaces the last one's
+        self.game = game
+        self.ctx = None
+        self.message = None
+        self.pending = None
+        self.task = None
+        self.api_calls = 0
+
+
+class BoardMessages:
+    """
+    Sends the boards of every channel's game and counts the Discord API calls made for each game.
+    In edit-in-place mode a game's board is sent once and then edited, with the edits made within
+    debounce seconds of each other coalesced into one.
+    With an outbound scheduler, boards and winners are queued as critical calls, and a queued board is
+    replaced by a newer one of the same game.
+    """
+
+    def __init__(
+        self,
+        appMetrics=None,
+        edit_in_place=BOARD_EDIT_IN_PLACE,
+        debounce=BOARD_EDIT_DEBOUNCE,
+        max_boards=BOARD_CACHE_SIZE,
+        outbound=None,
+    ):
+        self.appMetrics = appMetrics
+        self.outbound = outbound
+        self.edit_in_place = edit_in_place
+        self.debounce = debounce
+        self.max_boards = max_boards
+        # Games the reaper abandons never end here, so only the last max_boards are kept
+        self.boards = OrderedDict()
+        self.reactions = set()
+        self._games = itertools.count()
+
+    def _board(self, key) -> BoardMessage:
+        if key not in self.boards:
+            self.boards[key] = BoardMessage(key, next(self._games))
+            while len(self.boards) > self.max_boards:
+                self._cancelEdit(self.boards.popitem(last=False)[1])
+        self.boards.move_to_end(key)
+        return self.boards[key]
+
+    async def _apiCall(self, board, key, ctx, route, call, priority=CRITICAL, coalesce=None):
+        board.api_calls += 1
+        # Sends are counted by the command context
+        if self.appMetrics and route != "send":
+            self.appMetrics.discordApiCall(ctx, route)
+        if self.outbound is None:
+            return await call()
+        return await self.outbound.submit(key, call, priority, route, coalesce)
+
+    async def send(self, key, ctx, content, coalesce=None):
+        """
+        Sends a message that belongs to the channel's game, like its winners
+        """
+        board = self._board(key)
+        return await self._apiCall(
+            board, key, ctx, "send", lambda: ctx.send(content), coalesce=coalesce
+        )
+
+    async def show(self, key, ctx, content, new_message=False):
+        """
+        Shows the board of the channel's game. It's sent as a new message when the game has none yet,
+        when new_message is set or when boards aren't edited in place. Otherwise the message is edited.
+        """
+        board = self._board(key)
+        if not self.edit_in_place or new_message or board.message is None:
+            self._cancelEdit(board)
+            board.pending = None
+            board.ctx = ctx
+            board.message = await self.send(key, ctx, content, coalesce=("board", board.game))
+            return
+        board.pending = content
+        if self.debounce <= 0:
+            await self._edit(board)
+        elif board.task is None:
+            board.task = asyncio.create_task(self._editLater(board))
+
+    async def react(self, key, ctx, outcome):
+        """
+        Reacts to a guess with its outcome in edit-in-place mode, where the board doesn't get a new
+        message to say it
+        """
+        if not self.edit_in_place:
+            return
+        await self._react(self._board(key), key, ctx, outcome)
+
+    def reactLater(self, key, reactions):
+        """
+        Reacts to guesses with their outcomes, given as (ctx, outcome) pairs, in the background, so the
+        board and the channel's next guesses don't wait on the slow reaction route
+        """
+        if not self.edit_in_place or len(reactions) == 0:
+            return None
+        task = asyncio.create_task(self._reactAll(self._board(key), key, reactions))
+        self.reactions.add(task)
+        task.add_done_callback(self.reactions.discard)
+        return task
+
+    async def _reactAll(self, board, key, reactions):
+        # The reactions outlive the command that made the guesses
+        detachTrace()
+        await asyncio.gather(
+            *[self._react(board, key, ctx, outcome) for ctx, outcome in reactions]
+        )
+
+    async def _react(self, board, key, ctx, outcome):
+        try:
+            await self._apiCall(
+                board,
+                key,
+                ctx,
+                "react",
+                lambda: ctx.message.add_reaction(GUESS_REACTIONS[outcome]),
+                priority=INFO,
+            )
+        except Exception as error:
+            print(ctx, "Failed to react to guess: ", error)
+
+    def _cancelEdit(self, board):
+        if board.task is not None:
+            board.task.cancel()
+            board.task = None
+
+    async def _editLater(self, board):
+        # The edit outlives the command that scheduled it
+        detachTrace()
+        try:
+            # Changes made while the last edit was on its way get an edit of their own
+            while board.pending is not None:
+                await asyncio.sleep(self.debounce)
+                await self._edit(board)
+        finally:
+            if board.task is asyncio.current_task():
+                board.task = None
+
+    async def _edit(self, board):
+        content, board.pending = board.pending, None
+        if content is None or board.message is None:
+            return
+        message = board.message
+        try:
+            await self._apiCall(
+                board,
+                board.key,
+                board.ctx,
+                "edit",
+                lambda: message.edit(content=content),
+                coalesce=("board_edit", board.game),
+            )
+        except Exception as error:
+            # The next board is sent as a new message
+            print(board.ctx, "Failed to edit board: ", error)
+            board.message = None
+
+    async def flush(self, key):
+        """
+        Makes the channel's pending board edit right away
+        """
+        board = self.boards.get(key)
+        if board is not None and board.pending is not None:
+            self._cancelEdit(board)
+            await self._edit(board)
+
+    async def end(self, key):
+        """
+        Makes the pending edit of the channel's game board, records the API calls made for the game
+        and forgets it
+        """
+        await self.flush(key)
+        board = self.boards.pop(key, None)
+        if board is None:
+            return
+        self._cancelEdit(board)
+        if self.appMetrics and board.api_calls > 0:
+            mode = "edit" if self.edit_in_place else "send"
+            self.appMetrics.recordApiCallsPerGame(mode, board.api_calls)
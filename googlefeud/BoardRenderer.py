@@ -0,0 +1,168 @@
+import os
+from collections import OrderedDict
+
+# Sessions whose rendered board lines are kept
+BOARD_CACHE_SIZE = int(os.getenv("BOARD_CACHE_SIZE", "1000"))
+# Lines shown on the board
+BOARD_SIZE = 8
+
+DIGIT_EMOJI = {
+    "0": ":zero:",
+    "1": ":one:",
+    "2": ":two:",
+    "3": ":three:",
+    "4": ":four:",
+    "5": ":five:",
+    "6": ":six:",
+    "7": ":seven:",
+    "8": ":eight:",
+    "9": ":nine:",
+}
+
+
+def _emojiDigits(digits: str) -> str:
+    return "".join([DIGIT_EMOJI.get(digit, "") for digit in digits])
+
+
+# Ranks, wins and the scores a game can give out, rendered once
+NUMBER_EMOJI = [_emojiDigits(str(number)) for number in range(1000)]
+FILLED_NUMBER_EMOJI = [_emojiDigits(str(number).zfill(2)) for number in range(100)]
+SCORE_EMOJI = {score: _emojiDigits(str(score)) for score in range(0, 10001, 100)}
+
+HIDDEN_LINE = ":small_orange_diamond::small_blue_diamond:" * 4
+
+
+def emojiNumber(number: int, fill=False) -> str:
+    """
+    Takes a number and returns emoji form string for Discord. fill pads it to two digits.
+    """
+    if fill and 0 <= number < len(FILLED_NUMBER_EMOJI):
+        return FILLED_NUMBER_EMOJI[number]
+    if not fill and 0 <= number < len(NUMBER_EMOJI):
+        return NUMBER_EMOJI[number]
+    return _emojiDigits(str(number).zfill(2) if fill else str(number))
+
+
+def emojiScore(score: int) -> str:
+    """
+    Takes in score as integer, returns emoji string
+    """
+    emoji = SCORE_EMOJI.get(score)
+    if emoji is None:
+        emoji = emojiNumber(score)
+    return ":diamonds:" + emoji
+
+
+def green(text, append=""):
+    return f"```css\n{text}{append}\n```"
+
+
+def turnText(turn):
+    turn_text = f'{turn} {"turns" if turn > 1 else "turn"} left'
+    if turn > 3:
+        return f"**{turn_text}**"
+    elif turn > 1:
+        return f"***{turn_text}***"
+    else:
+        return f"__***{turn_text}***__"
+
+
+class BoardRenderer:
+    """
+    Renders the game board, scoreboard and winners. The lines of a session's board are kept between
+    guesses and only re-rendered when their suggestion's solved state changes.
+    """
+
+    def __init__(self, max_sessions=BOARD_CACHE_SIZE):
+        self.max_sessions = max_sessions
+        # key -> (phrase, {suggestion: (state, line)})
+        self._boards = OrderedDict()
+        self.rendered_lines = 0
+
+    def _cachedLines(self, key, phrase) -> dict:
+        board = self._boards.get(key)
+        if board is None or board[0] != phrase:
+            board = (phrase, {})
+            self._boards[key] = board
+        self._boards.move_to_end(key)
+        while len(self._boards) > self.max_sessions:
+            self._boards.popitem(last=False)
+        return board[1]
+
+    def _renderLine(self, rank, phrase, suggestion, info, scores, game_ended) -> str:
+        self.rendered_lines += 1
+        if not info["solved"] and not game_ended:
+            return FILLED_NUMBER_EMOJI[rank] + "  " + HIDDEN_LINE
+        elif not info["solved"]:
+            return f"{FILLED_NUMBER_EMOJI[rank]}  {phrase} {suggestion}"
+        solved_by_username = scores[info["solvedBy"]]["display_name"]
+        return f"{FILLED_NUMBER_EMOJI[rank]}  **{phrase} {suggestion}** | Solved By: *{solved_by_username}* {emojiScore(info['score'])}"
+
+    def renderBoard(self, key, phrase, suggestions, scores, turns, status_message="", game_ended=False) -> str:
+        """
+        Renders the board of the session identified by key, usually a (guild, channel) pair
+        """
+        # A status line per guess handled with this board
+        message = "".join(
+            ["\n**" + line + "**" for line in status_message.split("\n") if line != ""]
+        )
+        parts = [
+            f"""
+>>> **Google Feud** - How does Google autocomplete this:question: Do `gf a <your-guess>`
+{green(phrase, ' ...')}{message}
+        """
+        ]
+
+        lines = self._cachedLines(key, phrase)
+        for rank, suggestion in enumerate(suggestions, start=1):
+            if rank > BOARD_SIZE:
+                break
+            info = suggestions[suggestion]
+            state = (rank, info["solved"], info["solvedBy"], game_ended)
+            cached = lines.get(suggestion)
+            if cached is None or cached[0] != state:
+                cached = (
+                    state,
+                    self._renderLine(rank, phrase, suggestion, info, scores, game_ended),
+                )
+                lines[suggestion] = cached
+            parts.append(cached[1])
+
+        if not turns == 5:
+            parts.append("\n" + turnText(turns))
+        return "\n".join(parts)
+
+    def renderScoreboard(self, scores) -> str:
+        ordered_scores = sorted(
+            scores.values(), key=lambda score: score["score"], reverse=True
+        )
+        if len(ordered_scores) == 0:
+            return ">>> ***Scoreboard***\nNo one has guessed right :rofl:"
+        return ">>> ***Scoreboard***\n" + "\n".join(
+            [
+                f"{emojiNumber(rank)}  **{score['display_name']}**  {emojiScore(score['score'])}"
+                for rank, score in enumerate(ordered_scores, start=1)
+            ]
+        )
+
+    def renderWinners(self, winners) -> str:
+        """
+        winners are the display names of the players with the top score
+        """
+        if len(winners) == 0:
+            return f">>> **No winners here**  :cloud_rain:"
+        label = "Winners" if len(winners) > 1 else "Winner"
+        return f">>> **{label}** {' - '.join(winners)}  :fireworks: :100:"
+
+
+_board_renderer = None
+
+
+def getBoardRenderer() -> BoardRenderer:
+    """
+    Returns the process-wide board renderer
+    """
+    global _board_renderer
+    if _board_renderer is None:
+        _board_renderer = BoardRenderer()
+    return _board_renderer
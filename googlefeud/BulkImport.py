@@ -0,0 +1,197 @@
+"""
+Imports a file of candidate phrases into the phrase bank, one phrase per line.
+
+Phrases already in the bank are skipped. The rest have their suggestions fetched and curated, and the
+ones left with at least --min-suggestions curated suggestions are added to searchphrases with them.
+Run with `python -m googlefeud.BulkImport phrases.txt`
+"""
+import argparse
+import asyncio
+import os
+from time import monotonic
+
+from googlefeud.AsyncGoogleFeudDB import AsyncGoogleFeudDB
+from googlefeud.LoggerPrint import logger
+from googlefeud.SuggestionCache import getSuggestionCache, normalizePhrase
+from googlefeud.SuggestionClient import (
+    SUGGEST_MAX_CONCURRENCY,
+    SUGGEST_MAX_CONNECTIONS,
+    SuggestionClient,
+)
+from googlefeud.SuggestionProvider import curate
+
+print = logger(print)
+
+BULK_IMPORT_CONCURRENCY = int(
+    os.getenv("BULK_IMPORT_CONCURRENCY", str(SUGGEST_MAX_CONCURRENCY))
+)
+# Phrases inserted per round trip
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+# A game needs a few suggestions to be worth playing
+MIN_SUGGESTIONS = 3
+# Print progress every this many phrases
+PROGRESS_EVERY = 1000
+
+
+class BulkImportReport:
+    def __init__(self):
+        self.read = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.imported = 0
+        self.rejected = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    def rate(self) -> float:
+        """
+        Phrases processed per second
+        """
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"Processed {self.processed} phrases in {self.elapsed:.1f}s ({self.rate():.1f} phrases/s): "
+            f"{self.imported} imported, {self.rejected} rejected, {self.failed} failed to fetch, "
+            f"{self.duplicates} duplicates skipped out of {self.read} read"
+        )
+
+
+def bulkSuggestionClient(concurrency) -> SuggestionClient:
+    """
+    Suggestion client for jobs fetching the suggestions of many phrases, concurrency at a time
+    """
+    return SuggestionClient(
+        max_connections=max(concurrency, SUGGEST_MAX_CONNECTIONS),
+        max_concurrency=concurrency,
+        # An open breaker would fail every remaining phrase at once and leave it out of the import
+        breaker_failures=0,
+    )
+
+
+def readPhrases(lines) -> list:
+    """
+    Returns the non-empty phrases normalized like `gf contribute` stores them, lowercase with single
+    spaces, once each and in file order. Lines starting with # are comments.
+    """
+    phrases = {}
+    for line in lines:
+        phrase = normalizePhrase(line)
+        if len(phrase) == 0 or phrase.startswith("#"):
+            continue
+        phrases.setdefault(phrase, None)
+    return list(phrases)
+
+
+async def importPhrases(
+    phrases,
+    gfeuddb,
+    fetch,
+    suggestionCache=None,
+    concurrency=BULK_IMPORT_CONCURRENCY,
+    min_suggestions=MIN_SUGGESTIONS,
+    batch_size=BULK_IMPORT_BATCH_SIZE,
+    clock=monotonic,
+) -> BulkImportReport:
+    """
+    Fetches and curates the suggestions of the phrases that aren't in the bank yet, concurrency at a
+    time, and inserts the playable ones in batches, normalized like `gf contribute` stores them.
+    fetch is a coroutine function that returns the lowercase phrase and the raw suggestions payload.
+    Curated suggestions are also put in suggestionCache so games skip the fetch.
+    """
+    report = BulkImportReport()
+    start_time = clock()
+
+    existing = {
+        normalizePhrase(record["phrase"])
+        for record in await gfeuddb.getGoogleSearchPhrasesAfter(None) or []
+    }
+    report.read = len(phrases)
+    phrases = list(dict.fromkeys(normalizePhrase(phrase) for phrase in phrases))
+    candidates = [phrase for phrase in phrases if phrase not in existing]
+    report.duplicates = report.read - len(candidates)
+
+    pending = iter(candidates)
+    batch = []
+
+    async def insertBatch():
+        documents = batch[:]
+        batch.clear()
+        report.imported += await gfeuddb.addGoogleSearchPhrases(documents)
+
+    async def worker():
+        for phrase in pending:
+            try:
+                lower_phrase, suggestions = await fetch(phrase)
+                curated = curate(lower_phrase, suggestions)
+            except Exception as error:
+                print(f"Failed to fetch suggestions for '{phrase}': ", error)
+                report.failed += 1
+                curated = None
+
+            report.processed += 1
+            if report.processed % PROGRESS_EVERY == 0:
+                report.elapsed = clock() - start_time
+                print(f"{report.processed}/{len(candidates)} phrases, {report.rate():.1f} phrases/s")
+
+            if curated is None:
+                continue
+            if len(curated) < min_suggestions:
+                report.rejected += 1
+                continue
+            batch.append({"phrase": phrase, "suggestions": curated})
+            if suggestionCache is not None:
+                await suggestionCache.set(phrase, curated)
+            if len(batch) >= batch_size:
+                await insertBatch()
+
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    if len(batch) > 0:
+        await insertBatch()
+
+    report.elapsed = clock() - start_time
+    return report
+
+
+async def main(args):
+    with open(args.file, encoding="utf-8") as file:
+        phrases = readPhrases(file)
+
+    client = bulkSuggestionClient(args.concurrency)
+    try:
+        report = await importPhrases(
+            phrases,
+            AsyncGoogleFeudDB(None, None),
+            client.fetch,
+            getSuggestionCache(),
+            concurrency=args.concurrency,
+            min_suggestions=args.min_suggestions,
+            batch_size=args.batch_size,
+        )
+    finally:
+        await client.close()
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", help="file with one candidate phrase per line")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BULK_IMPORT_CONCURRENCY,
+        help="suggestion requests in flight at once",
+    )
+    parser.add_argument(
+        "--min-suggestions",
+        type=int,
+        default=MIN_SUGGESTIONS,
+        help="fewest curated suggestions a phrase needs to be imported",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BULK_IMPORT_BATCH_SIZE,
+        help="phrases inserted per round trip",
+    )
+    asyncio.run(main(parser.parse_args()))
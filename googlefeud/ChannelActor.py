@@ -0,0 +1,104 @@
+import asyncio
+import os
+from collections import deque
+
+from googlefeud.LoggerPrint import logger
+from googlefeud.Tracing import detachTrace, getTracer
+
+print = logger(print)
+
+# Seconds a channel's actor waits after a guess for more guesses to handle with it. 0 only batches the
+# guesses that arrive while the previous batch is being handled.
+GUESS_BATCH_WINDOW = float(os.getenv("GUESS_BATCH_WINDOW", "0.02"))
+# Most guesses handled in one batch
+GUESS_BATCH_SIZE = int(os.getenv("GUESS_BATCH_SIZE", "25"))
+
+
+class ChannelActor:
+    """
+    Handles the items submitted for one channel in arrival order, a batch at a time, so only one batch
+    ever works on the channel's game. The actor's task ends when its queue is empty.
+    """
+
+    def __init__(self, key, actors):
+        self.key = key
+        self.actors = actors
+        self.queue = deque()
+        self.task = None
+
+    def submit(self, item) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((item, future))
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return future
+
+    def _takeBatch(self) -> list:
+        batch = []
+        while len(self.queue) > 0 and len(batch) < self.actors.max_batch:
+            batch.append(self.queue.popleft())
+        return batch
+
+    async def _run(self):
+        # The actor outlives the command that started it
+        detachTrace()
+        while len(self.queue) > 0:
+            if self.actors.window > 0:
+                await asyncio.sleep(self.actors.window)
+            batch = self._takeBatch()
+            await self.actors.handle(self.key, batch)
+        # Nothing can be submitted between the empty check and leaving, there is no await in between
+        self.task = None
+        self.actors.actors.pop(self.key, None)
+
+
+class ChannelActors:
+    """
+    Runs an actor per active channel. handleBatch is a coroutine function taking the items of one
+    channel in arrival order and returning a result per item.
+    """
+
+    def __init__(
+        self,
+        handleBatch,
+        window=GUESS_BATCH_WINDOW,
+        max_batch=GUESS_BATCH_SIZE,
+        trace_name=None,
+    ):
+        self.handleBatch = handleBatch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.trace_name = trace_name
+        self.actors = {}
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, key, item):
+        """
+        Queues the item on the channel's actor and returns its result once its batch is handled
+        """
+        actor = self.actors.get(key)
+        if actor is None:
+            actor = self.actors[key] = ChannelActor(key, self)
+        return await actor.submit(item)
+
+    async def handle(self, key, batch):
+        self.batches += 1
+        self.items += len(batch)
+        trace = getTracer().startTrace(self.trace_name) if self.trace_name else None
+        try:
+            results = await self.handleBatch([item for item, _ in batch])
+        except Exception as error:
+            print("Failed to handle a batch for ", key, ": ", error)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            if trace is not None:
+                getTracer().endTrace(trace)
+        if results is None:
+            results = [None] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,48 @@
+from time import monotonic
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold failures in a row, so calls fail right away instead of waiting on an
+    upstream that is down. Once open for reset_timeout seconds it lets a trial call through (half open):
+    the breaker closes again if the trial succeeds and opens for another reset_timeout if it fails.
+    A trial that never reports back lets another one through after reset_timeout.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, clock=monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may go through, letting a trial through when the breaker has been open long enough
+        """
+        if self.state == CLOSED:
+            return True
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return False
+        self.state = HALF_OPEN
+        self.opened_at = self.clock()
+        return True
+
+    def recordSuccess(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def recordFailure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self.clock()
@@ -0,0 +1,269 @@
+"""
+Runs the bot as a cluster of worker processes, each connecting its own range of gateway shards.
+
+Discord sends every event of a guild through shard (guild_id >> 22) % shard_count, and every shard is
+connected by exactly one worker, so a guild's games only ever live in the memory of one worker.
+Workers that exit are restarted on their own shards without touching the others.
+The supervisor serves the metrics of every worker, added up, on /metrics and their state on /health.
+Run with `python -m googlefeud.Cluster --workers 4 --shards 16`
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import signal
+import sys
+import tempfile
+from time import monotonic
+
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+
+from googlefeud.LoggerPrint import logger
+
+print = logger(print)
+
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS", str(os.cpu_count() or 1)))
+# Port of the /metrics and /health endpoints, the one a single process serves its metrics on
+CLUSTER_PORT = int(os.getenv("CLUSTER_PORT", "9001"))
+# Seconds before a worker that exited is restarted. Doubles every time it exits again soon after starting.
+CLUSTER_RESTART_DELAY = float(os.getenv("CLUSTER_RESTART_DELAY", "1"))
+CLUSTER_MAX_RESTART_DELAY = float(os.getenv("CLUSTER_MAX_RESTART_DELAY", "300"))
+# Seconds a worker has to run before it's considered healthy again and its restart delay resets
+CLUSTER_STABLE_AFTER = float(os.getenv("CLUSTER_STABLE_AFTER", "60"))
+# Seconds a worker has to flush its sessions and exit when the cluster stops
+CLUSTER_STOP_TIMEOUT = float(os.getenv("CLUSTER_STOP_TIMEOUT", "30"))
+# Where workers write their metrics. Empty uses a new temporary directory.
+CLUSTER_METRICS_DIR = os.getenv("CLUSTER_METRICS_DIR", "")
+
+
+def shardRanges(shard_count: int, workers: int) -> list:
+    """
+    Splits the shards into contiguous ranges, one per worker, that differ in size by at most one shard.
+    There are never more ranges than shards.
+    """
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for worker_id in range(workers):
+        end = start + size + (1 if worker_id < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def shardOfGuild(guild_id: int, shard_count: int) -> int:
+    """
+    Returns the shard Discord sends the events of the guild through. Direct messages go through shard 0.
+    """
+    return (guild_id >> 22) % shard_count if guild_id is not None else 0
+
+
+def workerOfGuild(guild_id: int, shard_count: int, workers: int) -> int:
+    """
+    Returns the worker that owns the games of the guild
+    """
+    shard_id = shardOfGuild(guild_id, shard_count)
+    for worker_id, shard_ids in enumerate(shardRanges(shard_count, workers)):
+        if shard_id in shard_ids:
+            return worker_id
+
+
+class Worker:
+    def __init__(self, worker_id, shard_ids, restart_delay):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.restart_delay = restart_delay
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.last_exit_code = None
+        self.task = None
+
+    def isAlive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class Cluster:
+    """
+    Starts a worker process per shard range and restarts the ones that exit. Workers run main.py with
+    SHARD_COUNT and SHARD_IDS set, and write their metrics to a directory shared with the supervisor.
+    """
+
+    def __init__(
+        self,
+        workers=CLUSTER_WORKERS,
+        shard_count=None,
+        command=None,
+        env=None,
+        metrics_dir=CLUSTER_METRICS_DIR,
+        restart_delay=CLUSTER_RESTART_DELAY,
+        max_restart_delay=CLUSTER_MAX_RESTART_DELAY,
+        stable_after=CLUSTER_STABLE_AFTER,
+        stop_timeout=CLUSTER_STOP_TIMEOUT,
+        spawn=asyncio.create_subprocess_exec,
+        clock=monotonic,
+    ):
+        self.shard_count = shard_count if shard_count is not None else workers
+        self.command = command if command is not None else [sys.executable, "main.py"]
+        self.env = env if env is not None else dict(os.environ)
+        self.metrics_dir = metrics_dir or tempfile.mkdtemp(prefix="gfeud-metrics-")
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self.stop_timeout = stop_timeout
+        self.spawn = spawn
+        self.clock = clock
+        self.workers = [
+            Worker(worker_id, shard_ids, restart_delay)
+            for worker_id, shard_ids in enumerate(shardRanges(self.shard_count, workers))
+        ]
+        self._initial_restart_delay = restart_delay
+        self._stopping = False
+
+    def workerEnv(self, worker: Worker) -> dict:
+        env = dict(self.env)
+        env["SHARD_COUNT"] = str(self.shard_count)
+        env["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in worker.shard_ids)
+        env["CLUSTER_WORKER_ID"] = str(worker.worker_id)
+        env["PROMETHEUS_MULTIPROC_DIR"] = self.metrics_dir
+        # The supervisor serves the metrics of every worker
+        env["METRICS_PORT"] = "0"
+        if env.get("TRACE_FILE"):
+            root, extension = os.path.splitext(env["TRACE_FILE"])
+            env["TRACE_FILE"] = f"{root}.{worker.worker_id}{extension}"
+        return env
+
+    def _clearMetrics(self):
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(self.metrics_dir, "*.db")):
+            os.remove(path)
+
+    async def _startWorker(self, worker: Worker):
+        worker.process = await self.spawn(*self.command, env=self.workerEnv(worker))
+        worker.started_at = self.clock()
+        print(f"Started worker {worker.worker_id} (pid {worker.process.pid}) on shards {worker.shard_ids}")
+
+    async def _supervise(self, worker: Worker):
+        while not self._stopping:
+            try:
+                await self._startWorker(worker)
+            except Exception as error:
+                print(f"Failed to start worker {worker.worker_id}: ", error)
+            else:
+                worker.last_exit_code = await worker.process.wait()
+                # Drops the live gauges of the exited process
+                multiprocess.mark_process_dead(worker.process.pid, self.metrics_dir)
+                if self._stopping:
+                    return
+                print(f"Worker {worker.worker_id} exited with {worker.last_exit_code}")
+                if self.clock() - worker.started_at >= self.stable_after:
+                    worker.restart_delay = self._initial_restart_delay
+
+            await asyncio.sleep(worker.restart_delay)
+            worker.restart_delay = min(worker.restart_delay * 2, self.max_restart_delay)
+            worker.restarts += 1
+
+    async def start(self):
+        self._clearMetrics()
+        self._stopping = False
+        for worker in self.workers:
+            worker.task = asyncio.create_task(self._supervise(worker))
+
+    async def stop(self):
+        """
+        Asks every worker to shut down, which flushes its sessions, and kills the ones that don't in time
+        """
+        self._stopping = True
+        for worker in self.workers:
+            if worker.isAlive():
+                worker.process.send_signal(signal.SIGINT)
+        for worker in self.workers:
+            if worker.isAlive():
+                try:
+                    await asyncio.wait_for(worker.process.wait(), self.stop_timeout)
+                except asyncio.TimeoutError:
+                    print(f"Worker {worker.worker_id} didn't stop in time, killing it")
+                    worker.process.kill()
+                    await worker.process.wait()
+            if worker.task is not None:
+                worker.task.cancel()
+
+    def health(self) -> dict:
+        workers = [
+            {
+                "worker": worker.worker_id,
+                "shards": worker.shard_ids,
+                "pid": worker.process.pid if worker.process is not None else None,
+                "alive": worker.isAlive(),
+                "restarts": worker.restarts,
+                "last_exit_code": worker.last_exit_code,
+                "uptime": self.clock() - worker.started_at if worker.isAlive() else 0.0,
+            }
+            for worker in self.workers
+        ]
+        healthy = all(worker["alive"] for worker in workers)
+        return {"status": "ok" if healthy else "degraded", "workers": workers}
+
+    def metrics(self) -> bytes:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=self.metrics_dir)
+        return generate_latest(registry)
+
+    async def _handleHealth(self, request):
+        health = self.health()
+        return web.Response(
+            text=json.dumps(health),
+            content_type="application/json",
+            status=200 if health["status"] == "ok" else 503,
+        )
+
+    async def _handleMetrics(self, request):
+        return web.Response(
+            body=self.metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST}
+        )
+
+    async def serve(self, port=CLUSTER_PORT) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_get("/health", self._handleHealth)
+        app.router.add_get("/metrics", self._handleMetrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, port=port).start()
+        return runner
+
+
+async def main(args):
+    cluster = Cluster(workers=args.workers, shard_count=args.shards)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    await cluster.start()
+    runner = await cluster.serve(args.port)
+    print(f"Serving /metrics and /health of {len(cluster.workers)} workers on port {args.port}")
+    try:
+        await stopped.wait()
+    finally:
+        await cluster.stop()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers", type=int, default=CLUSTER_WORKERS, help="worker processes to run"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=int(os.getenv("SHARD_COUNT") or CLUSTER_WORKERS),
+        help="gateway shards across every worker",
+    )
+    parser.add_argument(
+        "--port", type=int, default=CLUSTER_PORT, help="port of /metrics and /health"
+    )
+    asyncio.run(main(parser.parse_args()))
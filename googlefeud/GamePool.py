@@ -0,0 +1,107 @@
+import asyncio
+import os
+from collections import deque
+from time import monotonic
+
+from googlefeud.LoggerPrint import logger
+
+print = logger(print)
+
+GAME_POOL_SIZE = int(os.getenv("GAME_POOL_SIZE", "5"))
+# Seconds to wait before trying again when a game couldn't be prepared
+GAME_POOL_RETRY_DELAY = float(os.getenv("GAME_POOL_RETRY_DELAY", "5"))
+
+
+class GamePool:
+    """
+    Keeps up to depth games already sampled, fetched and curated so `gf start` doesn't wait on them.
+    prepare is a coroutine function returning a prepared game, or None when the sampled phrase
+    isn't playable. A background task refills the pool whenever a game is taken.
+    """
+
+    def __init__(
+        self,
+        prepare,
+        depth=GAME_POOL_SIZE,
+        appMetrics=None,
+        retry_delay=GAME_POOL_RETRY_DELAY,
+    ):
+        self.prepare = prepare
+        self.depth = depth
+        self.appMetrics = appMetrics
+        self.retry_delay = retry_delay
+        self.games = deque()
+        self.underflows = 0
+        self.skipped = 0
+        self._refill_needed = None
+        self._task = None
+
+    def start(self):
+        """
+        Starts the background refill task. Calling it again while the task is running does nothing.
+        """
+        if self._task is None or self._task.done():
+            self._refill_needed = asyncio.Event()
+            self._refill_needed.set()
+            self._task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def pop(self, accept=None):
+        """
+        Returns the oldest prepared game, or None if the pool is empty.
+        With accept, returns the oldest game for which accept(game) is true, or None if there's none.
+        """
+        if self._refill_needed is not None:
+            self._refill_needed.set()
+        for game in self.games:
+            if accept is None or accept(game):
+                self.games.remove(game)
+                self._recordDepth()
+                return game
+        self.underflows += 1
+        if self.appMetrics:
+            self.appMetrics.gamePoolUnderflow()
+        return None
+
+    def _recordDepth(self):
+        if self.appMetrics:
+            self.appMetrics.setGamePoolDepth(len(self.games))
+
+    async def _refill(self):
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+            skipped_in_a_row = 0
+            while len(self.games) < self.depth:
+                start_time = monotonic()
+                try:
+                    game = await self.prepare()
+                except Exception as error:
+                    print("Failed to prepare a game for the pool: ", error)
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+
+                if game is None:
+                    self.skipped += 1
+                    skipped_in_a_row += 1
+                    if self.appMetrics:
+                        self.appMetrics.gamePoolPhraseSkipped()
+                    if skipped_in_a_row >= self.depth:
+                        # The phrase bank may be mostly unplayable, don't hammer Google
+                        skipped_in_a_row = 0
+                        await asyncio.sleep(self.retry_delay)
+                    continue
+
+                skipped_in_a_row = 0
+                self.games.append(game)
+                if self.appMetrics:
+                    self.appMetrics.recordGamePoolRefillTime(monotonic() - start_time)
+                self._recordDepth()
@@ -1,44 +1,72 @@
-import json
-
-import requests
-from fake_useragent import UserAgent
+from collections import namedtuple
 
 from googlefeud.AppMetrics import AppMetrics
-from googlefeud.GoogleFeudDB import GoogleFeudDB
+from googlefeud.AsyncGoogleFeudDB import AsyncGoogleFeudDB
+from googlefeud.BoardRenderer import (
+    emojiNumber,
+    emojiScore,
+    getBoardRenderer,
+    turnText,
+)
+from googlefeud.GamePool import GamePool
+from googlefeud.GoogleFeudDB import newSession
 from googlefeud.LoggerPrint import logger
+from googlefeud.PhraseDeck import getPhraseBank
+from googlefeud.SessionStore import getSessionStore
+from googlefeud.SuggestionProvider import (
+    getSuggestionProvider,
+    meaningless_phrases,
+    meaningless_words,
+    removeDuplicatesFromSuggestions,
+    trimSuggestions,
+)
+from googlefeud.TokenIndex import buildTokenIndex, matchGuess
+from googlefeud.Tracing import span
 
 print = logger(print)
 
-meaningless_phrases = ["a", "the", "of", "by", "so", "too", "your", "me", "my"]
+PreparedGame = namedtuple("PreparedGame", ["phrase", "suggestions"])
+
+# Attempts at picking a playable phrase when the game pool is empty
+MAX_PREPARE_ATTEMPTS = 3
 
 
 class GoogleFeud:
-    def __init__(self, ctx, appMetrics: AppMetrics):
+    def __init__(self, ctx, appMetrics: AppMetrics, gamePool: GamePool = None):
         self.ctx = ctx
-        self.gfeuddb = GoogleFeudDB(str(ctx.guild), str(ctx.channel))
+        self.gfeuddb = AsyncGoogleFeudDB(*sessionKey(ctx))
+        self.sessionStore = getSessionStore()
+        self.session = None
         self.guild = ctx.guild
         self.channel = ctx.channel
         self.phrase = ""
         self.suggestions = {}
+        self.tokenIndex = buildTokenIndex({})
         self.scores = {}
         self.statusMessage = ""
         self.turns = 0
         self.game_ended = False
         self.appMetrics = appMetrics
+        self.suggestionProvider = getSuggestionProvider()
+        self.gamePool = gamePool
+        self.boardRenderer = getBoardRenderer()
+        self.phraseDeck = None
 
-    def startGame(self):
+    async def startGame(self):
         """
         Creates a game session in db if it doesn't exist
         """
-        session = self.gfeuddb.getSession()
+        session = await self.sessionStore.get(self.gfeuddb)
         if session == None:
-            phrase = self.gfeuddb.getGoogleSearchPhrase()
-            print(self.ctx, f"Starting game with '{phrase}'")
-            self.gfeuddb.createSession()
-            self.gfeuddb.updatePhrase(phrase)
-            self.phrase = phrase
-            self.fetchSuggestions()
-            self.turns = 5
+            with span("prepare_game"):
+                game = await self.getPreparedGame()
+            print(self.ctx, f"Starting game with '{game.phrase}'")
+            self.session = newSession(
+                self.gfeuddb.guild, self.gfeuddb.channel, game.phrase, game.suggestions
+            )
+            self.sessionStore.put(self.gfeuddb, self.session)
+            self._bindSession(self.session)
+            await self.sessionStore.commit(self.gfeuddb)
             print(
                 self.ctx,
                 "Auto-completes to guess: " + ", ".join(list(self.suggestions.keys())),
@@ -47,77 +75,56 @@ class GoogleFeud:
         else:
             self.statusMessage = "Game is in progress!"
 
-    def endGame(self):
+    async def getPreparedGame(self) -> PreparedGame:
+        """
+        Takes a ready-to-play game this channel hasn't played in the current pass over the phrase deck
+        from the game pool. Otherwise a game is prepared here, skipping phrases that have no suggestions.
+        """
+        if self.phraseDeck is None:
+            self.phraseDeck = getPhraseBank().deck(
+                (self.gfeuddb.guild, self.gfeuddb.channel)
+            )
+        if self.gamePool is not None:
+            game = self.gamePool.pop(
+                accept=lambda game: self.phraseDeck.markDrawn(game.phrase)
+            )
+            if game is not None:
+                return game
+
+        for _ in range(MAX_PREPARE_ATTEMPTS):
+            game = await prepareGame(await self._drawPhrase(), self.suggestionProvider)
+            if game is not None:
+                return game
+        raise RuntimeError("Couldn't find a phrase with suggestions to display")
+
+    async def _drawPhrase(self):
+        """
+        Draws the channel's next phrase, sampling one from Mongo while the phrase bank isn't loaded
+        """
+        phrase = self.phraseDeck.draw()
+        if phrase == None:
+            phrase = await self.gfeuddb.getGoogleSearchPhrase()
+        return phrase
+
+    async def endGame(self):
         """
         Deletes the game session
         """
-        result = self.gfeuddb.terminateSession()
+        with span("session_delete"):
+            deleted = await self.sessionStore.delete(self.gfeuddb)
         self.game_ended = True
-        return result.deleted_count > 0
-
-    def _get_suggestions_response(self, phrase):
-        question = phrase.replace(" ", "+")
-        url = (
-            "http://suggestqueries.google.com/complete/search?output=firefox&q="
-            + question
-            + "+ "
-        )
-        ua = UserAgent()
-        headers = {"user-agent": ua.random}
-        response = requests.get(url, headers=headers, verify=False)
-        suggestions = json.loads(response.text)
-        lower_phrase = phrase.lower()
-        return (lower_phrase, suggestions)
+        return deleted
 
     def _trim_suggestions(self, lower_phrase, suggestions):
-        """
-        Removes the first section of the sentence where the phrase begins from every auto-complete suggestion.
-        Don't include suggestions where the phrase is not found and cutting off the first section results in the empty string.
-        e.g. suggestion = 'people are strange', phrase = 'people are' -> cleaned_suggestion = 'strange'
-        """
-        return [
-            suggestion[suggestion.find(lower_phrase) + len(lower_phrase) :].strip()
-            for suggestion in suggestions[1]
-            if suggestion.find(lower_phrase) != -1
-            and len(
-                suggestion[suggestion.find(lower_phrase) + len(lower_phrase) :].strip()
-            )
-            > 0
-        ]
+        return trimSuggestions(lower_phrase, suggestions)
 
     def _remove_duplicates_from_suggestions(self, cleaned_suggestions):
-        """
-        Removes duplicate words from every suggestion.
-        It is reversed to remove the least important suggestions first
-        If a duplicate word is found when comparing two suggestions, immediately filter out the suggestion
-        If the word that is duplicated is something like 'a', 'of', 'the', then don't remove it.
-        e.g. Comparing 10.'cool cats' and 9.'cool', 'cool cats' is removed because 'cool' = 'cool' and 9 has higher priority than 10
-        """
-        reversed_suggestions = cleaned_suggestions[:]
-        reversed_suggestions.reverse()
-        new_cleaned_suggestions = []
-
-        for i in range(len(reversed_suggestions)):
-            repeated = False
-            for j in range(i + 1, len(reversed_suggestions)):
-                if repeated:
-                    break
-                for word_1 in reversed_suggestions[i].split(" "):
-                    if repeated:
-                        break
-                    for word_2 in reversed_suggestions[j].split(" "):
-                        if word_1 == word_2 and not word_1 in meaningless_phrases:
-                            repeated = True
-                            break
-            if not repeated:
-                new_cleaned_suggestions.append(reversed_suggestions[i])
-
-        reversed_suggestions.reverse()
-        new_cleaned_suggestions.reverse()
-
-        return (new_cleaned_suggestions, reversed_suggestions)
-
-    def fetchSuggestions(self):
+        return removeDuplicatesFromSuggestions(cleaned_suggestions)
+
+    async def _get_curated_suggestions(self, phrase):
+        return await self.suggestionProvider.suggest(phrase)
+
+    async def fetchSuggestions(self):
         """
         Fetches auto-complete suggestions from Google Api.
         Removes the phrase used to search for the auto-complete suggestions from the suggestion.
@@ -126,143 +133,176 @@ class GoogleFeud:
         Inserts data into db.
         """
 
-        session = self.gfeuddb.getSession()
-        if session == None:
+        self.session = await self.sessionStore.get(self.gfeuddb)
+        if self.session == None:
             raise RuntimeError("Session has not been created")
 
-        lower_phrase, suggestions = self._get_suggestions_response(self.phrase)
-
-        cleaned_suggestions = self._trim_suggestions(lower_phrase, suggestions)
-
-        (
-            cleaned_suggestions,
-            reversed_suggestions,
-        ) = self._remove_duplicates_from_suggestions(cleaned_suggestions)
+        cleaned_suggestions = await self._get_curated_suggestions(self.phrase)
 
         if len(cleaned_suggestions) == 0:
-            self.gfeuddb.terminateSession()
-            raise RuntimeError(
-                "No suggestions to display for '"
-                + self.phrase
-                + "', Original suggestions: ",
-                suggestions[1],
-                " Removed duplicates: ",
-                reversed_suggestions,
-            )
+            await self.sessionStore.delete(self.gfeuddb)
+            raise RuntimeError("No suggestions to display for '" + self.phrase + "'")
 
         # Initializes game data and inserts into database
-        self.suggestions = dict()
-        for i, suggestion in enumerate(cleaned_suggestions):
-            if i < 8:
-                suggestion_info = {
-                    "solved": False,
-                    "score": 1000 - (i * 100),
-                    "solvedBy": "",
-                }
-                self.suggestions[suggestion] = suggestion_info
-        self.gfeuddb.insertSuggestions(self.suggestions)
+        self.suggestions = buildSuggestions(cleaned_suggestions)
+        self.tokenIndex = buildTokenIndex(self.suggestions, meaningless_words)
+        await self._commitSession()
 
-    def loadSession(self):
-        session = self.gfeuddb.getSession()
+    async def loadSession(self):
+        with span("load_session"):
+            session = await self.sessionStore.get(self.gfeuddb)
         if session != None:
-            self.scores = session["scores"]
-            self.suggestions = session["suggestions"]
-            self.phrase = session["phrase"]
-            self.turns = session["turns"]
+            self.session = session
+            self._bindSession(session)
             return True
         else:
             return False
 
+    def _bindSession(self, session):
+        """
+        The scores and suggestions objects are shared with the session store, so changes to them
+        are changes to the session
+        """
+        if "token_index" not in session:
+            session["token_index"] = buildTokenIndex(
+                session["suggestions"], meaningless_words
+            )
+        self.scores = session["scores"]
+        self.suggestions = session["suggestions"]
+        self.tokenIndex = session["token_index"]
+        self.phrase = session["phrase"]
+        self.turns = session["turns"]
+
+    def _syncSession(self):
+        """
+        Copies this game's state into its session
+        """
+        self.session["phrase"] = self.phrase
+        self.session["scores"] = self.scores
+        self.session["suggestions"] = self.suggestions
+        self.session["token_index"] = self.tokenIndex
+        self.session["turns"] = self.turns
+
+    async def _commitSession(self):
+        """
+        Hands this game's session to the session store to persist
+        """
+        self._syncSession()
+        with span("session_write"):
+            await self.sessionStore.commit(self.gfeuddb)
+
+    async def _commitGuess(self, **guess):
+        """
+        Persists a guess that has been applied to this game's state, see GoogleFeudDB.commitGuess
+        """
+        self._syncSession()
+        with span("session_write"):
+            session = await self.sessionStore.commitGuess(self.gfeuddb, **guess)
+        if session is not None and session is not self.session:
+            self.session = session
+            self._bindSession(session)
+
     def getGFeudBoard(self):
-        message = ""
-        if self.statusMessage != "":
-            message = "\n**" + self.statusMessage + "**"
-
-        board = f"""
->>> **Google Feud** - How does Google autocomplete this:question: Do `gf a <your-guess>`
-{green(self.phrase, ' ...')}{message}
-        """
-        rank = 1
-        for key in self.suggestions:
-            if rank > 8:
-                break
-            if not self.suggestions[key]["solved"] and not self.game_ended:
-                board += (
-                    "\n"
-                    + getEmojiNumber(rank, True)
-                    + "  "
-                    + (":small_orange_diamond::small_blue_diamond:" * 4)
-                )
-            elif not self.suggestions[key]["solved"] and self.game_ended:
-                board += f"\n{getEmojiNumber(rank, True)}  {self.phrase} {key}"
-            else:
-                solved_by_username = self.scores[self.suggestions[key]["solvedBy"]][
-                    "display_name"
-                ]
-                board += f'\n{getEmojiNumber(rank, True)}  **{self.phrase} {key}** | Solved By: *{solved_by_username}* {getEmojiScore(self.suggestions[key]["score"])}'
-            rank += 1
-        if not self.turns == 5:
-            board += "\n\n" + getTurnText(self.turns)
-        return board
+        with span("render_board"):
+            return self.boardRenderer.renderBoard(
+                (self.gfeuddb.guild, self.gfeuddb.channel),
+                self.phrase,
+                self.suggestions,
+                self.scores,
+                self.turns,
+                self.statusMessage,
+                self.game_ended,
+            )
 
-    def checkPhraseInSuggestions(self, guess, member):
+    async def checkPhraseInSuggestions(self, guess, member):
         """
         guess is the phrase user is guessing
         member is a Discord object Member that contains username - https://discordpy.readthedocs.io/en/latest/api.html#member
         """
+        outcome, update = self._applyGuess(guess, member)
+        await self._commitGuess(**update)
+        return outcome != "miss"
+
+    async def checkGuesses(self, guesses):
+        """
+        Applies the (ctx, guess) pairs given in one channel in order and persists them together.
+        Guesses made after the game is over aren't applied.
+        The status message has a line per guess.
+        Returns the outcome of every guess: correct, already_given, miss or game_over.
+        """
+        outcomes = []
+        updates = []
+        messages = []
+        for ctx, guess in guesses:
+            if self.isGameOver():
+                outcomes.append("game_over")
+                messages.append(
+                    f"*{guess}* came after the game was over, {ctx.author.display_name}. Start a new game with `gf start`"
+                )
+                continue
+            self.ctx = ctx
+            outcome, update = self._applyGuess(guess, ctx.author)
+            outcomes.append(outcome)
+            updates.append(update)
+            messages.append(self.statusMessage)
+        if len(updates) == 1:
+            await self._commitGuess(**updates[0])
+        elif len(updates) > 1:
+            await self._commitSession()
+        self.statusMessage = "\n".join(messages)
+        return outcomes
+
+    def _applyGuess(self, guess, member):
+        """
+        Applies a guess to this game's state. Returns its outcome, correct, already_given or miss,
+        and the update to persist it with, see GoogleFeudDB.commitGuess.
+        """
         guesser = str(member.display_name)
         guesser_id = str(member.id)
-        for i, suggestion in enumerate(self.suggestions):
-            foundMatch = self.isGuessInPhrase(guess, suggestion)
-            if foundMatch and not self.suggestions[suggestion]["solved"]:
-                print(self.ctx, f"'{guess}' was correct, it matched '{suggestion}'")
-                self.suggestions[suggestion]["solved"] = True
-                self.suggestions[suggestion]["solvedBy"] = guesser_id
-                if not guesser_id in self.scores:
-                    self.scores[guesser_id] = {
-                        "score": int(self.suggestions[suggestion]["score"]),
-                        "display_name": guesser,
-                    }
-                else:
-                    self.scores[guesser_id]["score"] += int(
-                        self.suggestions[suggestion]["score"]
-                    )
-
-                self.gfeuddb.updateScoreForUser(
-                    member, int(self.suggestions[suggestion]["score"])
+        with span("match"):
+            matches = matchGuess(self.tokenIndex, guess, meaningless_words)
+            unsolved = [
+                match for match in matches if not self.suggestions[match]["solved"]
+            ]
+        if len(unsolved) > 0:
+            suggestion = unsolved[0]
+            print(self.ctx, f"'{guess}' was correct, it matched '{suggestion}'")
+            self.suggestions[suggestion]["solved"] = True
+            self.suggestions[suggestion]["solvedBy"] = guesser_id
+            if not guesser_id in self.scores:
+                self.scores[guesser_id] = {
+                    "score": int(self.suggestions[suggestion]["score"]),
+                    "display_name": guesser,
+                }
+            else:
+                self.scores[guesser_id]["score"] += int(
+                    self.suggestions[suggestion]["score"]
                 )
-                self.gfeuddb.updateSuggestionSolved(suggestion, guesser_id)
-                self.statusMessage = f":clap:  Great answer, {guesser}! {self.suggestions[suggestion]['score']} points for you  :partying_face:"
-                self.appMetrics.phraseGiven(self.ctx, {'answer': guess, 'prompt': self.phrase})
-                self.appMetrics.answerGiven(discord_ctx=self.ctx)
-                return True
-            elif foundMatch and self.suggestions[suggestion]["solved"]:
-                print(self.ctx, f"'{guess}' was already guessed correctly before")
-                self.statusMessage = f"Answer with the phrase *{guess}* has already been given  :face_with_symbols_over_mouth:"
-                self.gfeuddb.updateTurn()
-                self.turns -= 1
-                self.appMetrics.phraseGiven(self.ctx, {'answer': guess, 'prompt': self.phrase})
-                self.appMetrics.answerGiven(discord_ctx=self.ctx)
-                return True
+
+            self.statusMessage = f":clap:  Great answer, {guesser}! {self.suggestions[suggestion]['score']} points for you  :partying_face:"
+            self.appMetrics.phraseGiven(self.ctx, {'answer': guess, 'prompt': self.phrase})
+            self.appMetrics.answerGiven(discord_ctx=self.ctx, outcome="correct")
+            return "correct", {
+                "suggestion": suggestion,
+                "user_id": guesser_id,
+                "display_name": guesser,
+                "score": int(self.suggestions[suggestion]["score"]),
+            }
+        elif len(matches) > 0:
+            print(self.ctx, f"'{guess}' was already guessed correctly before")
+            self.statusMessage = f"Answer with the phrase *{guess}* has already been given  :face_with_symbols_over_mouth:"
+            self.turns -= 1
+            self.appMetrics.phraseGiven(self.ctx, {'answer': guess, 'prompt': self.phrase})
+            self.appMetrics.answerGiven(discord_ctx=self.ctx, outcome="already_given")
+            return "already_given", {"turns": -1}
         print(self.ctx, f"'{guess}' did not match any auto-completes")
-        self.gfeuddb.updateTurn()
         self.turns -= 1
         self.statusMessage = (
             f"No auto-complete found with the phrase, *{guess}*  :sweat:"
         )
         self.appMetrics.phraseGiven(self.ctx, {'answer': guess, 'prompt': self.phrase})
-        self.appMetrics.answerGiven(discord_ctx=self.ctx)
-        return False
-
-    def isGuessInPhrase(self, guess, suggestion):
-        """
-        Checks if the given word matches any of the words in the auto-complete and checks
-        if the player is trying to pull a sneaky by giving a meaningless word
-        """
-        return (
-            guess in [word for word in suggestion.split()]
-            and not guess in meaningless_phrases
-        )
+        self.appMetrics.answerGiven(discord_ctx=self.ctx, outcome="miss")
+        return "miss", {"turns": -1}
 
     def isGameOver(self):
         if self.turns <= 0:
@@ -275,58 +315,26 @@ class GoogleFeud:
         return True
 
     def getWinnerResponse(self):
-        winners = getWinners(self.scores)
-        plurar_winner_label = "Winners" if len(winners) > 1 else "Winner"
-        winners = " - ".join(list(winners.keys()))
-        if len(winners) == 0:
-            return f">>> **No winners here**  :cloud_rain:"
-        else:
-            return f">>> **{plurar_winner_label}** {winners}  :fireworks: :100:"
+        return self.boardRenderer.renderWinners(list(getWinners(self.scores).keys()))
 
     def getScoreboard(self):
-        scoreboard = ">>> ***Scoreboard***\n"
-
-        ordered_scores = dict(
-            sorted(
-                self.scores.items(),
-                key=lambda score_dict: score_dict[1]["score"],
-                reverse=True,
-            )
-        )
-
-        if len(ordered_scores) > 0:
-            scoreboard += "\n".join(
-                [
-                    f"{getEmojiNumber(i + 1)}  **{ordered_scores[user_id]['display_name']}**  {getEmojiScore(ordered_scores[user_id]['score'])}"
-                    for i, user_id in enumerate(ordered_scores)
-                ]
-            )
-        else:
-            scoreboard += "No one has guessed right :rofl:"
-
-        return scoreboard
+        return self.boardRenderer.renderScoreboard(self.scores)
 
-    def isUserAnAdmin(self):
+    async def isUserAnAdmin(self):
         """
         Returns True if the user is an Admin, otherwise return False
         """
-        return self.gfeuddb.checkIfUserIsAdmin(self.ctx.author)
+        return await self.gfeuddb.checkIfUserIsAdmin(self.ctx.author)
 
-    def getSuggestionsFromContribution(self):
-        contribution = self.gfeuddb.get_oldest_contribution()
+    async def getSuggestionsFromContribution(self):
+        contribution = await self.gfeuddb.get_oldest_contribution()
         if not contribution:
             return None, None
-        lower_phrase, suggestions = self._get_suggestions_response(
+        lower_phrase = contribution["phrase"].lower()
+        cleaned_suggestions = await self._get_curated_suggestions(
             contribution["phrase"]
         )
 
-        cleaned_suggestions = self._trim_suggestions(lower_phrase, suggestions)
-
-        (
-            cleaned_suggestions,
-            reversed_suggestions,
-        ) = self._remove_duplicates_from_suggestions(cleaned_suggestions)
-
         contributer = contribution["user_id"]
 
         message = f">>> The phrase **{lower_phrase}** by **{contributer}** will display the following suggestions\n"
@@ -336,7 +344,7 @@ class GoogleFeud:
 
         return message, contribution
 
-    def showSuggestionsOfCandidatePhrase(self, phrase, isAdmin):
+    async def showSuggestionsOfCandidatePhrase(self, phrase, isAdmin):
         """
         Checks if the given phrase is in the collection of phrases, if so return early.
         Otherwise check if user is an admin, if so return admin message and suggestions,
@@ -344,17 +352,10 @@ class GoogleFeud:
         Returns a message of the list of suggestions for the given phrase and the suggestions.
         The suggestions are curated by trimming down suggestions and removing duplicates
         """
-        if self.gfeuddb.checkIfSearchPhraseExists(phrase):
+        if await self.gfeuddb.checkIfSearchPhraseExists(phrase):
             return None, None
 
-        lower_phrase, suggestions = self._get_suggestions_response(phrase)
-
-        cleaned_suggestions = self._trim_suggestions(lower_phrase, suggestions)
-
-        (
-            cleaned_suggestions,
-            reversed_suggestions,
-        ) = self._remove_duplicates_from_suggestions(cleaned_suggestions)
+        cleaned_suggestions = await self._get_curated_suggestions(phrase)
         if isAdmin:
             message = (
                 f">>> The phrase **{phrase}** will display the following suggestions\n"
@@ -363,7 +364,7 @@ class GoogleFeud:
                 message += getEmojiNumber(i + 1, True) + "  *" + suggestion + "*\n"
             message += "\nReact to this message with a ✅ to add it or an ❌ to reject it"
         else:
-            if self.gfeuddb.check_if_phrase_is_in_contributions(phrase):
+            if await self.gfeuddb.check_if_phrase_is_in_contributions(phrase):
                 return None, None
 
             message = (
@@ -378,139 +379,126 @@ class GoogleFeud:
 
         return message, cleaned_suggestions
 
-    def add_contribution(self, phrase, suggestions):
-        self.gfeuddb.add_contribution(phrase, suggestions, self.ctx.author)
+    async def add_contribution(self, phrase, suggestions):
+        await self.gfeuddb.add_contribution(phrase, suggestions, self.ctx.author)
 
-    def delete_contribution(self, phrase):
-        self.gfeuddb.delete_contribution(phrase)
+    async def delete_contribution(self, phrase):
+        await self.gfeuddb.delete_contribution(phrase)
 
-    def get_num_of_contributions_left(self):
+    async def get_num_of_contributions_left(self):
         """
         Returns number of times the user is able to contribute. If the contributor is not registered, simply return 1 as the number of times left.
         If they are registered, return the number of times left based on the daily limit.
         """
-        contributor = self.gfeuddb.get_contributor(self.ctx.author)
+        contributor = await self.gfeuddb.get_contributor(self.ctx.author)
         if not contributor:
             return 1
         return contributor["daily_limit"] - contributor["num_of_contributions_today"]
 
-    def add_phrase(self, phrase, user_id):
+    async def add_phrase(self, phrase, user_id):
         """
         Adds the given phrase to the searchphrases collection.
         If a user_id is provided, then we're adding a phrase from the contributions collection and
         we should credit the user that contributed it.
         """
-        if not self.gfeuddb.checkIfSearchPhraseExists(phrase):
-            self.gfeuddb.addGoogleSearchPhrase(phrase)
+        if not await self.gfeuddb.checkIfSearchPhraseExists(phrase):
+            await self.gfeuddb.addGoogleSearchPhrase(phrase)
+            getPhraseBank().add(phrase)
             if not user_id == None:
-                self.gfeuddb.increment_approved_contribution(user_id)
+                await self.gfeuddb.increment_approved_contribution(user_id)
 
-    def increment_wins(self, user_id: str) -> None:
-        self.gfeuddb.updateLeaderboard(user_id)
+    async def increment_wins(self, user_id: str) -> None:
+        await self.gfeuddb.updateLeaderboard(user_id)
 
-    def update_winner_stats(self) -> None:
+    async def update_winner_stats(self) -> None:
         winners = getWinners(self.scores, byId=True)
         for winner in winners:
-            self.increment_wins(winner)
+            await self.increment_wins(winner)
 
-    def get_leaderboard(self, users: list[str]) -> dict[str, str]:
+    async def get_leaderboard(self, users: list[str]) -> dict[str, str]:
         leaderboard = {}
-        for record in self.gfeuddb.getLeaderboard(users):
+        for record in await self.gfeuddb.getLeaderboard(users) or []:
             leaderboard[record["user_id"]] = record["wins"]
         return leaderboard
 
-    def get_wins_for_user(self, user_id: str) -> int:
-        lb = self.get_leaderboard([user_id])
+    async def get_wins_for_user(self, user_id: str) -> int:
+        lb = await self.get_leaderboard([user_id])
         if len(lb) != 0:
             return int(lb[user_id])
         else:
             return 0
 
-    def show_user_stats(self, user_id: str):
-        times_won = self.get_wins_for_user(user_id)
+    async def show_user_stats(self, user_id: str):
+        times_won = await self.get_wins_for_user(user_id)
         return f">>> You've won {getEmojiNumber(times_won)} times"
 
 
+def sessionKey(ctx) -> tuple:
+    """
+    Returns the guild and channel ids identifying the channel's game session. Names aren't unique, and
+    two guilds with the same names can be connected through different shards or processes.
+    """
+    guild_id = getattr(ctx.guild, "id", None)
+    return (str(guild_id), str(ctx.channel.id))
+
+
+def buildSuggestions(cleaned_suggestions) -> dict:
+    """
+    Initializes the suggestion objects used in a session from the curated suggestions
+    """
+    suggestions = dict()
+    for i, suggestion in enumerate(cleaned_suggestions):
+        if i < 8:
+            suggestion_info = {
+                "solved": False,
+                "score": 1000 - (i * 100),
+                "solvedBy": "",
+            }
+            suggestions[suggestion] = suggestion_info
+    return suggestions
+
+
+async def prepareGame(phrase, suggestionProvider):
+    """
+    Gets the curated suggestions of a phrase drawn from the phrase bank from suggestionProvider.
+    Returns None when there's no phrase or it has no suggestions left to play.
+    """
+    if phrase == None:
+        return None
+    cleaned_suggestions = await suggestionProvider.suggest(phrase)
+    if len(cleaned_suggestions) == 0:
+        return None
+    return PreparedGame(phrase, buildSuggestions(cleaned_suggestions))
+
+
 def getWinners(scores: dict, byId=False) -> dict[str, str]:
-    ordered_scores = dict(
-        sorted(
-            scores.items(),
-            key=lambda score_dict: score_dict[1]["score"],
-            reverse=True,
-        )
-    )
-    winners = {}
-    for winner_id in ordered_scores:
-        winner_name = ordered_scores[winner_id]["display_name"]
-        if len(winners) == 0:
-            if byId:
-                winners[winner_id] = ordered_scores[winner_id]["score"]
-            else:
-                winners[winner_name] = ordered_scores[winner_id]["score"]
-        else:
-            first_winner = list(winners.keys())[0]
-            if ordered_scores[winner_id]["score"] == winners[first_winner]:
-                if byId:
-                    winners[winner_id] = ordered_scores[winner_id]["score"]
-                else:
-                    winners[winner_name] = ordered_scores[winner_id]["score"]
-            else:
-                break
-    return winners
+    """
+    Returns the score of every player with the top score, keyed by display name or by id,
+    in the order they were added to scores
+    """
+    if len(scores) == 0:
+        return {}
+    top_score = max(score["score"] for score in scores.values())
+    return {
+        (winner_id if byId else score["display_name"]): score["score"]
+        for winner_id, score in scores.items()
+        if score["score"] == top_score
+    }
 
 
 def getEmojiScore(score):
     """
     Takes in score as integer, returns emoji string
     """
-    return ":diamonds:" + getEmojiNumber(score)
+    return emojiScore(score)
 
 
 def getEmojiNumber(number: int, fill=False) -> str:
     """
     Takes a number and returns emoji form string for Discord
     """
-    if fill:
-        digits = str(number).zfill(2)
-    else:
-        digits = str(number)
-
-    emoji = str()
-    for digit in digits:
-        if digit == "1":
-            emoji += ":one:"
-        elif digit == "2":
-            emoji += ":two:"
-        elif digit == "3":
-            emoji += ":three:"
-        elif digit == "4":
-            emoji += ":four:"
-        elif digit == "5":
-            emoji += ":five:"
-        elif digit == "6":
-            emoji += ":six:"
-        elif digit == "7":
-            emoji += ":seven:"
-        elif digit == "8":
-            emoji += ":eight:"
-        elif digit == "9":
-            emoji += ":nine:"
-        elif digit == "0":
-            emoji += ":zero:"
-        else:
-            emoji += ""
-    return emoji
-
-
-def green(text, append=""):
-    return f"```css\n{text}{append}\n```"
+    return emojiNumber(number, fill)
 
 
 def getTurnText(turn):
-    turn_text = f'{turn} {"turns" if turn > 1 else "turn"} left'
-    if turn > 3:
-        return f"**{turn_text}**"
-    elif turn > 1:
-        return f"***{turn_text}***"
-    else:
-        return f"__***{turn_text}***__"
+    return turnText(turn)
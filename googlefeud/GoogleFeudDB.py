@@ -1,49 +1,70 @@
-from pymongo import MongoClient
-from dotenv import load_dotenv
 from datetime import datetime
-import os
 import pymongo
-
-load_dotenv()
-MONGO_SERVER = os.getenv("MONGO_SERVER")
+import pymongo.errors
+from pymongo import ReturnDocument
+
+from googlefeud.MongoConnection import getConnectionManager
+
+
+def newSession(guild, channel, phrase=str(), suggestions=None):
+    """
+    Returns a new session document for the guild and channel
+    """
+    session = {
+        "guild": guild,
+        "channel": channel,
+        "phrase": phrase,
+        "scores": dict(),
+        "suggestions": suggestions if suggestions is not None else dict(),
+        "turns": 5,
+        "last_modified": datetime.utcnow(),
+    }
+    # suggestions contains objects with the following shape
+    # <suggestion_phrase>: Object
+    #   solved: boolean
+    #   score: int
+    #   solvedBy: string
+    #
+    # scores has the following shape
+    #   scores: object {
+    #       id: object { score: int, display_name: string }
+    #   }
+    return session
 
 
 class GoogleFeudDB:
-    def __init__(self, guild, channel):
-        client = MongoClient(MONGO_SERVER)
-        self.db = client.gfeuddb
+    def __init__(self, guild, channel, db=None):
+        """
+        Lightweight per-(guild, channel) handle. The database comes from the process-wide
+        connection manager unless one is given.
+        """
+        self.db = db if db is not None else getConnectionManager().getDatabase()
         self.guild = guild
         self.channel = channel
-        self.updateLastModifiedTime()
 
     def createSession(self):
         """
         Creates a session with guild, channel and an empty set of player scores
         """
         try:
-            session = {
-                "guild": self.guild,
-                "channel": self.channel,
-                "phrase": str(),
-                "scores": dict(),
-                "suggestions": dict(),
-                "turns": 5,
-                "last_modified": datetime.utcnow(),
-            }
-            # suggestions contains objects with the following shape
-            # <suggestion_phrase>: Object
-            #   solved: boolean
-            #   score: int
-            #   solvedBy: string
-            #
-            # scores has the following shape
-            #   scores: object {
-            #       id: object { score: int, display_name: string }
-            #   }
-            self.db.sessions.insert(session)
+            self.db.sessions.insert(newSession(self.guild, self.channel))
         except Exception as error:
             print("Failed to create a session: ", error)
 
+    def saveSession(self, session):
+        """
+        Writes the whole session document, creating it if it doesn't exist.
+        Errors are raised, so the session store keeps the session dirty and retries it.
+        """
+        try:
+            session["last_modified"] = datetime.utcnow()
+            return self.db.sessions.replace_one(
+                {"guild": self.guild, "channel": self.channel}, session, upsert=True
+            )
+        except Exception as error:
+            print("Failed to save game session: ", error)
+            raise
+
     def terminateSession(self):
         """
         Deletes game session
@@ -58,7 +79,8 @@ class GoogleFeudDB:
     def updateLastModifiedTime(self):
         """
         Adds and updates the last_modified time field for a session.
-        Used to expire a game session after the expiration time has passed
+        The sessions TTL index expires a session once last_modified is older than the idle timeout.
+        Every session write already sets last_modified, so this is only needed to keep an idle game alive.
         """
         try:
             return self.db.sessions.update_one(
@@ -96,7 +118,7 @@ class GoogleFeudDB:
         Updates the phrase in a session.
         """
         try:
-            new_phrase = {"phrase": phrase}
+            new_phrase = {"phrase": phrase, "last_modified": datetime.utcnow()}
 
             result = self.db.sessions.update_one(
                 {"guild": self.guild, "channel": self.channel}, {"$set": new_phrase}
@@ -111,14 +133,14 @@ class GoogleFeudDB:
         user_id = str(user.id)
         display_name = str(user.display_name)
         try:
-            if self.db.sessions.find_one({f"scores.{user_id}": {"$exists": True}}):
-                new_score = {f"scores.{user_id}.score": score}
-                operation = {"$inc": new_score}
-            else:
-                new_entry = {
-                    f"scores.{user_id}": {"score": score, "display_name": display_name}
-                }
-                operation = {"$set": new_entry}
+            # $inc creates the score when the user doesn't have one yet
+            operation = {
+                "$inc": {f"scores.{user_id}.score": score},
+                "$set": {
+                    f"scores.{user_id}.display_name": display_name,
+                    "last_modified": datetime.utcnow(),
+                },
+            }
 
             result = self.db.sessions.update_one(
                 {"guild": self.guild, "channel": self.channel}, operation
@@ -132,7 +154,10 @@ class GoogleFeudDB:
         @param suggestions dictionary
         """
         try:
-            suggestions = {"suggestions": phrase_suggestions}
+            suggestions = {
+                "suggestions": phrase_suggestions,
+                "last_modified": datetime.utcnow(),
+            }
             result = self.db.sessions.update_one(
                 {"guild": self.guild, "channel": self.channel}, {"$set": suggestions}
             )
@@ -146,31 +171,64 @@ class GoogleFeudDB:
         https://docs.mongodb.com/manual/core/document/#dot-notation
         """
         try:
-            solved_suggestion = {"$set": {f"suggestions.{suggestion}.solved": True}}
+            solved_suggestion = {
+                "$set": {
+                    f"suggestions.{suggestion}.solved": True,
+                    f"suggestions.{suggestion}.solvedBy": user_id,
+                    "last_modified": datetime.utcnow(),
+                }
+            }
 
             result = self.db.sessions.update_one(
                 {"guild": self.guild, "channel": self.channel}, solved_suggestion
             )
+        except Exception as error:
+            print("Failed to update suggestion: ", error)
 
-            solvedBy_suggestion = {
-                "$set": {f"suggestions.{suggestion}.solvedBy": user_id}
+    def commitGuess(
+        self, suggestion=None, user_id=None, display_name=None, score=0, turns=0
+    ):
+        """
+        Applies a guess to the session in one atomic round trip and returns the updated session.
+        A correct guess marks the suggestion solved by the user and adds score to their total,
+        which only happens if nobody solved it first. turns is added to the turn count.
+        Returns None if the session doesn't exist or the suggestion was already solved.
+        """
+        try:
+            query = {"guild": self.guild, "channel": self.channel}
+            update = {
+                "$set": {"last_modified": datetime.utcnow()},
+                "$inc": {},
             }
-
-            result = self.db.sessions.update_one(
-                {"guild": self.guild, "channel": self.channel}, solvedBy_suggestion
+            if suggestion is not None:
+                query[f"suggestions.{suggestion}.solved"] = False
+                update["$set"][f"suggestions.{suggestion}.solved"] = True
+                update["$set"][f"suggestions.{suggestion}.solvedBy"] = user_id
+                update["$set"][f"scores.{user_id}.display_name"] = display_name
+                update["$inc"][f"scores.{user_id}.score"] = score
+            if turns != 0:
+                update["$inc"]["turns"] = turns
+            if len(update["$inc"]) == 0:
+                del update["$inc"]
+
+            return self.db.sessions.find_one_and_update(
+                query, update, return_document=ReturnDocument.AFTER
             )
         except Exception as error:
-            print("Failed to update suggestion: ", error)
+            print("Failed to commit guess: ", error)
 
     def updateTurn(self):
         """
         Update turn count by decrementing turn value.
         """
         try:
-            new_turn = {"turns": -1}
+            new_turn = {
+                "$inc": {"turns": -1},
+                "$set": {"last_modified": datetime.utcnow()},
+            }
 
             result = self.db.sessions.update_one(
-                {"guild": self.guild, "channel": self.channel}, {"$inc": new_turn}
+                {"guild": self.guild, "channel": self.channel}, new_turn
             )
         except Exception as error:
             print("Failed update the turns for this session: ", error)
@@ -189,6 +247,26 @@ class GoogleFeudDB:
         except Exception as error:
             print("Failed to fetch search phrase: ", error)
 
+    def getGoogleSearchPhrasesAfter(self, last_id=None):
+        """
+        Returns the phrase documents added after the one with last_id, oldest first.
+        Returns every phrase when last_id is None.
+        """
+        try:
+            query = {} if last_id is None else {"_id": {"$gt": last_id}}
+            return self.db.searchphrases.find(query, {"phrase": 1}).sort("_id", 1)
+        except Exception as error:
+            print("Failed to fetch search phrases: ", error)
+
+    def getGoogleSearchPhrasesWithSuggestions(self):
+        """
+        Returns every phrase document with the curated suggestions stored with it, if it has any
+        """
+        try:
+            return self.db.searchphrases.find({}, {"phrase": 1, "suggestions": 1})
+        except Exception as error:
+            print("Failed to fetch search phrases: ", error)
+
     def checkIfUserIsAdmin(self, discord_author):
         """
         Returns user contained as a Python dict using Discord author's id. If it doesn't exist, return None
@@ -208,6 +286,20 @@ class GoogleFeudDB:
         except Exception as error:
             print("Failed to add a search phrase: ", error)
 
+    def addGoogleSearchPhrases(self, phrases):
+        """
+        ADMIN: Adds many phrase documents in one round trip. Phrases that already exist are skipped.
+        Returns the number of phrases added.
+        """
+        try:
+            result = self.db.searchphrases.insert_many(phrases, ordered=False)
+            return len(result.inserted_ids)
+        except pymongo.errors.BulkWriteError as error:
+            return error.details["nInserted"]
+        except Exception as error:
+            print("Failed to add search phrases: ", error)
+            return 0
+
     def add_contribution(self, phrase, suggestions, discord_author):
         try:
             trimmed_phrase = phrase.strip()
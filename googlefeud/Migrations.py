@@ -0,0 +1,245 @@
+"""
+Creates and verifies the indexes behind every hot query.
+
+Run with `python -m googlefeud.Migrations` to create missing indexes, or with `--check` to only
+report missing indexes and hot queries that MongoDB would answer with a collection scan.
+A unique index can't be created on a collection that already holds duplicates, those are reported
+and left alone unless `--dedupe` is given, which keeps the oldest document of every duplicate.
+"""
+import argparse
+import sys
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from googlefeud.LoggerPrint import logger
+from googlefeud.MongoConnection import getConnectionManager
+from googlefeud.SessionStore import SESSION_IDLE_TIMEOUT
+
+print = logger(print)
+
+DUPLICATE_KEY_ERROR = 11000
+
+INDEXES = {
+    "sessions": [
+        IndexModel(
+            [("guild", ASCENDING), ("channel", ASCENDING)],
+            name="guild_channel",
+            unique=True,
+        ),
+        # Expires abandoned games, see SessionStore for the in-memory side
+        IndexModel(
+            [("last_modified", ASCENDING)],
+            name="last_modified_ttl",
+            expireAfterSeconds=SESSION_IDLE_TIMEOUT,
+        ),
+    ],
+    "searchphrases": [
+        IndexModel([("phrase", ASCENDING)], name="phrase", unique=True),
+    ],
+    "contributions": [
+        IndexModel([("phrase", ASCENDING)], name="phrase"),
+        IndexModel([("submitted_on", ASCENDING)], name="submitted_on"),
+    ],
+    "contributors": [
+        IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+    ],
+    "roles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "leaderboard": [
+        IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+    ],
+    "suggestioncache": [
+        IndexModel([("phrase", ASCENDING)], name="phrase", unique=True),
+    ],
+}
+
+# (name, collection, filter, sort) for every query on a hot path
+HOT_QUERIES = [
+    ("getSession", "sessions", {"guild": "", "channel": ""}, None),
+    ("checkIfSearchPhraseExists", "searchphrases", {"phrase": ""}, None),
+    ("check_if_phrase_is_in_contributions", "contributions", {"phrase": ""}, None),
+    ("get_oldest_contribution", "contributions", {}, [("submitted_on", ASCENDING)]),
+    ("get_contributor", "contributors", {"user_id": ""}, None),
+    ("checkIfUserIsAdmin", "roles", {"user_id": 0}, None),
+    ("getLeaderboard", "leaderboard", {"user_id": {"$in": [""]}}, None),
+    ("suggestioncache", "suggestioncache", {"phrase": ""}, None),
+]
+
+
+def migrate(db, dedupe=False) -> list:
+    """
+    Creates every index in INDEXES that doesn't exist yet and updates the expiry of TTL indexes
+    whose timeout changed. Safe to run any number of times.
+    A unique index over duplicated keys is reported and skipped, unless dedupe removes the duplicates first.
+    Returns the (collection, index) pairs that were created or updated.
+    """
+    created = []
+    for collection, missing in _missingIndexes(db).items():
+        for index in missing:
+            name = index.document["name"]
+            if dedupe and index.document.get("unique"):
+                removed = removeDuplicates(db, collection, index)
+                if removed > 0:
+                    print(f"Removed {removed} duplicate documents from '{collection}' for index '{name}'")
+            try:
+                db[collection].create_indexes([index])
+            except OperationFailure as error:
+                if error.code != DUPLICATE_KEY_ERROR:
+                    raise
+                duplicates = findDuplicates(db, collection, index)
+                print(
+                    f"Can't create unique index '{name}' on '{collection}', {len(duplicates)} keys are duplicated, "
+                    f"e.g. {[duplicate['_id'] for duplicate in duplicates[:5]]}. "
+                    "Run `python -m googlefeud.Migrations --dedupe` to keep the oldest document of each."
+                )
+                continue
+            created.append((collection, name))
+    for collection, index in _staleExpiries(db):
+        db.command(
+            "collMod",
+            collection,
+            index={
+                "keyPattern": dict(index.document["key"]),
+                "expireAfterSeconds": index.document["expireAfterSeconds"],
+            },
+        )
+        created.append((collection, index.document["name"]))
+    return created
+
+
+def findDuplicates(db, collection, index) -> list:
+    """
+    Returns a {_id: key, ids: [...]} group, ids oldest first, for every key of the index held by more than one document
+    """
+    fields = list(index.document["key"].keys())
+    return list(
+        db[collection].aggregate(
+            [
+                {"$sort": {"_id": ASCENDING}},
+                {
+                    "$group": {
+                        "_id": {field: f"${field}" for field in fields},
+                        "ids": {"$push": "$_id"},
+                    }
+                },
+                {"$match": {"ids.1": {"$exists": True}}},
+            ],
+            allowDiskUse=True,
+        )
+    )
+
+
+def removeDuplicates(db, collection, index) -> int:
+    """
+    Deletes every document sharing its index key with an older one, and returns how many were deleted.
+    The oldest is the one the check-then-insert code before the unique indexes kept reading and updating.
+    """
+    removed = 0
+    for duplicate in findDuplicates(db, collection, index):
+        removed += db[collection].delete_many({"_id": {"$in": duplicate["ids"][1:]}}).deleted_count
+    return removed
+
+
+def verifyIndexes(db) -> list:
+    """
+    Returns the (collection, index) pairs from INDEXES that don't exist or expire documents
+    after a different timeout
+    """
+    return [
+        (collection, index.document["name"])
+        for collection, missing in _missingIndexes(db).items()
+        for index in missing
+    ] + [
+        (collection, index.document["name"]) for collection, index in _staleExpiries(db)
+    ]
+
+
+def _missingIndexes(db) -> dict:
+    missing = {}
+    for collection, indexes in INDEXES.items():
+        existing = db[collection].index_information()
+        for index in indexes:
+            if index.document["name"] not in existing:
+                missing.setdefault(collection, []).append(index)
+    return missing
+
+
+def _staleExpiries(db) -> list:
+    stale = []
+    for collection, indexes in INDEXES.items():
+        existing = db[collection].index_information()
+        for index in indexes:
+            name = index.document["name"]
+            expiry = index.document.get("expireAfterSeconds")
+            if expiry is not None and name in existing:
+                if existing[name].get("expireAfterSeconds") != expiry:
+                    stale.append((collection, index))
+    return stale
+
+
+def hasCollectionScan(plan: dict) -> bool:
+    """
+    Checks if any stage of an explain() plan tree is a COLLSCAN
+    """
+    if plan.get("stage") == "COLLSCAN":
+        return True
+    children = plan.get("inputStages", [])
+    if "inputStage" in plan:
+        children = children + [plan["inputStage"]]
+    return any(hasCollectionScan(child) for child in children)
+
+
+def findCollectionScans(db) -> list:
+    """
+    Returns the names of the hot queries whose winning plan is a collection scan
+    """
+    scans = []
+    for name, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if hasCollectionScan(plan):
+            scans.append(name)
+    return scans
+
+
+def checkIndexes(db=None) -> bool:
+    """
+    Reports missing indexes and collection scans. Returns True if there is nothing to report.
+    """
+    db = db if db is not None else getConnectionManager().getDatabase()
+    try:
+        missing = verifyIndexes(db)
+        scans = findCollectionScans(db)
+    except Exception as error:
+        print("Failed to verify indexes: ", error)
+        return False
+    for collection, index in missing:
+        print(f"Missing or outdated index '{index}' on '{collection}', run `python -m googlefeud.Migrations`")
+    for name in scans:
+        print(f"Query '{name}' does a COLLSCAN")
+    return len(missing) == 0 and len(scans) == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report missing indexes and collection scans",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="delete all but the oldest of the documents that share the key of a unique index",
+    )
+    args = parser.parse_args()
+
+    db = getConnectionManager().getDatabase()
+    if not args.check:
+        for collection, index in migrate(db, dedupe=args.dedupe):
+            print(f"Created or updated index '{index}' on '{collection}'")
+    sys.exit(0 if checkIndexes(db) else 1)
@@ -0,0 +1,83 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+MONGO_SERVER = os.getenv("MONGO_SERVER")
+MONGO_DATABASE = os.getenv("MONGO_DATABASE", "gfeuddb")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+
+
+class MongoConnectionManager:
+    """
+    Owns the one MongoClient (and therefore the one connection pool and set of
+    server monitor threads) used by the whole process.
+    GoogleFeudDB handles borrow the database from here instead of opening their own client.
+    """
+
+    def __init__(self, server=MONGO_SERVER, database=MONGO_DATABASE, **client_options):
+        self.server = server
+        self.database = database
+        self.client_options = {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+            "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "retryWrites": True,
+        }
+        self.client_options.update(client_options)
+        self._client = None
+        self._lock = threading.Lock()
+
+    def getClient(self):
+        """
+        Returns the shared MongoClient, creating it on first use
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(self.server, **self.client_options)
+        return self._client
+
+    def setClient(self, client):
+        """
+        Uses client instead of connecting to the server, e.g. an in-memory stand-in for load tests
+        """
+        with self._lock:
+            self._client = client
+
+    def getDatabase(self):
+        return self.getClient()[self.database]
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_connection_manager = None
+_connection_manager_lock = threading.Lock()
+
+
+def getConnectionManager() -> MongoConnectionManager:
+    """
+    Returns the process-wide connection manager
+    """
+    global _connection_manager
+    if _connection_manager is None:
+        with _connection_manager_lock:
+            if _connection_manager is None:
+                _connection_manager = MongoConnectionManager()
+    return _connection_manager
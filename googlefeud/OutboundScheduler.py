@@ -0,0 +1,273 @@
+import asyncio
+import contextvars
+import itertools
+import os
+from collections import deque
+from time import monotonic
+
+from googlefeud.LoggerPrint import logger
+from googlefeud.Tracing import detachTrace
+
+print = logger(print)
+
+# Discord allows about 5 messages per 5 seconds in a channel, 1 reaction per 0.25 seconds and
+# 50 requests per second across the bot. The scheduler stays within the same limits so requests
+# aren't answered with 429s.
+OUTBOUND_CHANNEL_RATE = int(os.getenv("OUTBOUND_CHANNEL_RATE", "5"))
+OUTBOUND_CHANNEL_PERIOD = float(os.getenv("OUTBOUND_CHANNEL_PERIOD", "5"))
+OUTBOUND_REACTION_PERIOD = float(os.getenv("OUTBOUND_REACTION_PERIOD", "0.25"))
+OUTBOUND_GLOBAL_RATE = int(os.getenv("OUTBOUND_GLOBAL_RATE", "50"))
+# Times a call answered with a 429 is retried before giving up
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+
+# Boards, winners and answers to guesses go first
+CRITICAL = 0
+INFO = 1
+PRIORITY_NAMES = {CRITICAL: "critical", INFO: "info"}
+
+# Set while a scheduled call runs, so the sends it makes go out directly
+_in_outbound_call = contextvars.ContextVar("gfeud_in_outbound_call", default=False)
+
+
+def defaultRoutes():
+    return {
+        "send": (OUTBOUND_CHANNEL_RATE, OUTBOUND_CHANNEL_PERIOD),
+        "edit": (OUTBOUND_CHANNEL_RATE, OUTBOUND_CHANNEL_PERIOD),
+        "react": (1, OUTBOUND_REACTION_PERIOD),
+    }
+
+
+def isScheduledCall() -> bool:
+    """
+    Whether the current task is running a call the scheduler made
+    """
+    return _in_outbound_call.get()
+
+
+class RateLimitBucket:
+    """
+    Allows rate calls in any period seconds. A call counts from when it finished, which is never before
+    Discord counted it, so the bucket doesn't run ahead of Discord's.
+    """
+
+    def __init__(self, rate, period, clock=monotonic):
+        self.rate = rate
+        self.period = period
+        self.clock = clock
+        self.calls = deque()
+        self.paused_until = 0.0
+
+    def delay(self) -> float:
+        """
+        Seconds until a call can be made
+        """
+        now = self.clock()
+        while len(self.calls) > 0 and now - self.calls[0] >= self.period:
+            self.calls.popleft()
+        wait = 0.0 if len(self.calls) < self.rate else self.calls[0] + self.period - now
+        return max(wait, self.paused_until - now)
+
+    def take(self):
+        self.calls.append(self.clock())
+
+    def finished(self):
+        """
+        Counts the last call from now, when it finished
+        """
+        if len(self.calls) > 0:
+            self.calls[-1] = self.clock()
+
+    def giveBack(self):
+        if len(self.calls) > 0:
+            self.calls.pop()
+
+    def isIdle(self) -> bool:
+        return self.delay() <= 0 and len(self.calls) == 0
+
+    def pause(self, seconds):
+        """
+        Holds every call for seconds, after Discord answered with a 429
+        """
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class OutboundCall:
+    __slots__ = ["priority", "sequence", "route", "coalesce", "call", "futures", "queued_at", "retries"]
+
+    def __init__(self, priority, sequence, route, coalesce, call, future, queued_at):
+        self.priority = priority
+        self.sequence = sequence
+        self.route = route
+        self.coalesce = coalesce
+        self.call = call
+        self.futures = [future]
+        self.queued_at = queued_at
+        self.retries = 0
+
+
+class OutboundScheduler:
+    """
+    Makes every Discord API call of a channel from the channel's queue, one at a time, when the channel's
+    route bucket and the global bucket allow it. Critical calls go before informational ones.
+    A queued call with the same coalesce key as a newer one, like an older board, is replaced by it and
+    both callers get the result of the newer call.
+    The buckets of channels with nothing queued are swept once they're idle, at most once per the longest
+    route period.
+    """
+
+    def __init__(
+        self,
+        appMetrics=None,
+        routes=None,
+        global_rate=OUTBOUND_GLOBAL_RATE,
+        max_retries=OUTBOUND_MAX_RETRIES,
+        clock=monotonic,
+    ):
+        self.appMetrics = appMetrics
+        self.routes = routes if routes is not None else defaultRoutes()
+        self.max_retries = max_retries
+        self.clock = clock
+        self.global_bucket = RateLimitBucket(global_rate, 1.0, clock)
+        self.buckets = {}
+        self.queues = {}
+        self.workers = {}
+        self.depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self.coalesced = 0
+        self._sequence = itertools.count()
+        self._swept_at = clock()
+
+    def _bucket(self, key, route) -> RateLimitBucket:
+        if (key, route) not in self.buckets:
+            rate, period = self.routes[route]
+            self.buckets[(key, route)] = RateLimitBucket(rate, period, self.clock)
+        return self.buckets[(key, route)]
+
+    def _setDepth(self, priority, change):
+        self.depth[priority] += change
+        if self.appMetrics:
+            self.appMetrics.setOutboundQueueDepth(PRIORITY_NAMES[priority], self.depth[priority])
+
+    async def submit(self, key, call, priority=INFO, route="send", coalesce=None):
+        """
+        Queues call, a coroutine function making one Discord API call for the channel identified by key,
+        and returns its result once it has been made
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.setdefault(key, [])
+        replaced = self._replaceable(queue, priority, coalesce)
+        if replaced is not None:
+            replaced.call = call
+            replaced.futures.append(future)
+            self.coalesced += 1
+            if self.appMetrics:
+                self.appMetrics.outboundCoalesced()
+            return await future
+
+        queue.append(
+            OutboundCall(priority, next(self._sequence), route, coalesce, call, future, self.clock())
+        )
+        self._setDepth(priority, 1)
+        if key not in self.workers:
+            self.workers[key] = asyncio.create_task(self._drain(key))
+        return await future
+
+    def _replaceable(self, queue, priority, coalesce):
+        """
+        Returns the queued call a new call with the coalesce key replaces. Only the last queued call
+        that goes before or with it can be replaced, so calls that go first keep their order, e.g. a
+        new game's board never overtakes the last game's winners.
+        """
+        if coalesce is None:
+            return None
+        for queued in reversed(queue):
+            if queued.priority <= priority:
+                return queued if queued.coalesce == coalesce else None
+        return None
+
+    def _next(self, queue) -> OutboundCall:
+        return min(queue, key=lambda queued: (queued.priority, queued.sequence))
+
+    async def _wait(self, bucket):
+        while True:
+            delay = max(bucket.delay(), self.global_bucket.delay())
+            if delay <= 0:
+                bucket.take()
+                self.global_bucket.take()
+                return
+            await asyncio.sleep(delay)
+
+    async def _drain(self, key):
+        # The calls outlive the command that queued them
+        detachTrace()
+        _in_outbound_call.set(True)
+        queue = self.queues[key]
+        while len(queue) > 0:
+            queued = self._next(queue)
+            bucket = self._bucket(key, queued.route)
+            await self._wait(bucket)
+            # A call queued while waiting may have gone ahead of this one
+            first = self._next(queue)
+            if first is not queued:
+                if first.route != queued.route:
+                    bucket.giveBack()
+                    self.global_bucket.giveBack()
+                    continue
+                queued = first
+            queue.remove(queued)
+            self._setDepth(queued.priority, -1)
+            if self.appMetrics:
+                self.appMetrics.recordOutboundWait(
+                    PRIORITY_NAMES[queued.priority], self.clock() - queued.queued_at
+                )
+            await self._make(key, queue, queued, bucket)
+        # Nothing can be queued between the empty check and leaving, there is no await in between
+        del self.queues[key]
+        del self.workers[key]
+        # The last call just finished, so this channel's buckets are only idle in a later sweep
+        now = self.clock()
+        if now - self._swept_at >= max(period for _, period in self.routes.values()):
+            self._swept_at = now
+            self.sweep()
+
+    def sweep(self):
+        """
+        Forgets the idle buckets of channels with nothing queued, an idle bucket is the same as a new one
+        """
+        for (key, route), bucket in list(self.buckets.items()):
+            if key not in self.workers and bucket.isIdle():
+                del self.buckets[(key, route)]
+
+    async def _make(self, key, queue, queued, bucket):
+        try:
+            result = await queued.call()
+        except Exception as error:
+            bucket.finished()
+            retry_after = getattr(error, "retry_after", None)
+            if isinstance(retry_after, (int, float)) and queued.retries < self.max_retries:
+                print(f"Rate limited on {queued.route} in {key}, retrying in {retry_after:.2f}s")
+                bucket.pause(retry_after)
+                queued.retries += 1
+                queue.append(queued)
+                self._setDepth(queued.priority, 1)
+                return
+            for future in queued.futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        bucket.finished()
+        for future in queued.futures:
+            if not future.done():
+                future.set_result(result)
+
+
+_outbound_scheduler = None
+
+
+def getOutboundScheduler() -> OutboundScheduler:
+    """
+    Returns the process-wide outbound scheduler
+    """
+    global _outbound_scheduler
+    if _outbound_scheduler is None:
+        _outbound_scheduler = OutboundScheduler()
+    return _outbound_scheduler
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import random
+from collections import OrderedDict
+
+from googlefeud.LoggerPrint import logger
+
+print = logger(print)
+
+# Seconds between two loads of the phrases other processes added to the searchphrases collection
+PHRASE_BANK_REFRESH_INTERVAL = float(os.getenv("PHRASE_BANK_REFRESH_INTERVAL", "300"))
+# Channels whose decks are kept, a deck can grow to the size of the bank
+PHRASE_DECK_CACHE_SIZE = int(os.getenv("PHRASE_DECK_CACHE_SIZE", "1000"))
+
+
+class PhraseBank:
+    """
+    In-memory copy of the searchphrases collection. Every phrase gets a permanent position in the
+    order it was added, which the decks shuffle. The bank is loaded once and refreshed with only the
+    phrases added since the last refresh.
+    Only the decks of the last max_decks channels to start a game are kept.
+    """
+
+    def __init__(self, rng=None, max_decks=PHRASE_DECK_CACHE_SIZE):
+        self.phrases = []
+        self.positions = {}
+        self.max_decks = max_decks
+        self.decks = OrderedDict()
+        self.random = rng if rng is not None else random.Random()
+        self._last_id = None
+        self._refresh_task = None
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def add(self, phrase) -> bool:
+        """
+        Adds a phrase to the bank. Returns False if it was already there.
+        """
+        if phrase in self.positions:
+            return False
+        self.positions[phrase] = len(self.phrases)
+        self.phrases.append(phrase)
+        return True
+
+    async def refresh(self, gfeuddb) -> int:
+        """
+        Loads the phrases added to the searchphrases collection since the last refresh.
+        Returns the number of new phrases.
+        """
+        records = await gfeuddb.getGoogleSearchPhrasesAfter(self._last_id)
+        added = 0
+        for record in records or []:
+            if self.add(record["phrase"]):
+                added += 1
+            self._last_id = record["_id"]
+        return added
+
+    def startRefresher(self, gfeuddb, interval=PHRASE_BANK_REFRESH_INTERVAL):
+        """
+        Starts the background task refreshing the bank. Calling it again while it's running does nothing.
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(
+                self._refreshForever(gfeuddb, interval)
+            )
+
+    async def _refreshForever(self, gfeuddb, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                added = await self.refresh(gfeuddb)
+                if added > 0:
+                    print(f"Loaded {added} phrases, the phrase bank has {len(self)}")
+            except Exception as error:
+                print("Failed to refresh the phrase bank: ", error)
+
+    def deck(self, key) -> "PhraseDeck":
+        """
+        Returns the deck for key, usually a (guild, channel) pair
+        """
+        if key not in self.decks:
+            self.decks[key] = PhraseDeck(self)
+            while len(self.decks) > self.max_decks:
+                self.decks.popitem(last=False)
+        self.decks.move_to_end(key)
+        return self.decks[key]
+
+    def dropDeck(self, key):
+        """
+        Forgets the deck for key, a channel that draws again starts a new pass
+        """
+        self.decks.pop(key, None)
+
+
+class PhraseDeck:
+    """
+    Shuffled pass over the phrase bank that doesn't repeat a phrase until every phrase was drawn.
+    The shuffle is a Fisher-Yates done one draw at a time, so drawing is O(1) and only the swapped
+    positions are stored. Phrases added to the bank mid-pass join the undrawn part of the deck.
+    """
+
+    def __init__(self, bank: PhraseBank):
+        self.bank = bank
+        self.cursor = 0
+        # Deck slot -> bank position, and back, for the slots that were swapped
+        self._slots = {}
+        self._slot_of = {}
+
+    def _positionAt(self, slot):
+        return self._slots.get(slot, slot)
+
+    def _slotOf(self, position):
+        return self._slot_of.get(position, position)
+
+    def _swap(self, slot, other):
+        position, other_position = self._positionAt(slot), self._positionAt(other)
+        self._slots[slot], self._slots[other] = other_position, position
+        self._slot_of[other_position], self._slot_of[position] = slot, other
+
+    def _reshuffle(self):
+        self.cursor = 0
+        self._slots = {}
+        self._slot_of = {}
+
+    def remaining(self) -> int:
+        return len(self.bank) - self.cursor
+
+    def draw(self):
+        """
+        Returns the next phrase of the deck, or None if the bank is empty
+        """
+        if len(self.bank) == 0:
+            return None
+        if self.remaining() <= 0:
+            self._reshuffle()
+        self._swap(self.cursor, self.bank.random.randrange(self.cursor, len(self.bank)))
+        phrase = self.bank.phrases[self._positionAt(self.cursor)]
+        self.cursor += 1
+        return phrase
+
+    def markDrawn(self, phrase) -> bool:
+        """
+        Draws the given phrase out of turn. Returns False if it was already drawn in this pass.
+        Phrases the bank doesn't know about are always accepted.
+        """
+        position = self.bank.positions.get(phrase)
+        if position is None:
+            return True
+        if self.remaining() <= 0:
+            self._reshuffle()
+        slot = self._slotOf(position)
+        if slot < self.cursor:
+            return False
+        self._swap(self.cursor, slot)
+        self.cursor += 1
+        return True
+
+
+_phrase_bank = None
+
+
+def getPhraseBank() -> PhraseBank:
+    """
+    Returns the process-wide phrase bank
+    """
+    global _phrase_bank
+    if _phrase_bank is None:
+        _phrase_bank = PhraseBank()
+    return _phrase_bank
@@ -0,0 +1,229 @@
+import asyncio
+import copy
+import os
+from time import monotonic
+
+from googlefeud.LoggerPrint import logger
+from googlefeud.Tracing import detachTrace
+
+print = logger(print)
+
+# Longest time in seconds a change waits in memory before it's written to the sessions collection.
+# 0 writes every change through before the command answers.
+SESSION_FLUSH_DELAY = float(os.getenv("SESSION_FLUSH_DELAY", "1"))
+# Seconds a game can go untouched before it's abandoned. The sessions TTL index uses the same timeout.
+SESSION_IDLE_TIMEOUT = int(os.getenv("SESSION_IDLE_TIMEOUT", str(6 * 60 * 60)))
+# Seconds between two passes of the reaper looking for abandoned games
+SESSION_REAP_INTERVAL = float(os.getenv("SESSION_REAP_INTERVAL", "60"))
+
+
+class SessionStore:
+    """
+    In-process, authoritative copy of the game sessions keyed by (guild, channel).
+    Reads are served from memory, loading from Mongo only the first time a channel is seen,
+    and changes are written behind to the sessions collection within flush_delay seconds.
+    A restart rebuilds sessions from Mongo as channels are seen again.
+    Games untouched for idle_timeout seconds are deleted and forgotten by the reaper.
+    """
+
+    def __init__(
+        self,
+        flush_delay=SESSION_FLUSH_DELAY,
+        idle_timeout=SESSION_IDLE_TIMEOUT,
+        reap_interval=SESSION_REAP_INTERVAL,
+        clock=monotonic,
+    ):
+        self.flush_delay = flush_delay
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.clock = clock
+        # A cached None means the channel has no session
+        self.sessions = {}
+        self.dirty = {}
+        self.last_used = {}
+        self.handles = {}
+        self.reaped = 0
+        # Called with the key of every channel the reaper forgets
+        self.on_reap = None
+        self._loading = {}
+        self._locks = {}
+        self._flush_task = None
+        self._reap_task = None
+
+    def _key(self, gfeuddb):
+        return (gfeuddb.guild, gfeuddb.channel)
+
+    def _touch(self, gfeuddb):
+        key = self._key(gfeuddb)
+        self.last_used[key] = self.clock()
+        self.handles[key] = gfeuddb
+        return key
+
+    def _lock(self, key) -> asyncio.Lock:
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    async def get(self, gfeuddb):
+        """
+        Returns the session document for the handle's guild and channel, or None if there is no game
+        """
+        key = self._touch(gfeuddb)
+        if key in self.sessions:
+            return self.sessions[key]
+
+        if key not in self._loading:
+            self._loading[key] = asyncio.ensure_future(gfeuddb.getSession())
+        loading = self._loading[key]
+        try:
+            session = await loading
+        finally:
+            if self._loading.get(key) is loading:
+                del self._loading[key]
+        if key not in self.sessions:
+            self.sessions[key] = session
+        return self.sessions[key]
+
+    def put(self, gfeuddb, session):
+        """
+        Replaces the session for the handle's guild and channel. Call commit to persist it.
+        """
+        self.sessions[self._touch(gfeuddb)] = session
+
+    async def commit(self, gfeuddb):
+        """
+        Persists the session for the handle's guild and channel, right away when there is no flush delay
+        """
+        key = self._touch(gfeuddb)
+        self.dirty[key] = gfeuddb
+        if self.flush_delay <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flushLater())
+
+    async def commitGuess(self, gfeuddb, **guess):
+        """
+        Persists a guess already applied to the in-memory session and returns the session.
+        With a flush delay the guess is written behind with the rest of the session. Otherwise it is
+        written as one atomic update (see GoogleFeudDB.commitGuess) and the stored session is replaced
+        by the returned document.
+        """
+        key = self._touch(gfeuddb)
+        if self.flush_delay > 0:
+            await self.commit(gfeuddb)
+            return self.sessions.get(key)
+
+        async with self._lock(key):
+            session = await gfeuddb.commitGuess(**guess)
+        if session is None:
+            # Mongo disagrees with memory, reload the session the next time it's needed
+            self.evict(key)
+        else:
+            self.sessions[key] = session
+        return session
+
+    async def delete(self, gfeuddb):
+        """
+        Deletes the session. Returns True if there was one to delete.
+        """
+        key = self._key(gfeuddb)
+        async with self._lock(key):
+            existed = self.sessions.get(key) is not None
+            self.sessions[key] = None
+            self.dirty.pop(key, None)
+            result = await gfeuddb.terminateSession()
+        return existed or (result is not None and result.deleted_count > 0)
+
+    def evict(self, key):
+        """
+        Forgets a session without persisting or deleting it
+        """
+        self.sessions.pop(key, None)
+        self.dirty.pop(key, None)
+        self.last_used.pop(key, None)
+        self.handles.pop(key, None)
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+
+    def _isIdle(self, key, now) -> bool:
+        return key in self.last_used and now - self.last_used[key] >= self.idle_timeout
+
+    async def reap(self):
+        """
+        Deletes the games nobody has touched for idle_timeout seconds and forgets every idle channel.
+        Returns the number of games deleted.
+        """
+        now = self.clock()
+        reaped = 0
+        for key in [key for key in self.last_used if self._isIdle(key, now)]:
+            if self.sessions.get(key) is not None:
+                if await self.delete(self.handles[key]):
+                    reaped += 1
+            # The channel may have been used again while the game was being deleted
+            if self._isIdle(key, now):
+                self.evict(key)
+                if self.on_reap is not None:
+                    self.on_reap(key)
+        self.reaped += reaped
+        return reaped
+
+    def startReaper(self):
+        """
+        Starts the background task reaping abandoned games. Calling it again while it's running does nothing.
+        """
+        if self._reap_task is None or self._reap_task.done():
+            self._reap_task = asyncio.create_task(self._reapForever())
+
+    async def _reapForever(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                reaped = await self.reap()
+                if reaped > 0:
+                    print(f"Reaped {reaped} abandoned game sessions")
+            except Exception as error:
+                print("Failed to reap game sessions: ", error)
+
+    async def _flushLater(self):
+        detachTrace()
+        # Changes committed while a flush runs, and sessions that failed to save, wait for the next pass
+        while self.dirty:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    async def flush(self):
+        """
+        Writes every changed session to Mongo. Sessions that fail to save stay dirty and are retried by the next flush.
+        """
+        dirty, self.dirty = self.dirty, {}
+        for key, gfeuddb in dirty.items():
+            async with self._lock(key):
+                session = self.sessions.get(key)
+                if session is None:
+                    continue
+                try:
+                    await gfeuddb.saveSession(copy.deepcopy(session))
+                except Exception as error:
+                    print("Failed to flush game session: ", key, error)
+                    self.dirty.setdefault(key, gfeuddb)
+
+    async def close(self):
+        if self._reap_task is not None:
+            self._reap_task.cancel()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        await self.flush()
+
+
+_session_store = None
+
+
+def getSessionStore() -> SessionStore:
+    """
+    Returns the process-wide session store
+    """
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore()
+    return _session_store
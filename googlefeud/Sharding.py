@@ -0,0 +1,84 @@
+import asyncio
+import math
+import os
+
+from googlefeud.LoggerPrint import logger
+
+print = logger(print)
+
+# Gateway shards across every process running the bot. Empty lets Discord recommend a count.
+SHARD_COUNT = os.getenv("SHARD_COUNT", "")
+# Comma separated shards this process connects, e.g. 0,1,2,3. Empty connects every shard.
+# Each shard must be connected by exactly one process, since game sessions are kept in its memory.
+SHARD_IDS = os.getenv("SHARD_IDS", "")
+# Seconds between two reports of every shard's latency and guild count
+SHARD_METRICS_INTERVAL = float(os.getenv("SHARD_METRICS_INTERVAL", "15"))
+
+
+def shardConfig(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS) -> dict:
+    """
+    Returns the shard_count and shard_ids keyword arguments of AutoShardedBot, leaving out the ones not set
+    """
+    config = {}
+    if shard_count.strip() != "":
+        config["shard_count"] = int(shard_count)
+        if config["shard_count"] < 1:
+            raise ValueError(f"SHARD_COUNT must be at least 1, got {shard_count}")
+    if shard_ids.strip() != "":
+        if "shard_count" not in config:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT to be set")
+        ids = sorted({int(shard_id) for shard_id in shard_ids.split(",") if shard_id.strip() != ""})
+        out_of_range = [shard_id for shard_id in ids if not 0 <= shard_id < config["shard_count"]]
+        if len(out_of_range) > 0:
+            raise ValueError(
+                f"SHARD_IDS {out_of_range} are outside of SHARD_COUNT {config['shard_count']}"
+            )
+        config["shard_ids"] = ids
+    return config
+
+
+def guildsPerShard(guilds) -> dict:
+    """
+    Returns the number of guilds connected through every shard
+    """
+    counts = {}
+    for guild in guilds:
+        counts[guild.shard_id] = counts.get(guild.shard_id, 0) + 1
+    return counts
+
+
+class ShardMonitor:
+    """
+    Reports the heartbeat latency and guild count of every shard the bot connects
+    """
+
+    def __init__(self, bot, appMetrics, interval=SHARD_METRICS_INTERVAL):
+        self.bot = bot
+        self.appMetrics = appMetrics
+        self.interval = interval
+        self._task = None
+
+    def report(self):
+        guilds = self.bot.guilds
+        counts = guildsPerShard(guilds)
+        for shard_id, latency in self.bot.latencies:
+            # A shard that hasn't heartbeat yet has an infinite latency
+            if not math.isinf(latency):
+                self.appMetrics.setShardLatency(shard_id, latency)
+            self.appMetrics.setShardGuildCount(shard_id, counts.get(shard_id, 0))
+        self.appMetrics.setActiveServerCount(len(guilds))
+
+    def start(self):
+        """
+        Starts the background reporting task. Calling it again while it's running does nothing.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._reportForever())
+
+    async def _reportForever(self):
+        while True:
+            try:
+                self.report()
+            except Exception as error:
+                print("Failed to report shard metrics: ", error)
+            await asyncio.sleep(self.interval)
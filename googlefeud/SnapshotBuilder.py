@@ -0,0 +1,148 @@
+"""
+Builds the suggestion snapshot games are served from when SUGGESTION_SNAPSHOT_FILE is set, from the phrase bank.
+
+Phrases imported with their curated suggestions keep them, the others have their suggestions fetched and
+curated, --concurrency at a time. With --offline they are left out instead, and with --refetch every
+phrase is fetched again. Phrases left without suggestions aren't written.
+Run with `python -m googlefeud.SnapshotBuilder suggestions.snap`
+"""
+import argparse
+import asyncio
+import os
+from time import monotonic
+
+from googlefeud.AsyncGoogleFeudDB import AsyncGoogleFeudDB
+from googlefeud.BulkImport import PROGRESS_EVERY, bulkSuggestionClient
+from googlefeud.LoggerPrint import logger
+from googlefeud.SuggestionCache import normalizePhrase
+from googlefeud.SuggestionClient import SUGGEST_MAX_CONCURRENCY
+from googlefeud.SuggestionProvider import curate
+from googlefeud.SuggestionSnapshot import SUGGESTION_SNAPSHOT_FILE, writeSnapshot
+
+print = logger(print)
+
+SNAPSHOT_BUILD_CONCURRENCY = int(
+    os.getenv("SNAPSHOT_BUILD_CONCURRENCY", str(SUGGEST_MAX_CONCURRENCY))
+)
+
+
+class SnapshotReport:
+    def __init__(self):
+        self.phrases = 0
+        self.stored = 0
+        self.fetched = 0
+        self.failed = 0
+        self.empty = 0
+        self.written = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (
+            f"Wrote {self.written} of {self.phrases} phrases in {self.elapsed:.1f}s: "
+            f"{self.stored} with stored suggestions, {self.fetched} fetched, {self.failed} failed to fetch, "
+            f"{self.empty} without suggestions"
+        )
+
+
+async def buildSnapshot(
+    path,
+    gfeuddb,
+    fetch=None,
+    concurrency=SNAPSHOT_BUILD_CONCURRENCY,
+    refetch=False,
+    clock=monotonic,
+) -> SnapshotReport:
+    """
+    Writes the curated suggestions of every phrase in the bank to a snapshot at path.
+    fetch is a coroutine function that returns the lowercase phrase and the raw suggestions payload,
+    phrases without stored suggestions are left out when it's None.
+    """
+    report = SnapshotReport()
+    start_time = clock()
+    entries = {}
+    seen = set()
+    to_fetch = []
+    for record in await gfeuddb.getGoogleSearchPhrasesWithSuggestions() or []:
+        key = normalizePhrase(record["phrase"])
+        if key in seen:
+            continue
+        seen.add(key)
+        report.phrases += 1
+        if record.get("suggestions") and not refetch:
+            entries[key] = record["suggestions"]
+            report.stored += 1
+        elif fetch is not None:
+            to_fetch.append(key)
+        else:
+            report.empty += 1
+
+    pending = iter(to_fetch)
+
+    async def worker():
+        for key in pending:
+            try:
+                lower_phrase, suggestions = await fetch(key)
+                curated = curate(lower_phrase, suggestions)
+            except Exception as error:
+                print(f"Failed to fetch suggestions for '{key}': ", error)
+                report.failed += 1
+                continue
+
+            report.fetched += 1
+            if report.fetched % PROGRESS_EVERY == 0:
+                print(f"Fetched {report.fetched}/{len(to_fetch)} phrases")
+            if len(curated) == 0:
+                report.empty += 1
+            else:
+                entries[key] = curated
+
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+
+    report.written = writeSnapshot(path, entries.items())
+    report.elapsed = clock() - start_time
+    return report
+
+
+async def main(args):
+    client = None
+    if not args.offline:
+        client = bulkSuggestionClient(args.concurrency)
+    try:
+        report = await buildSnapshot(
+            args.output,
+            AsyncGoogleFeudDB(None, None),
+            client.fetch if client else None,
+            concurrency=args.concurrency,
+            refetch=args.refetch,
+        )
+    finally:
+        if client:
+            await client.close()
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "output",
+        nargs="?",
+        default=SUGGESTION_SNAPSHOT_FILE or "suggestions.snap",
+        help="file to write the snapshot to",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=SNAPSHOT_BUILD_CONCURRENCY,
+        help="suggestion requests in flight at once",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="leave out the phrases without stored suggestions instead of fetching them",
+    )
+    parser.add_argument(
+        "--refetch",
+        action="store_true",
+        help="fetch the suggestions of every phrase, even the ones stored with it",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from googlefeud.AsyncGoogleFeudDB import getExecutor
+from googlefeud.LoggerPrint import logger
+from googlefeud.MongoConnection import getConnectionManager
+
+print = logger(print)
+
+SUGGESTION_CACHE_SIZE = int(os.getenv("SUGGESTION_CACHE_SIZE", "5000"))
+SUGGESTION_CACHE_TTL = float(os.getenv("SUGGESTION_CACHE_TTL", str(7 * 24 * 60 * 60)))
+SUGGESTION_CACHE_STORE = os.getenv("SUGGESTION_CACHE_STORE", "")
+SUGGESTION_CACHE_FILE = os.getenv("SUGGESTION_CACHE_FILE", "suggestion_cache.jsonl")
+# Phrases kept in the cache file, the least recently written are dropped when it's compacted
+SUGGESTION_CACHE_FILE_SIZE = int(os.getenv("SUGGESTION_CACHE_FILE_SIZE", "100000"))
+
+
+def normalizePhrase(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+class FileSuggestionStore:
+    """
+    Persistent cache tier kept in a JSON lines file. Entries are appended, the last one for a phrase wins.
+    Only the max_entries most recently written phrases are kept. The file is rewritten with just those
+    when it's loaded with older lines in it, and once it holds twice as many lines as kept phrases.
+    """
+
+    def __init__(self, path=SUGGESTION_CACHE_FILE, max_entries=SUGGESTION_CACHE_FILE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lines = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    self.lines += 1
+                    try:
+                        entry = json.loads(line)
+                        self._put(entry["phrase"], entry["suggestions"], entry["expires_at"])
+                    except (ValueError, KeyError) as error:
+                        print("Skipping unreadable suggestion cache entry: ", error)
+            if self.lines > len(self.entries):
+                self._compact()
+
+    def _put(self, phrase, suggestions, expires_at):
+        self.entries[phrase] = (suggestions, expires_at)
+        self.entries.move_to_end(phrase)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _compact(self):
+        """
+        Rewrites the file with one line per kept phrase, oldest first
+        """
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as file:
+            for phrase, (suggestions, expires_at) in self.entries.items():
+                entry = {"phrase": phrase, "suggestions": suggestions, "expires_at": expires_at}
+                file.write(json.dumps(entry) + "\n")
+        os.replace(temporary_path, self.path)
+        self.lines = len(self.entries)
+
+    def get(self, phrase):
+        return self.entries.get(phrase)
+
+    def set(self, phrase, suggestions, expires_at):
+        entry = {"phrase": phrase, "suggestions": suggestions, "expires_at": expires_at}
+        with self._lock:
+            self._put(phrase, suggestions, expires_at)
+            with open(self.path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+            self.lines += 1
+            if self.lines > 2 * max(len(self.entries), 1):
+                self._compact()
+
+
+class MongoSuggestionStore:
+    """
+    Persistent cache tier kept in the suggestioncache collection
+    """
+
+    def __init__(self, db=None):
+        self.db = db if db is not None else getConnectionManager().getDatabase()
+
+    def get(self, phrase):
+        try:
+            entry = self.db.suggestioncache.find_one({"phrase": phrase})
+            if entry:
+                return (entry["suggestions"], entry["expires_at"])
+        except Exception as error:
+            print("Failed to read cached suggestions: ", error)
+
+    def set(self, phrase, suggestions, expires_at):
+        try:
+            self.db.suggestioncache.update_one(
+                {"phrase": phrase},
+                {"$set": {"suggestions": suggestions, "expires_at": expires_at}},
+                upsert=True,
+            )
+        except Exception as error:
+            print("Failed to cache suggestions: ", error)
+
+
+class SuggestionCache:
+    """
+    LRU cache of curated suggestion lists keyed by normalized phrase.
+    Entries expire after ttl seconds, and are kept until they're evicted in case no source can give
+    fresh ones. When a store is given, misses fall through to it and new entries are written to it
+    so the cache survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_size=SUGGESTION_CACHE_SIZE,
+        ttl=SUGGESTION_CACHE_TTL,
+        store=None,
+        clock=time.time,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def _getFromMemory(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        suggestions, expires_at = entry
+        if expires_at <= self.clock():
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return suggestions
+
+    def _putInMemory(self, key, suggestions, expires_at):
+        self.entries[key] = (suggestions, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _runOnStore(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(getExecutor(), func, *args)
+
+    async def get(self, phrase):
+        """
+        Returns the curated suggestions for phrase, or None when they aren't cached
+        """
+        key = normalizePhrase(phrase)
+        suggestions = self._getFromMemory(key)
+        if suggestions is None and self.store is not None:
+            entry = await self._runOnStore(self.store.get, key)
+            if entry is not None and entry[1] > self.clock():
+                suggestions = entry[0]
+                self._putInMemory(key, suggestions, entry[1])
+        if suggestions is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(suggestions)
+
+    async def getStale(self, phrase):
+        """
+        Returns the curated suggestions for phrase even when they expired, or None when they aren't cached
+        """
+        key = normalizePhrase(phrase)
+        entry = self.entries.get(key)
+        if entry is None and self.store is not None:
+            entry = await self._runOnStore(self.store.get, key)
+        if entry is None:
+            return None
+        self.stale_hits += 1
+        return list(entry[0])
+
+    async def set(self, phrase, suggestions):
+        key = normalizePhrase(phrase)
+        expires_at = self.clock() + self.ttl
+        self._putInMemory(key, list(suggestions), expires_at)
+        if self.store is not None:
+            await self._runOnStore(self.store.set, key, list(suggestions), expires_at)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+        }
+
+
+_suggestion_cache = None
+
+
+def getSuggestionCache() -> SuggestionCache:
+    """
+    Returns the process-wide suggestion cache, backed by the store named in SUGGESTION_CACHE_STORE
+    """
+    global _suggestion_cache
+    if _suggestion_cache is None:
+        store = None
+        if SUGGESTION_CACHE_STORE == "mongo":
+            store = MongoSuggestionStore()
+        elif SUGGESTION_CACHE_STORE == "file":
+            store = FileSuggestionStore()
+        _suggestion_cache = SuggestionCache(store=store)
+    return _suggestion_cache
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import random
+from time import monotonic
+
+import aiohttp
+from fake_useragent import UserAgent
+
+from googlefeud.CircuitBreaker import CircuitBreaker, CircuitOpenError
+
+SUGGEST_URL = os.getenv(
+    "SUGGEST_URL", "http://suggestqueries.google.com/complete/search"
+)
+SUGGEST_MAX_CONNECTIONS = int(os.getenv("SUGGEST_MAX_CONNECTIONS", "20"))
+SUGGEST_MAX_CONCURRENCY = int(os.getenv("SUGGEST_MAX_CONCURRENCY", "10"))
+SUGGEST_CONNECT_TIMEOUT = float(os.getenv("SUGGEST_CONNECT_TIMEOUT", "2"))
+# Longest wait for the next bytes of a response
+SUGGEST_READ_TIMEOUT = float(os.getenv("SUGGEST_READ_TIMEOUT", "3"))
+SUGGEST_TIMEOUT = float(os.getenv("SUGGEST_TIMEOUT", "5"))
+# Seconds without an answer before the same request is sent again, 0 to never hedge
+SUGGEST_HEDGE_DELAY = float(os.getenv("SUGGEST_HEDGE_DELAY", "1"))
+SUGGEST_RETRIES = int(os.getenv("SUGGEST_RETRIES", "1"))
+# The wait before retry n is drawn between 0 and SUGGEST_RETRY_BACKOFF * 2^n seconds
+SUGGEST_RETRY_BACKOFF = float(os.getenv("SUGGEST_RETRY_BACKOFF", "0.2"))
+# Failed fetches in a row that open the circuit breaker, 0 to never open it
+SUGGEST_BREAKER_FAILURES = int(os.getenv("SUGGEST_BREAKER_FAILURES", "5"))
+# Seconds the breaker stays open before letting a trial request through
+SUGGEST_BREAKER_RESET = float(os.getenv("SUGGEST_BREAKER_RESET", "30"))
+
+
+class SuggestionClient:
+    """
+    Fetches auto-complete suggestions over a persistent, keep-alive connection pool.
+    Every request has connect, read and total deadlines and at most max_concurrency requests are in
+    flight at once, so a slow upstream only delays the channels that are waiting on it.
+    A request that hasn't answered after hedge_delay seconds is sent a second time and the first answer
+    wins. A failed fetch is retried up to retries times after a random backoff, unless it was throttled.
+    The total deadline covers the whole fetch, every attempt and hedge included.
+    After breaker_failures failed fetches in a row the circuit breaker opens and fetches fail right away,
+    so games fall back to the other suggestion providers until a trial request succeeds.
+    """
+
+    def __init__(
+        self,
+        url=SUGGEST_URL,
+        max_connections=SUGGEST_MAX_CONNECTIONS,
+        max_concurrency=SUGGEST_MAX_CONCURRENCY,
+        connect_timeout=SUGGEST_CONNECT_TIMEOUT,
+        timeout=SUGGEST_TIMEOUT,
+        appMetrics=None,
+        read_timeout=SUGGEST_READ_TIMEOUT,
+        hedge_delay=SUGGEST_HEDGE_DELAY,
+        retries=SUGGEST_RETRIES,
+        retry_backoff=SUGGEST_RETRY_BACKOFF,
+        breaker_failures=SUGGEST_BREAKER_FAILURES,
+        breaker_reset=SUGGEST_BREAKER_RESET,
+        clock=monotonic,
+    ):
+        self.url = url
+        self.appMetrics = appMetrics
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout, connect=connect_timeout, sock_read=read_timeout
+        )
+        self.hedge_delay = hedge_delay
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = None
+        if breaker_failures > 0:
+            self.breaker = CircuitBreaker(breaker_failures, breaker_reset, clock)
+        self.random = random.Random()
+        self.hedged = 0
+        self.retried = 0
+        self.rejected = 0
+        self._user_agent = UserAgent()
+        self._session = None
+        self._semaphore = None
+
+    def _getSession(self) -> aiohttp.ClientSession:
+        """
+        The session and semaphore are created on first use so they belong to the running event loop
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=self.timeout,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _recordBreakerState(self):
+        if self.appMetrics and self.breaker is not None:
+            self.appMetrics.setSuggestionBreakerState(self.breaker.state)
+
+    async def fetch(self, phrase):
+        """
+        Returns the lowercase phrase and the raw suggestions payload, ['<query>', ['<suggestion>', ...]]
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("Suggestion requests are paused after repeated failures")
+        self._recordBreakerState()
+        params = {"output": "firefox", "q": phrase + " "}
+        try:
+            suggestions = await asyncio.wait_for(
+                self._fetchWithRetries(params), self.timeout.total
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.recordFailure()
+                self._recordBreakerState()
+            raise
+        if self.breaker is not None:
+            self.breaker.recordSuccess()
+            self._recordBreakerState()
+        return (phrase.lower(), suggestions)
+
+    async def _fetchWithRetries(self, params):
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(self.random.uniform(0, self.retry_backoff * 2 ** attempt))
+                self.retried += 1
+                if self.appMetrics:
+                    self.appMetrics.suggestionRequestRepeated("retry")
+            try:
+                return await self._hedgedRequest(params)
+            except aiohttp.ClientResponseError as error:
+                # Asking again right away only gets us throttled for longer
+                if error.status == 429 or attempt == self.retries:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                if attempt == self.retries:
+                    raise
+
+    async def _hedgedRequest(self, params):
+        """
+        Sends the request, and sends it again when it hasn't answered after hedge_delay seconds.
+        Returns the first answer and cancels the other request.
+        """
+        requests = {asyncio.create_task(self._request(params))}
+        try:
+            if self.hedge_delay > 0:
+                done, _ = await asyncio.wait(requests, timeout=self.hedge_delay)
+                if not done:
+                    self.hedged += 1
+                    if self.appMetrics:
+                        self.appMetrics.suggestionRequestRepeated("hedge")
+                    requests.add(asyncio.create_task(self._request(params)))
+            error = None
+            while requests:
+                done, requests = await asyncio.wait(
+                    requests, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Every finished request's error is looked at, so none is logged as never retrieved
+                errors = [request.exception() for request in done]
+                for request, request_error in zip(done, errors):
+                    if request_error is None:
+                        return request.result()
+                    error = request_error
+            raise error
+        finally:
+            for request in requests:
+                request.cancel()
+
+    async def _request(self, params):
+        session = self._getSession()
+        headers = {"user-agent": self._user_agent.random}
+        async with self._semaphore:
+            start_time = monotonic()
+            outcome = "error"
+            try:
+                async with session.get(
+                    self.url, params=params, headers=headers
+                ) as response:
+                    response.raise_for_status()
+                    text = await response.text()
+                # Error pages are served with a 200 too
+                suggestions = json.loads(text)
+                if not isinstance(suggestions, list) or len(suggestions) < 2:
+                    raise ValueError(f"Unexpected suggestions payload: {text[:100]}")
+                outcome = "ok"
+                return suggestions
+            except aiohttp.ClientResponseError as error:
+                outcome = "throttled" if error.status == 429 else "error"
+                raise
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                if self.appMetrics:
+                    self.appMetrics.recordSuggestionRequest(
+                        outcome, monotonic() - start_time
+                    )
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.state if self.breaker is not None else None,
+            "hedged": self.hedged,
+            "retried": self.retried,
+            "rejected": self.rejected,
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_suggestion_client = None
+
+
+def getSuggestionClient() -> SuggestionClient:
+    """
+    Returns the process-wide suggestion client
+    """
+    global _suggestion_client
+    if _suggestion_client is None:
+        _suggestion_client = SuggestionClient()
+    return _suggestion_client
@@ -0,0 +1,331 @@
+import asyncio
+import os
+import random
+from time import monotonic
+
+from googlefeud.LoggerPrint import logger
+from googlefeud.SuggestionCache import getSuggestionCache, normalizePhrase
+from googlefeud.SuggestionClient import getSuggestionClient
+from googlefeud.SuggestionSnapshot import openSnapshot
+
+print = logger(print)
+
+# Providers asked for a phrase's suggestions, in order, until one has them
+SUGGESTION_PROVIDERS = os.getenv("SUGGESTION_PROVIDERS", "cache,snapshot,http")
+
+meaningless_phrases = ["a", "the", "of", "by", "so", "too", "your", "me", "my"]
+meaningless_words = frozenset(meaningless_phrases)
+
+# Words the fake provider draws its suggestions from
+FAKE_WORDS = [
+    "sneezing",
+    "purring",
+    "hiding",
+    "biting",
+    "staring",
+    "shedding",
+    "scratching",
+    "yawning",
+    "limping",
+    "sleeping",
+    "meowing",
+    "drooling",
+]
+
+
+def trimSuggestions(lower_phrase, suggestions):
+    """
+    Removes the first section of the sentence where the phrase begins from every auto-complete suggestion.
+    Don't include suggestions where the phrase is not found and cutting off the first section results in the empty string.
+    e.g. suggestion = 'people are strange', phrase = 'people are' -> cleaned_suggestion = 'strange'
+    """
+    cleaned_suggestions = []
+    for suggestion in suggestions[1]:
+        start = suggestion.find(lower_phrase)
+        if start == -1:
+            continue
+        cleaned_suggestion = suggestion[start + len(lower_phrase) :].strip()
+        if len(cleaned_suggestion) > 0:
+            cleaned_suggestions.append(cleaned_suggestion)
+    return cleaned_suggestions
+
+
+def removeDuplicatesFromSuggestions(cleaned_suggestions):
+    """
+    Removes duplicate words from every suggestion.
+    A suggestion is filtered out if any of its words appears in a higher priority suggestion,
+    whether or not that suggestion was kept.
+    If the word that is duplicated is something like 'a', 'of', 'the', then don't remove it.
+    e.g. Comparing 10.'cool cats' and 9.'cool', 'cool cats' is removed because 'cool' = 'cool' and 9 has higher priority than 10
+    Every word is looked up in a set of the words seen so far, so this is linear in the number of words.
+    Returns the kept suggestions and a copy of all of them, both in priority order.
+    """
+    new_cleaned_suggestions = []
+    seen_words = set()
+
+    for suggestion in cleaned_suggestions:
+        words = [
+            word for word in suggestion.split(" ") if not word in meaningless_words
+        ]
+        if seen_words.isdisjoint(words):
+            new_cleaned_suggestions.append(suggestion)
+        seen_words.update(words)
+
+    return (new_cleaned_suggestions, cleaned_suggestions[:])
+
+
+def curate(lower_phrase, suggestions) -> list:
+    cleaned_suggestions = trimSuggestions(lower_phrase, suggestions)
+    return removeDuplicatesFromSuggestions(cleaned_suggestions)[0]
+
+
+class SuggestionProvider:
+    """
+    Source of curated suggestion lists. suggest returns the curated suggestions of a phrase, or None
+    when the source doesn't have them, and counts and times every call under the provider's name.
+    Answers of live providers are fetched as they're asked for and are worth caching, the ones of
+    stale providers may be out of date and are worth refreshing in the background.
+    """
+
+    name = ""
+    live = False
+    stale = False
+
+    def __init__(self, appMetrics=None):
+        self.appMetrics = appMetrics
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.time = 0.0
+
+    async def suggest(self, phrase):
+        start_time = monotonic()
+        outcome = "error"
+        try:
+            suggestions = await self._suggest(phrase)
+            outcome = "miss" if suggestions is None else "hit"
+        finally:
+            elapsed = monotonic() - start_time
+            self.time += elapsed
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "miss":
+                self.misses += 1
+            else:
+                self.errors += 1
+            if self.appMetrics:
+                self.appMetrics.recordSuggestionProvider(self.name, outcome, elapsed)
+        return suggestions
+
+    async def _suggest(self, phrase):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        calls = self.hits + self.misses + self.errors
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "mean_ms": round(self.time / calls * 1000, 3) if calls else None,
+        }
+
+
+class HttpProvider(SuggestionProvider):
+    """
+    Fetches the auto-complete suggestions of Google and curates them.
+    fetch is a coroutine function that returns the lowercase phrase and the raw suggestions payload.
+    """
+
+    name = "http"
+    live = True
+
+    def __init__(self, fetch, appMetrics=None):
+        super().__init__(appMetrics)
+        self.fetch = fetch
+
+    async def _suggest(self, phrase):
+        lower_phrase, suggestions = await self.fetch(phrase)
+
+        cleaned_suggestions = trimSuggestions(lower_phrase, suggestions)
+        (
+            cleaned_suggestions,
+            reversed_suggestions,
+        ) = removeDuplicatesFromSuggestions(cleaned_suggestions)
+
+        if len(cleaned_suggestions) == 0:
+            print(
+                f"No suggestions left for '{phrase}', Original suggestions: ",
+                suggestions[1],
+                " Removed duplicates: ",
+                reversed_suggestions,
+            )
+        return cleaned_suggestions
+
+
+class CacheProvider(SuggestionProvider):
+    """
+    Answers from a SuggestionCache, which the chain fills with the answers of live providers
+    """
+
+    name = "cache"
+
+    def __init__(self, cache, appMetrics=None):
+        super().__init__(appMetrics)
+        self.cache = cache
+
+    async def _suggest(self, phrase):
+        return await self.cache.get(phrase)
+
+
+class SnapshotProvider(SuggestionProvider):
+    """
+    Answers from a SuggestionSnapshot built by googlefeud.SnapshotBuilder
+    """
+
+    name = "snapshot"
+    stale = True
+
+    def __init__(self, snapshot, appMetrics=None):
+        super().__init__(appMetrics)
+        self.snapshot = snapshot
+
+    async def _suggest(self, phrase):
+        return self.snapshot.get(normalizePhrase(phrase))
+
+
+class FakeProvider(SuggestionProvider):
+    """
+    Local stand-in for Google in tests and benchmarks. Every phrase gets count words of words,
+    drawn with the phrase as the seed so it always gets the same ones, after latency seconds.
+    """
+
+    name = "fake"
+    live = True
+
+    def __init__(self, words=FAKE_WORDS, count=8, latency=0.0, appMetrics=None):
+        super().__init__(appMetrics)
+        self.words = words
+        self.count = count
+        self.latency = latency
+
+    async def _suggest(self, phrase):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        rng = random.Random(normalizePhrase(phrase))
+        return rng.sample(self.words, min(self.count, len(self.words)))
+
+
+class ChainProvider:
+    """
+    Asks its providers for a phrase's suggestions in order, fastest first, and returns the first answer.
+    A provider that fails is skipped. When none had an answer and one failed, like Google being down or
+    its circuit breaker being open, expired suggestions still in the cache are served, and the error is
+    only raised when there are none.
+    Answers of live providers are cached in the chain's cache provider, if it has one. Phrases answered
+    by a stale provider are handed to refresher, when there is one, to be fetched again in the background.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+        self.cache = next(
+            (provider.cache for provider in providers if isinstance(provider, CacheProvider)), None
+        )
+        self.refresher = None
+
+    async def suggest(self, phrase) -> list:
+        """
+        Returns the curated suggestions for phrase, empty when no provider has any
+        """
+        error = None
+        for provider in self.providers:
+            try:
+                suggestions = await provider.suggest(phrase)
+            except Exception as provider_error:
+                print(f"The {provider.name} suggestion provider failed for '{phrase}': ", provider_error)
+                error = provider_error
+                continue
+            if suggestions is None:
+                continue
+            if provider.live:
+                await self._cache(phrase, suggestions)
+            elif provider.stale and self.refresher is not None:
+                self.refresher.schedule(phrase)
+            return suggestions
+        if error is not None:
+            if self.cache is not None:
+                suggestions = await self.cache.getStale(phrase)
+                if suggestions is not None:
+                    return suggestions
+            raise error
+        return []
+
+    async def refresh(self, phrase) -> list:
+        """
+        Returns the suggestions of the first live provider with an answer for phrase, and caches them
+        """
+        error = None
+        for provider in self.providers:
+            if not provider.live:
+                continue
+            try:
+                suggestions = await provider.suggest(phrase)
+            except Exception as provider_error:
+                error = provider_error
+                continue
+            if suggestions is not None:
+                await self._cache(phrase, suggestions)
+                return suggestions
+        if error is not None:
+            raise error
+        return []
+
+    async def _cache(self, phrase, suggestions):
+        if self.cache is not None and len(suggestions) > 0:
+            await self.cache.set(phrase, suggestions)
+
+    def stats(self) -> dict:
+        return {provider.name: provider.stats() for provider in self.providers}
+
+
+def buildSuggestionProvider(names, appMetrics=None) -> ChainProvider:
+    """
+    Chains the providers named in names, of cache, snapshot, http and fake. The snapshot is left out
+    when SUGGESTION_SNAPSHOT_FILE doesn't name one that can be opened.
+    """
+    providers = []
+    for name in names:
+        name = name.strip()
+        if name == "cache":
+            providers.append(CacheProvider(getSuggestionCache(), appMetrics))
+        elif name == "snapshot":
+            snapshot = openSnapshot()
+            if snapshot is not None:
+                providers.append(SnapshotProvider(snapshot, appMetrics))
+        elif name == "http":
+            providers.append(HttpProvider(getSuggestionClient().fetch, appMetrics))
+        elif name == "fake":
+            providers.append(FakeProvider(appMetrics=appMetrics))
+        elif name:
+            raise ValueError(f"Unknown suggestion provider '{name}'")
+    return ChainProvider(providers)
+
+
+_suggestion_provider = None
+
+
+def getSuggestionProvider() -> ChainProvider:
+    """
+    Returns the process-wide chain of the providers named in SUGGESTION_PROVIDERS
+    """
+    global _suggestion_provider
+    if _suggestion_provider is None:
+        _suggestion_provider = buildSuggestionProvider(SUGGESTION_PROVIDERS.split(","))
+    return _suggestion_provider
+
+
+def setSuggestionProvider(provider):
+    """
+    Replaces the process-wide provider, to run the bot against other sources
+    """
+    global _suggestion_provider
+    _suggestion_provider = provider
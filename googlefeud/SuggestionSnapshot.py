@@ -0,0 +1,206 @@
+import asyncio
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from hashlib import blake2b
+from time import monotonic
+
+from googlefeud.LoggerPrint import logger
+
+print = logger(print)
+
+# Snapshot of curated suggestions built by `python -m googlefeud.SnapshotBuilder`, none when empty
+SUGGESTION_SNAPSHOT_FILE = os.getenv("SUGGESTION_SNAPSHOT_FILE", "")
+# Fetch the phrases served from the snapshot again in the background, "false" to never call Google
+SUGGESTION_SNAPSHOT_REFRESH = os.getenv("SUGGESTION_SNAPSHOT_REFRESH", "true").lower() == "true"
+# Seconds before a phrase refreshed in the background is refreshed again
+SUGGESTION_SNAPSHOT_REFRESH_INTERVAL = float(
+    os.getenv("SUGGESTION_SNAPSHOT_REFRESH_INTERVAL", str(24 * 60 * 60))
+)
+# Seconds between two background refreshes, so they don't compete with games for the request budget
+SUGGESTION_SNAPSHOT_REFRESH_DELAY = float(os.getenv("SUGGESTION_SNAPSHOT_REFRESH_DELAY", "1"))
+
+MAGIC = b"GFSNAP01"
+# Magic, number of phrases and a reserved word keeping the hashes 8-byte aligned
+HEADER = struct.Struct("<8sII")
+SLOT = struct.Struct("<II")
+
+
+def phraseHash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def writeSnapshot(path, entries) -> int:
+    """
+    Writes the (key, suggestions) pairs of entries to a snapshot at path and returns how many were written.
+    Keys are looked up as given, so they should be normalized phrases. The file is written next to path
+    and renamed over it, so a running bot keeps reading the snapshot it opened.
+
+    Layout, little-endian: the header, the sorted 8-byte hashes of the keys, an (offset, length) slot
+    per hash and the records, each the key and its suggestions joined by newlines in UTF-8.
+    """
+    records = []
+    for key, suggestions in entries:
+        record = "\n".join([key] + list(suggestions)).encode("utf-8")
+        records.append((phraseHash(key), record))
+    records.sort(key=lambda entry: entry[0])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(records), 0))
+        file.write(struct.pack(f"<{len(records)}Q", *[hash for hash, _ in records]))
+        offset = 0
+        for _, record in records:
+            file.write(SLOT.pack(offset, len(record)))
+            offset += len(record)
+        if offset >= 1 << 32:
+            raise ValueError(f"Snapshot records take {offset} bytes, more than 4 GiB")
+        for _, record in records:
+            file.write(record)
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class SuggestionSnapshot:
+    """
+    Read-only map of normalized phrase to curated suggestions, memory-mapped from a file written by
+    writeSnapshot. Opening it doesn't read the records, a lookup is a binary search over the hashes
+    and reads one record, so only the pages that are looked up are loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} isn't a suggestion snapshot")
+        slots_at = HEADER.size + 8 * self.count
+        self._records_at = slots_at + SLOT.size * self.count
+        self._view = memoryview(self._map)
+        # Native casts, the file is little-endian like the machines the bot runs on
+        self._hashes = self._view[HEADER.size : slots_at].cast("Q")
+        self._slots = self._view[slots_at : self._records_at].cast("I")
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        """
+        Returns the suggestions stored for the normalized phrase key, or None when it isn't in the snapshot
+        """
+        hash = phraseHash(key)
+        index = bisect_left(self._hashes, hash)
+        # Keys whose hashes collide are stored next to each other
+        while index < self.count and self._hashes[index] == hash:
+            offset = self._records_at + self._slots[2 * index]
+            record = self._map[offset : offset + self._slots[2 * index + 1]].decode("utf-8")
+            lines = record.split("\n")
+            if lines[0] == key:
+                return lines[1:]
+            index += 1
+        return None
+
+    def close(self):
+        for view in [getattr(self, name, None) for name in ("_hashes", "_slots", "_view")]:
+            if view is not None:
+                view.release()
+        self._map.close()
+        self._file.close()
+
+
+class SnapshotRefresher:
+    """
+    Fetches the phrases served from the snapshot again in the background, one every delay seconds,
+    so the cache ends up with live suggestions without a game ever waiting on Google.
+    refresh is a coroutine function fetching, curating and caching the suggestions of a phrase.
+    A phrase is refreshed at most once every interval seconds, and at most max_pending wait their turn.
+    """
+
+    def __init__(
+        self,
+        refresh,
+        delay=SUGGESTION_SNAPSHOT_REFRESH_DELAY,
+        interval=SUGGESTION_SNAPSHOT_REFRESH_INTERVAL,
+        max_pending=1000,
+        clock=monotonic,
+    ):
+        self.refresh = refresh
+        self.delay = delay
+        self.interval = interval
+        self.max_pending = max_pending
+        self.clock = clock
+        self.pending = deque()
+        # When each phrase was last scheduled, oldest first
+        self.scheduled_at = OrderedDict()
+        self.refreshed = 0
+        self.failed = 0
+        self._wake = None
+        self._task = None
+
+    def schedule(self, phrase):
+        """
+        Queues phrase to be refreshed unless it was recently or the queue is full
+        """
+        now = self.clock()
+        while self.scheduled_at and next(iter(self.scheduled_at.values())) <= now - self.interval:
+            self.scheduled_at.popitem(last=False)
+        if phrase in self.scheduled_at or len(self.pending) >= self.max_pending:
+            return
+        self.scheduled_at[phrase] = now
+        self.pending.append(phrase)
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        """
+        Starts the background refresh task. Calling it again while it's running does nothing.
+        """
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._wake.set()
+            self._task = asyncio.create_task(self._refreshForever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refreshForever(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while len(self.pending) > 0:
+                phrase = self.pending.popleft()
+                try:
+                    await self.refresh(phrase)
+                    self.refreshed += 1
+                except Exception as error:
+                    print(f"Failed to refresh the suggestions of '{phrase}': ", error)
+                    self.failed += 1
+                await asyncio.sleep(self.delay)
+
+
+def openSnapshot(path=SUGGESTION_SNAPSHOT_FILE):
+    """
+    Returns the snapshot at path, or None when there's no path or it can't be opened
+    """
+    if not path:
+        return None
+    try:
+        snapshot = SuggestionSnapshot(path)
+    except (OSError, ValueError) as error:
+        print(f"Failed to open the suggestion snapshot {path}: ", error)
+        return None
+    print(f"Serving suggestions of {len(snapshot)} phrases from {path}")
+    return snapshot
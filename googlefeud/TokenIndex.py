@@ -0,0 +1,66 @@
+import os
+import re
+
+# Folds plurals so "cats" matches "cat" and "watches" matches "watch"
+GUESS_FOLD_PLURALS = os.getenv("GUESS_FOLD_PLURALS", "false").lower() in ["1", "true", "yes"]
+
+word_pattern = re.compile(r"\w+")
+
+
+def normalizeTokens(text, ignored=(), fold_plurals=False) -> list:
+    """
+    Splits text into lower case words without punctuation, leaving out the ignored words
+    """
+    tokens = word_pattern.findall(text.lower().replace("'", ""))
+    tokens = [token for token in tokens if token not in ignored]
+    if fold_plurals:
+        tokens = [foldPlural(token) for token in tokens]
+    return tokens
+
+
+def foldPlural(token) -> str:
+    """
+    Cheap singular form of an English word. Only needs to fold a word and its plural to the same token.
+    """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ches", "shes", "sses", "xes", "zes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def buildTokenIndex(suggestions, ignored=(), fold_plurals=GUESS_FOLD_PLURALS) -> dict:
+    """
+    Maps every word of the suggestions to the suggestions containing it, in the order of suggestions.
+    The index is a plain dict so it can be stored with the session.
+    """
+    tokens = {}
+    for suggestion in suggestions:
+        for token in normalizeTokens(suggestion, ignored, fold_plurals):
+            matches = tokens.setdefault(token, [])
+            if len(matches) == 0 or matches[-1] != suggestion:
+                matches.append(suggestion)
+    return {"fold_plurals": fold_plurals, "tokens": tokens}
+
+
+def matchGuess(index, guess, ignored=()) -> list:
+    """
+    Returns the suggestions containing every meaningful word of the guess, in the order of suggestions
+    """
+    if guess.isalnum() and guess.islower():
+        # Already a single normalized word, the common guess
+        if guess in ignored:
+            return []
+        token = foldPlural(guess) if index["fold_plurals"] else guess
+        return index["tokens"].get(token, [])
+
+    tokens = normalizeTokens(guess, ignored, index["fold_plurals"])
+    if len(tokens) == 0:
+        return []
+    postings = [index["tokens"].get(token, []) for token in tokens]
+    if len(postings) == 1:
+        return postings[0]
+    common = set(postings[0]).intersection(*postings[1:])
+    return [suggestion for suggestion in postings[0] if suggestion in common]
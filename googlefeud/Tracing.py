@@ -0,0 +1,149 @@
+import contextvars
+import itertools
+import json
+import os
+from contextlib import contextmanager
+from time import perf_counter
+
+from googlefeud.LoggerPrint import logger
+
+print = logger(print)
+
+# Also write every span to this file in the Chrome trace event format, viewable in
+# chrome://tracing or https://ui.perfetto.dev. Empty to only export the stage histogram.
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+# Spans buffered in memory before they're appended to the trace file
+TRACE_FLUSH_EVENTS = int(os.getenv("TRACE_FLUSH_EVENTS", "256"))
+
+_current_span = contextvars.ContextVar("gfeud_current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ["trace_id", "span_id", "parent_id", "command", "name", "start", "token"]
+
+    def __init__(self, command, name, parent=None, start=0.0):
+        self.span_id = next(_span_ids)
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.parent_id = parent.span_id if parent is not None else None
+        self.command = command
+        self.name = name
+        self.start = start
+        self.token = None
+
+
+class Tracer:
+    """
+    Times the stages of every command. A trace is started for each command, and the stages run while
+    handling it record a span under it. Stage durations are exported as a histogram per command and stage,
+    and optionally written to a trace file.
+    Spans outside a command do nothing, so stages shared with background work cost nothing there.
+    """
+
+    def __init__(self, appMetrics=None, trace_file=TRACE_FILE, clock=perf_counter):
+        self.appMetrics = appMetrics
+        self.trace_file = trace_file
+        self.clock = clock
+        self._events = []
+        self._file_started = False
+
+    def startTrace(self, command) -> Span:
+        """
+        Starts the trace of a command. Spans started in the same task belong to it until endTrace.
+        """
+        trace = Span(command, command, start=self.clock())
+        trace.token = _current_span.set(trace)
+        return trace
+
+    def endTrace(self, trace: Span):
+        duration = self.clock() - trace.start
+        try:
+            _current_span.reset(trace.token)
+        except ValueError:
+            # Ended from another task than it was started in
+            pass
+        self._write(trace, duration)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Times the stage name of the current command
+        """
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.command, name, parent, self.clock())
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            duration = self.clock() - span.start
+            if self.appMetrics:
+                self.appMetrics.recordStage(span.command, name, duration)
+            self._write(span, duration)
+
+    def _write(self, span, duration):
+        if not self.trace_file:
+            return
+        self._events.append(
+            {
+                "name": span.name,
+                "cat": span.command,
+                "ph": "X",
+                "ts": round(span.start * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "pid": os.getpid(),
+                "tid": span.trace_id,
+                "args": {"span_id": span.span_id, "parent_id": span.parent_id},
+            }
+        )
+        if len(self._events) >= TRACE_FLUSH_EVENTS:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered spans to the trace file
+        """
+        if not self.trace_file or len(self._events) == 0:
+            return
+        events, self._events = self._events, []
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as file:
+                # The JSON array format allows the closing bracket to be missing, so the file can
+                # keep growing across flushes and restarts
+                if not self._file_started and file.tell() == 0:
+                    file.write("[\n")
+                self._file_started = True
+                file.writelines(json.dumps(event) + ",\n" for event in events)
+        except Exception as error:
+            print("Failed to write trace file: ", error)
+
+
+_tracer = None
+
+
+def getTracer() -> Tracer:
+    """
+    Returns the process-wide tracer
+    """
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def detachTrace():
+    """
+    Stops the current task from recording spans under the command that created it.
+    Call it first in background tasks started while handling a command.
+    """
+    _current_span.set(None)
+
+
+def span(name):
+    """
+    Times the stage name of the current command with the process-wide tracer
+    """
+    return getTracer().span(name)
@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import os
 import re
 import traceback
@@ -9,13 +10,34 @@ from discord.ext import commands
 from discord.ext.commands import CommandNotFound, MissingRequiredArgument
 from dotenv import load_dotenv
 from prometheus_client import start_http_server
-
-from googlefeud.AppMetrics import AppMetrics
-from googlefeud.GoogleFeud import GoogleFeud
+from pymongo import monitoring
+
+from googlefeud.AppMetrics import AppMetrics, MongoLatencyListener, RateLimitLogHandler
+from googlefeud.AsyncGoogleFeudDB import AsyncGoogleFeudDB, getExecutor
+from googlefeud.BoardMessage import BoardMessages
+from googlefeud.ChannelActor import ChannelActors
+from googlefeud.GamePool import GamePool
+from googlefeud.GoogleFeud import GoogleFeud, prepareGame, sessionKey
 from googlefeud.LoggerPrint import logger
+from googlefeud.Migrations import checkIndexes
+from googlefeud.OutboundScheduler import CRITICAL, INFO, getOutboundScheduler, isScheduledCall
+from googlefeud.PhraseDeck import getPhraseBank
+from googlefeud.SessionStore import getSessionStore
+from googlefeud.Sharding import ShardMonitor, shardConfig
+from googlefeud.SuggestionClient import getSuggestionClient
+from googlefeud.SuggestionProvider import (
+    SUGGESTION_PROVIDERS,
+    buildSuggestionProvider,
+    getSuggestionProvider,
+    setSuggestionProvider,
+)
+from googlefeud.SuggestionSnapshot import SUGGESTION_SNAPSHOT_REFRESH, SnapshotRefresher
+from googlefeud.Tracing import getTracer, span
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+# 0 leaves serving the metrics to the cluster supervisor
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9001"))
 
 SUPPORT_SERVER_URL = "https://discord.com/invite/xX5mk8Esg3"
 
@@ -24,17 +46,77 @@ help_command = commands.DefaultHelpCommand(no_category="Google Feud")
 intents = discord.Intents.default()
 intents.message_content = True
 
-bot = commands.Bot(
+# Every shard connected by this process shares its event loop, session store and game pool
+bot = commands.AutoShardedBot(
     command_prefix=["gfeud ", "gf ", "Gf ", "gF ", "GF "],
     description="Google Feud is a game much like Family Feud, except the phrases on the wall are Google's auto-complete suggestions. Guess what the auto-completes are for a given phrase to win the game!",
     help_command=help_command,
     case_insensitive=True,
     intents=intents,
+    **shardConfig(),
 )
 
 print = logger(print)
 
 appMetrics = AppMetrics()
+# Registered before the Mongo client is created so every command is timed
+monitoring.register(MongoLatencyListener(appMetrics))
+getSuggestionClient().appMetrics = appMetrics
+setSuggestionProvider(buildSuggestionProvider(SUGGESTION_PROVIDERS.split(","), appMetrics))
+getTracer().appMetrics = appMetrics
+# discord.py waits out 429s on its own and only logs them
+logging.getLogger("discord.http").addHandler(RateLimitLogHandler(appMetrics))
+getOutboundScheduler().appMetrics = appMetrics
+boardMessages = BoardMessages(appMetrics, outbound=getOutboundScheduler())
+shardMonitor = ShardMonitor(bot, appMetrics)
+
+
+class GFeudContext(commands.Context):
+    """
+    Command context that queues every message on the channel's outbound queue and times it
+    """
+
+    async def send(self, *args, priority=INFO, **kwargs):
+        if isScheduledCall():
+            return await self._timedSend(*args, **kwargs)
+        return await getOutboundScheduler().submit(
+            sessionKey(self), lambda: self._timedSend(*args, **kwargs), priority
+        )
+
+    async def _timedSend(self, *args, **kwargs):
+        start_time = monotonic()
+        appMetrics.discordApiCall(self, "send")
+        try:
+            with span("discord_send"):
+                return await super().send(*args, **kwargs)
+        finally:
+            appMetrics.recordDiscordSend(self, monotonic() - start_time)
+
+
+# The phrase bank isn't tied to a guild or channel
+phraseBankDB = AsyncGoogleFeudDB(None, None)
+# The pool takes its phrases from a deck of its own, channels only take the games they haven't played
+gamePool = GamePool(
+    lambda: prepareGame(getPhraseBank().deck(None).draw(), getSuggestionProvider()),
+    appMetrics=appMetrics,
+)
+# Phrases served from the suggestion snapshot are fetched again in the background, games never wait on it
+snapshotRefresher = SnapshotRefresher(getSuggestionProvider().refresh)
+if SUGGESTION_SNAPSHOT_REFRESH:
+    getSuggestionProvider().refresher = snapshotRefresher
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.start_time = monotonic()
+    ctx.trace = getTracer().startTrace(ctx.command.name)
+
+
+@bot.after_invoke
+async def record_command(ctx):
+    getTracer().endTrace(ctx.trace)
+    outcome = "error" if ctx.command_failed else "ok"
+    appMetrics.recordCommand(ctx, outcome, monotonic() - ctx.start_time)
+
 
 @bot.event
 async def on_ready():
@@ -42,31 +124,59 @@ async def on_ready():
         activity=discord.Activity(type=discord.ActivityType.watching, name="gf help")
     )
     print(
-        f"Beep Boop I am ready to serve the humans. Currently serving {len(bot.guilds)} human gatherings"
+        f"Beep Boop I am ready to serve the humans. Currently serving {len(bot.guilds)} human gatherings over shards {sorted(bot.shards)} of {bot.shard_count}"
     )
-    appMetrics.setActiveServerCount(len(bot.guilds))
+    shardMonitor.start()
+    try:
+        await getPhraseBank().refresh(phraseBankDB)
+    except Exception as error:
+        print("Failed to load the phrase bank: ", error)
+    getPhraseBank().startRefresher(phraseBankDB)
+    gamePool.start()
+    snapshotRefresher.start()
+    getSessionStore().on_reap = getPhraseBank().dropDeck
+    getSessionStore().startReaper()
+    await asyncio.get_running_loop().run_in_executor(getExecutor(), checkIndexes)
+
+
+@bot.event
+async def on_shard_ready(shard_id):
+    print(f"Shard {shard_id} is ready")
+    appMetrics.setShardConnected(shard_id, True)
+
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    appMetrics.setShardConnected(shard_id, True)
+
+
+@bot.event
+async def on_shard_disconnect(shard_id):
+    print(f"Shard {shard_id} disconnected")
+    appMetrics.setShardConnected(shard_id, False)
 
 
 @bot.command(name="start", help="Starts a game of Google Feud")
 async def start_game(ctx):
     try:
-        gfeud = GoogleFeud(ctx, appMetrics)
-        gfeud.loadSession()
-        gfeud.startGame()
+        gfeud = GoogleFeud(ctx, appMetrics, gamePool)
+        await gfeud.loadSession()
+        await gfeud.startGame()
     except RuntimeError as error:
         print(ctx, "Problem starting game: ", error)
 
     response = gfeud.getGFeudBoard()
 
-    await ctx.send(response)
+    await boardMessages.show(sessionKey(ctx), ctx, response, new_message=True)
 
 
 @bot.command(name="end", help="Ends a game of Google Feud")
 async def end_game(ctx):
     gfeud = GoogleFeud(ctx, appMetrics)
-    gfeud.loadSession()
+    await gfeud.loadSession()
 
-    if gfeud.endGame():
+    if await gfeud.endGame():
+        await boardMessages.end(sessionKey(ctx))
         print(ctx, f"Ended game successfully")
         response = ">>> Ended the game :ok_hand:\nStart again with `gf start`"
     else:
@@ -75,49 +185,70 @@ async def end_game(ctx):
             ">>> Game is not in progress :confused:\nStart a game with `gf start`"
         )
 
-    await ctx.send(response)
+    await ctx.send(response, priority=CRITICAL)
 
 
-@bot.command(
-    name="a",
-    help="Provide your auto-complete guess\n\nFor example,\ngf a super neat answer",
-)
-async def guess_phrase(ctx, phrase: str):
+async def play_guesses(guesses):
+    """
+    Plays the (ctx, phrase) guesses given in one channel since its last board, in the order they arrived,
+    and answers them with one board
+    """
+    ctx = guesses[-1][0]
+    key = sessionKey(ctx)
+    gfeud = GoogleFeud(ctx, appMetrics)
     try:
-        start_time = monotonic()
-        gfeud = GoogleFeud(ctx, appMetrics)
-        if not gfeud.loadSession():
+        if not await gfeud.loadSession():
             print(ctx, f"Game hasn't started yet")
             response = (
                 ">>> Game has not started :bangbang:\nStart a game with `gf start`"
             )
-            await ctx.send(response)
+            await ctx.send(response, priority=CRITICAL)
+            return
+        for guess_ctx, phrase in guesses:
+            print(guess_ctx, f'Check if "{phrase}" is in auto-complete sentence')
+        outcomes = await gfeud.checkGuesses(guesses)
+        # Reactions go out after the board, without holding up the channel's next guesses
+        reactions = [(guess_ctx, outcome) for (guess_ctx, _), outcome in zip(guesses, outcomes)]
+
+        if gfeud.isGameOver():
+            print(ctx, f"Game over")
+            await gfeud.endGame()
+            await gfeud.update_winner_stats()
+            await boardMessages.show(key, ctx, gfeud.getGFeudBoard())
+            boardMessages.reactLater(key, reactions)
+            await boardMessages.flush(key)
+            await boardMessages.send(key, ctx, gfeud.getWinnerResponse())
+            await boardMessages.end(key)
         else:
-            print(ctx, f'Check if "{phrase}" is in auto-complete sentence')
-            gfeud.checkPhraseInSuggestions(phrase, ctx.author)
-
-            if gfeud.isGameOver():
-                print(ctx, f"Game over")
-                gfeud.endGame()
-                gfeud.update_winner_stats()
-                await ctx.send(gfeud.getGFeudBoard())
-                await ctx.send(gfeud.getWinnerResponse())
-                gfeud.endGame()
-            else:
-                await ctx.send(gfeud.getGFeudBoard())
-        secondsToRun = monotonic() - start_time
-        appMetrics.recordPhraseGuessTime(ctx, secondsToRun)
+            await boardMessages.show(key, ctx, gfeud.getGFeudBoard())
+            boardMessages.reactLater(key, reactions)
     except Exception as error:
         print(ctx, "ERROR: Game failed, shutting down game. ", error)
         traceback.print_exc()
-        gfeud.endGame()
+        await gfeud.endGame()
+        await boardMessages.end(key)
         await ctx.send(
             ">>> Our bad, something might've broken  :confounded:\nFeel free to report this to the support server: "
-            + SUPPORT_SERVER_URL
+            + SUPPORT_SERVER_URL,
+            priority=CRITICAL,
         )
         appMetrics.recordFatalException(ctx, {'exception':str(error)})
 
 
+# Guesses in the same channel are played one batch at a time against the channel's one game
+guessActors = ChannelActors(play_guesses, trace_name="a")
+
+
+@bot.command(
+    name="a",
+    help="Provide your auto-complete guess\n\nFor example,\ngf a super neat answer",
+)
+async def guess_phrase(ctx, phrase: str):
+    start_time = monotonic()
+    await guessActors.submit(sessionKey(ctx), (ctx, phrase))
+    appMetrics.recordPhraseGuessTime(ctx, monotonic() - start_time)
+
+
 @bot.command(
     name="scoreboard",
     help="Display scores for all players in this game session",
@@ -125,7 +256,7 @@ async def guess_phrase(ctx, phrase: str):
 )
 async def scoreboard(ctx):
     gfeud = GoogleFeud(ctx, appMetrics)
-    if not gfeud.loadSession():
+    if not await gfeud.loadSession():
         response = ">>> Game has not started :bangbang:\nStart a game with `gf start`"
         await ctx.send(response)
     else:
@@ -139,7 +270,14 @@ async def scoreboard(ctx):
 )
 async def stats(ctx):
     gfeud = GoogleFeud(ctx, appMetrics)
-    await ctx.send(gfeud.show_user_stats(str(ctx.author.id)))
+    await ctx.send(await gfeud.show_user_stats(str(ctx.author.id)))
+
+
+async def add_reactions(ctx, msg, *emojis):
+    for emoji in emojis:
+        await getOutboundScheduler().submit(
+            sessionKey(ctx), lambda emoji=emoji: msg.add_reaction(emoji), route="react"
+        )
 
 
 @bot.command(name="review", hidden=True)
@@ -153,8 +291,8 @@ async def review_phrase(ctx):
         )
 
     gfeud = GoogleFeud(ctx, appMetrics)
-    if gfeud.isUserAnAdmin():
-        response, contribution = gfeud.getSuggestionsFromContribution()
+    if await gfeud.isUserAnAdmin():
+        response, contribution = await gfeud.getSuggestionsFromContribution()
         if response == None:
             await ctx.send("> No contributions to review  :sunglasses:")
             return
@@ -163,8 +301,7 @@ async def review_phrase(ctx):
         user_id = contribution["user_id"]
 
         msg = await ctx.send(response)
-        await msg.add_reaction(check_mark)
-        await msg.add_reaction(x_mark)
+        await add_reactions(ctx, msg, check_mark, x_mark)
 
         try:
             reaction, user = await bot.wait_for(
@@ -174,14 +311,14 @@ async def review_phrase(ctx):
                 await ctx.send(
                     f"> Added the phrase **{phrase}** to the collection! :grin:"
                 )
-                gfeud.add_phrase(phrase, user_id)
+                await gfeud.add_phrase(phrase, user_id)
             elif reaction.emoji == x_mark:
                 await ctx.send(
                     "> Ok I won't add **"
                     + phrase
                     + "**  :woozy_face:  Rejecting the contribution"
                 )
-            gfeud.delete_contribution(phrase)
+            await gfeud.delete_contribution(phrase)
         except asyncio.TimeoutError:
             await ctx.send(
                 f"> The phrase **{phrase}** was not added because you took too long  :rage:"
@@ -210,14 +347,13 @@ async def add_phrase(ctx, *, contribution_phrase: str):
     clean_phrase = contribution_phrase.lower()
     clean_phrase = " ".join(clean_phrase.split())
 
-    if gfeud.isUserAnAdmin():
-        response, _ = gfeud.showSuggestionsOfCandidatePhrase(clean_phrase, True)
+    if await gfeud.isUserAnAdmin():
+        response, _ = await gfeud.showSuggestionsOfCandidatePhrase(clean_phrase, True)
         if not response:
             await ctx.send("> This phrase already exists  :confused:")
             return
         msg = await ctx.send(response)
-        await msg.add_reaction(check_mark)
-        await msg.add_reaction(x_mark)
+        await add_reactions(ctx, msg, check_mark, x_mark)
 
         try:
             reaction, user = await bot.wait_for(
@@ -227,7 +363,7 @@ async def add_phrase(ctx, *, contribution_phrase: str):
                 await ctx.send(
                     f"> Added the phrase **{clean_phrase}** to the collection! :grin:"
                 )
-                gfeud.add_phrase(clean_phrase, None)
+                await gfeud.add_phrase(clean_phrase, None)
             elif reaction.emoji == x_mark:
                 await ctx.send(
                     "> Ok I won't add **" + clean_phrase + "**  :woozy_face:"
@@ -248,7 +384,7 @@ async def add_phrase(ctx, *, contribution_phrase: str):
             await ctx.send("> Your phrase is too long  :mask:")
             return
 
-        num_of_contributions = gfeud.get_num_of_contributions_left()
+        num_of_contributions = await gfeud.get_num_of_contributions_left()
 
         if num_of_contributions <= 0:
             await ctx.send(
@@ -256,7 +392,7 @@ async def add_phrase(ctx, *, contribution_phrase: str):
             )
             return
 
-        response, suggestions = gfeud.showSuggestionsOfCandidatePhrase(
+        response, suggestions = await gfeud.showSuggestionsOfCandidatePhrase(
             clean_phrase, False
         )
         if not response:
@@ -267,8 +403,7 @@ async def add_phrase(ctx, *, contribution_phrase: str):
         if len(suggestions) < 3:
             return
 
-        await msg.add_reaction(check_mark)
-        await msg.add_reaction(x_mark)
+        await add_reactions(ctx, msg, check_mark, x_mark)
 
         try:
             reaction, user = await bot.wait_for(
@@ -278,8 +413,8 @@ async def add_phrase(ctx, *, contribution_phrase: str):
                 await ctx.send(
                     f"> Submitted the phrase **{clean_phrase}**! We'll review it soon. Thanks for the contribution! :grin:"
                 )
-                gfeud.add_contribution(clean_phrase, suggestions)
-                new_num_of_contributions = gfeud.get_num_of_contributions_left()
+                await gfeud.add_contribution(clean_phrase, suggestions)
+                new_num_of_contributions = await gfeud.get_num_of_contributions_left()
                 await ctx.send(
                     f"> You can contribute **{new_num_of_contributions}** more time(s)"
                 )
@@ -324,10 +459,25 @@ async def on_message(message):
     ):
         print(message, message.content)
 
-    await bot.process_commands(message)
-    appMetrics.setActiveServerCount(len(bot.guilds))
+    appMetrics.messageReceived(message)
+    # Same as bot.process_commands, with a context that times sends
+    if not message.author.bot:
+        ctx = await bot.get_context(message, cls=GFeudContext)
+        await bot.invoke(ctx)
+
+
+async def run_bot():
+    try:
+        async with bot:
+            await bot.start(TOKEN)
+    finally:
+        # Write behind whatever game state hasn't reached Mongo yet
+        await getSessionStore().close()
+        getTracer().flush()
 
 
 if __name__ == "__main__":
-    start_http_server(9001)
-    bot.run(TOKEN)
+    if METRICS_PORT > 0:
+        start_http_server(METRICS_PORT)
+    discord.utils.setup_logging()
+    asyncio.run(run_bot())
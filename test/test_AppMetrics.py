@@ -0,0 +1,86 @@
+import unittest
+
+from unittest.mock import Mock
+from prometheus_client import CollectorRegistry
+from googlefeud.AppMetrics import AppMetrics, MongoLatencyListener
+
+
+def discordContext(user_id):
+    ctx = Mock()
+    ctx.author.id = user_id
+    ctx.author.name = f"player {user_id}"
+    ctx.guild.shard_id = user_id % 2
+    ctx.guild.__str__ = Mock(return_value=f"guild {user_id % 50}")
+    ctx.channel.__str__ = Mock(return_value=f"channel {user_id}")
+    ctx.command.name = "a"
+    return ctx
+
+
+def seriesCount(registry):
+    return sum(len(metric.samples) for metric in registry.collect())
+
+
+def simulateUsers(sut, users):
+    for user_id in range(users):
+        ctx = discordContext(user_id)
+        sut.gameStarted(ctx)
+        sut.phraseGiven(ctx, {"answer": f"guess {user_id}", "prompt": "why is my cat"})
+        sut.answerGiven(ctx, outcome="miss")
+        sut.answerGiven(ctx, outcome="correct")
+        sut.recordPhraseGuessTime(ctx, 0.1)
+        sut.recordCommand(ctx, "ok", 0.1)
+        sut.recordDiscordSend(ctx, 0.05)
+        sut.recordFatalException(ctx, {"exception": f"error {user_id}"})
+
+
+class TestAppMetrics(unittest.TestCase):
+    def test_series_count_is_constant_as_users_grow(self):
+        registry = CollectorRegistry()
+        sut = AppMetrics(registry=registry, legacy_user_labels=False)
+
+        simulateUsers(sut, 10)
+        series_after_10_users = seriesCount(registry)
+        simulateUsers(sut, 1000)
+
+        self.assertEqual(series_after_10_users, seriesCount(registry))
+
+    def test_legacy_user_labels_still_exported(self):
+        registry = CollectorRegistry()
+        sut = AppMetrics(registry=registry, legacy_user_labels=True)
+
+        simulateUsers(sut, 10)
+        series_after_10_users = seriesCount(registry)
+        simulateUsers(sut, 20)
+
+        self.assertGreater(seriesCount(registry), series_after_10_users)
+        self.assertEqual(
+            2.0,
+            registry.get_sample_value(
+                "gfeud_game_start_total",
+                {"username": "player 3", "id": "3", "guild": "guild 3", "channel": "channel 3"},
+            ),
+        )
+
+    def test_mongo_latency_listener(self):
+        registry = CollectorRegistry()
+        listener = MongoLatencyListener(AppMetrics(registry=registry))
+
+        listener.succeeded(Mock(command_name="find", duration_micros=2000))
+        listener.failed(Mock(command_name="findAndModify", duration_micros=500))
+
+        self.assertEqual(
+            0.002,
+            registry.get_sample_value(
+                "gfeud_mongo_op_latency_seconds_sum", {"op": "find", "outcome": "ok"}
+            ),
+        )
+        self.assertEqual(
+            1.0,
+            registry.get_sample_value(
+                "gfeud_mongo_op_latency_seconds_count", {"op": "findAndModify", "outcome": "error"}
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
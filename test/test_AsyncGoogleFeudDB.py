@@ -0,0 +1,77 @@
+import asyncio
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from unittest.mock import Mock
+from googlefeud.AsyncGoogleFeudDB import AsyncGoogleFeudDB
+
+query_time = 0.05
+num_of_channels = 20
+
+
+def slow_db():
+    """
+    Mongo stand-in where every query blocks its thread like a slow pymongo call would
+    """
+
+    def slow_query(*args, **kwargs):
+        time.sleep(query_time)
+        return {"turns": 5}
+
+    db = Mock()
+    db.sessions.find_one.side_effect = slow_query
+    db.sessions.update_one.side_effect = slow_query
+    return db
+
+
+class TestAsyncGoogleFeudDB(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ThreadPoolExecutor(max_workers=num_of_channels)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    async def guess(self, channel):
+        gfeuddb = AsyncGoogleFeudDB("guild", channel, db=slow_db(), executor=self.executor)
+        await gfeuddb.getSession()
+        await gfeuddb.updateTurn()
+
+    async def test_has_same_method_surface(self):
+        sut = AsyncGoogleFeudDB("guild", "channel", db=slow_db(), executor=self.executor)
+        self.assertEqual({"turns": 5}, await sut.getSession())
+        with self.assertRaises(AttributeError):
+            sut.notAMethod
+
+    async def test_guesses_across_channels_run_concurrently(self):
+        start = monotonic()
+        await asyncio.gather(
+            *[self.guess(f"channel-{i}") for i in range(num_of_channels)]
+        )
+        elapsed = monotonic() - start
+
+        # getSession and updateTurn: 2 queries per guess
+        serialized_time = num_of_channels * 2 * query_time
+        self.assertLess(elapsed, serialized_time / 4)
+
+    async def test_event_loop_is_not_blocked(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker_task = asyncio.create_task(ticker())
+        await self.guess("channel")
+        ticker_task.cancel()
+
+        self.assertGreater(ticks, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
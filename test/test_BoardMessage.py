@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import unittest
+
+from unittest.mock import AsyncMock, Mock
+from prometheus_client import CollectorRegistry
+from googlefeud.AppMetrics import AppMetrics, RateLimitLogHandler
+from googlefeud.BoardMessage import BoardMessages
+from googlefeud.OutboundScheduler import OutboundScheduler
+
+
+def discordContext():
+    ctx = Mock()
+    ctx.guild.shard_id = 0
+    ctx.message.add_reaction = AsyncMock()
+    ctx.send = AsyncMock(side_effect=lambda content: Mock(edit=AsyncMock()))
+    return ctx
+
+
+class TestBoardMessages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.registry = CollectorRegistry()
+        self.appMetrics = AppMetrics(registry=self.registry, legacy_user_labels=False)
+        self.ctx = discordContext()
+
+    async def test_sends_a_board_per_guess_by_default(self):
+        sut = BoardMessages(self.appMetrics, edit_in_place=False)
+
+        for board in ["start", "guess 1", "guess 2"]:
+            await sut.show("channel", self.ctx, board)
+        await sut.react("channel", self.ctx, "correct")
+        await sut.end("channel")
+
+        self.assertEqual(3, self.ctx.send.await_count)
+        self.ctx.message.add_reaction.assert_not_awaited()
+        self.assertEqual(
+            1.0,
+            self.registry.get_sample_value(
+                "gfeud_discord_api_calls_per_game_count", {"mode": "send"}
+            ),
+        )
+
+    async def test_edits_within_debounce_are_coalesced(self):
+        sut = BoardMessages(self.appMetrics, edit_in_place=True, debounce=0.02)
+
+        await sut.show("channel", self.ctx, "start")
+        message = sut.boards["channel"].message
+        for board in ["guess 1", "guess 2", "guess 3"]:
+            await sut.show("channel", self.ctx, board)
+        await asyncio.sleep(0.05)
+
+        self.ctx.send.assert_awaited_once_with("start")
+        message.edit.assert_awaited_once_with(content="guess 3")
+        self.assertEqual(
+            1.0,
+            self.registry.get_sample_value(
+                "gfeud_discord_api_calls_total", {"call": "edit", "shard": "0"}
+            ),
+        )
+
+    async def test_end_makes_pending_edit_and_records_calls_per_game(self):
+        sut = BoardMessages(self.appMetrics, edit_in_place=True, debounce=60)
+
+        await sut.show("channel", self.ctx, "start")
+        message = sut.boards["channel"].message
+        await sut.show("channel", self.ctx, "last guess")
+        await sut.react("channel", self.ctx, "miss")
+        await sut.send("channel", self.ctx, "winners")
+        await sut.end("channel")
+
+        message.edit.assert_awaited_once_with(content="last guess")
+        self.ctx.message.add_reaction.assert_awaited_once_with("❌")
+        self.assertEqual({}, sut.boards)
+        self.assertEqual(
+            4.0,
+            self.registry.get_sample_value(
+                "gfeud_discord_api_calls_per_game_sum", {"mode": "edit"}
+            ),
+        )
+
+    async def test_reactions_dont_hold_up_the_board(self):
+        outbound = OutboundScheduler(
+            routes={"send": (5, 5), "edit": (5, 5), "react": (1, 0.25)}
+        )
+        sut = BoardMessages(self.appMetrics, edit_in_place=True, debounce=0, outbound=outbound)
+        await sut.show("channel", self.ctx, "start")
+        message = sut.boards["channel"].message
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await sut.show("channel", self.ctx, "guesses")
+        reactions = sut.reactLater("channel", [(self.ctx, "miss")] * 4)
+        await sut.show("channel", self.ctx, "more guesses")
+
+        self.assertLess(loop.time() - start, 0.2)
+        self.assertEqual(2, message.edit.await_count)
+        await reactions
+        self.assertEqual(4, self.ctx.message.add_reaction.await_count)
+        self.assertEqual(set(), sut.reactions)
+
+    async def test_new_game_board_doesnt_replace_the_final_board(self):
+        outbound = OutboundScheduler(routes={"send": (1, 0.05)})
+        sut = BoardMessages(self.appMetrics, edit_in_place=False, outbound=outbound)
+        await sut.show("channel", self.ctx, "start")
+
+        final = asyncio.create_task(sut.show("channel", self.ctx, "final board"))
+        await asyncio.sleep(0)
+        await sut.end("channel")
+        await sut.show("channel", self.ctx, "new game")
+        await final
+
+        self.assertEqual(
+            ["start", "final board", "new game"],
+            [call.args[0] for call in self.ctx.send.await_args_list],
+        )
+
+    async def test_board_is_sent_again_when_edit_fails(self):
+        sut = BoardMessages(self.appMetrics, edit_in_place=True, debounce=0)
+
+        await sut.show("channel", self.ctx, "start")
+        sut.boards["channel"].message.edit.side_effect = RuntimeError("Unknown Message")
+        await sut.show("channel", self.ctx, "guess 1")
+        await sut.show("channel", self.ctx, "guess 2")
+
+        self.assertEqual(["start", "guess 2"], [c.args[0] for c in self.ctx.send.await_args_list])
+
+    async def test_new_game_gets_a_new_message(self):
+        sut = BoardMessages(self.appMetrics, edit_in_place=True, debounce=0)
+
+        await sut.show("channel", self.ctx, "game 1")
+        await sut.show("channel", self.ctx, "game 2", new_message=True)
+
+        self.assertEqual(2, self.ctx.send.await_count)
+
+
+class TestRateLimitLogHandler(unittest.TestCase):
+    def test_counts_429s(self):
+        registry = CollectorRegistry()
+        logger = logging.getLogger("test.discord.http")
+        logger.addHandler(RateLimitLogHandler(AppMetrics(registry=registry, legacy_user_labels=False)))
+
+        fmt = "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds."
+        logger.warning(fmt, "PATCH", "https://discord.com/api/v10/channels/1/messages/2", 1.5)
+        logger.warning(fmt, "PATCH", "https://discord.com/api/v10/channels/1/messages/2", 0.5)
+        logger.warning("Global rate limit has been hit. Retrying in %.2f seconds.", 2.0)
+
+        self.assertEqual(2.0, registry.get_sample_value("gfeud_discord_rate_limited_total", {"method": "PATCH"}))
+        self.assertEqual(2.0, registry.get_sample_value("gfeud_discord_rate_limit_wait_seconds_total"))
+
+
+if __name__ == "__main__":
+    unittest.main()
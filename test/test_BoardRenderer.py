@@ -0,0 +1,104 @@
+import unittest
+
+from googlefeud.BoardRenderer import BoardRenderer, emojiNumber, emojiScore
+
+key = ("My Rad Server", "My Even Radder Channel")
+phrase = "why is my cat"
+hidden = ":small_orange_diamond::small_blue_diamond:" * 4
+
+
+def newSuggestions():
+    return {
+        "sneezing": {"solved": False, "score": 1000, "solvedBy": ""},
+        "drooling": {"solved": False, "score": 900, "solvedBy": ""},
+        "coughing": {"solved": False, "score": 800, "solvedBy": ""},
+    }
+
+
+class TestBoardRenderer(unittest.TestCase):
+    def setUp(self):
+        self.sut = BoardRenderer()
+        self.suggestions = newSuggestions()
+        self.scores = {}
+
+    def render(self, turns=5, status_message="", game_ended=False):
+        return self.sut.renderBoard(
+            key, phrase, self.suggestions, self.scores, turns, status_message, game_ended
+        )
+
+    def test_render_board(self):
+        self.scores["12345"] = {"score": 900, "display_name": "Defsin"}
+        self.suggestions["drooling"].update(solved=True, solvedBy="12345")
+
+        board = self.render(turns=4, status_message="Nice")
+
+        self.assertEqual(
+            "\n>>> **Google Feud** - How does Google autocomplete this:question: Do `gf a <your-guess>`"
+            "\n```css\nwhy is my cat ...\n```\n**Nice**\n        "
+            f"\n:zero::one:  {hidden}"
+            "\n:zero::two:  **why is my cat drooling** | Solved By: *Defsin* :diamonds::nine::zero::zero:"
+            f"\n:zero::three:  {hidden}"
+            "\n\n**4 turns left**",
+            board,
+        )
+
+    def test_only_changed_lines_are_rendered_again(self):
+        self.render()
+        self.assertEqual(3, self.sut.rendered_lines)
+
+        self.render(turns=4)
+        self.assertEqual(3, self.sut.rendered_lines)
+
+        self.scores["12345"] = {"score": 1000, "display_name": "Defsin"}
+        self.suggestions["sneezing"].update(solved=True, solvedBy="12345")
+        self.assertIn("Solved By: *Defsin*", self.render(turns=4))
+        self.assertEqual(4, self.sut.rendered_lines)
+
+        self.assertIn(":zero::three:  why is my cat coughing", self.render(game_ended=True))
+        self.assertEqual(7, self.sut.rendered_lines)
+
+    def test_new_game_in_the_same_channel_starts_over(self):
+        self.suggestions["sneezing"].update(solved=True, solvedBy="12345")
+        self.scores["12345"] = {"score": 1000, "display_name": "Defsin"}
+        self.render()
+
+        self.suggestions = newSuggestions()
+        board = self.sut.renderBoard(key, "how to dance", self.suggestions, {}, 5)
+
+        self.assertNotIn("Solved By", board)
+
+    def test_sessions_are_bounded(self):
+        sut = BoardRenderer(max_sessions=2)
+        for channel in range(3):
+            sut.renderBoard(("guild", channel), phrase, self.suggestions, {}, 5)
+
+        self.assertEqual([("guild", 1), ("guild", 2)], list(sut._boards))
+
+    def test_render_scoreboard(self):
+        scores = {
+            "1": {"score": 200, "display_name": "Georgy"},
+            "2": {"score": 1500, "display_name": "Billy.Bob"},
+        }
+        self.assertEqual(
+            ">>> ***Scoreboard***\n"
+            ":one:  **Billy.Bob**  :diamonds::one::five::zero::zero:\n"
+            ":two:  **Georgy**  :diamonds::two::zero::zero:",
+            self.sut.renderScoreboard(scores),
+        )
+
+    def test_render_winners(self):
+        self.assertEqual(">>> **No winners here**  :cloud_rain:", self.sut.renderWinners([]))
+        self.assertEqual(
+            ">>> **Winners** Billy.Bob - Georgy  :fireworks: :100:",
+            self.sut.renderWinners(["Billy.Bob", "Georgy"]),
+        )
+
+    def test_emoji_tables(self):
+        self.assertEqual(":zero::seven:", emojiNumber(7, True))
+        self.assertEqual(":one::two::three:", emojiNumber(123, True))
+        self.assertEqual(":one::two::three::four:", emojiNumber(1234))
+        self.assertEqual(":diamonds::one::two::five:", emojiScore(125))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import unittest
+
+from aiohttp import web
+from unittest.mock import AsyncMock
+from googlefeud.BulkImport import bulkSuggestionClient, importPhrases, readPhrases
+from googlefeud.SuggestionCache import SuggestionCache
+
+
+class SuggestServer:
+    """
+    Answers every phrase with its suggestions and counts the requests in flight
+    """
+
+    def __init__(self, suggestions):
+        self.suggestions = suggestions
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def fetch(self, phrase):
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if phrase not in self.suggestions:
+            raise json.JSONDecodeError("Not found", "", 0)
+        return (phrase.lower(), [phrase, [f"{phrase} {s}" for s in self.suggestions[phrase]]])
+
+
+def phraseBankDB(existing):
+    gfeuddb = AsyncMock()
+    gfeuddb.getGoogleSearchPhrasesAfter.return_value = [
+        {"_id": i, "phrase": phrase} for i, phrase in enumerate(existing)
+    ]
+    gfeuddb.addGoogleSearchPhrases.side_effect = lambda documents: len(documents)
+    return gfeuddb
+
+
+class TestBulkImport(unittest.IsolatedAsyncioTestCase):
+    def test_read_phrases(self):
+        lines = ["Why is my cat\n", "  why is  my CAT ", "\n", "# a comment\n", "How to dance"]
+        self.assertEqual(["why is my cat", "how to dance"], readPhrases(lines))
+
+    async def test_import(self):
+        server = SuggestServer(
+            {
+                "why is my cat": ["sneezing", "drooling", "coughing", "sneezing a lot"],
+                "how to dance": ["salsa", "salsa fast"],
+                "is it cold": ["outside", "today", "in here"],
+            }
+        )
+        gfeuddb = phraseBankDB(["Is it cold"])
+        cache = SuggestionCache()
+
+        report = await importPhrases(
+            ["why is my cat", "how to dance", "is it cold", "not a phrase"],
+            gfeuddb,
+            server.fetch,
+            cache,
+            concurrency=2,
+        )
+
+        gfeuddb.addGoogleSearchPhrases.assert_awaited_once_with(
+            [{"phrase": "why is my cat", "suggestions": ["sneezing", "drooling", "coughing"]}]
+        )
+        self.assertEqual(["sneezing", "drooling", "coughing"], await cache.get("why is my cat"))
+        self.assertEqual(4, report.read)
+        self.assertEqual(1, report.duplicates)
+        self.assertEqual(3, report.processed)
+        self.assertEqual(1, report.imported)
+        self.assertEqual(1, report.rejected)
+        self.assertEqual(1, report.failed)
+
+    async def test_phrases_are_stored_normalized(self):
+        server = SuggestServer({"why is my cat": ["sneezing", "drooling", "coughing"]})
+        gfeuddb = phraseBankDB([])
+        cache = SuggestionCache()
+
+        report = await importPhrases(["Why Is  My Cat", "why is my cat"], gfeuddb, server.fetch, cache)
+
+        gfeuddb.addGoogleSearchPhrases.assert_awaited_once_with(
+            [{"phrase": "why is my cat", "suggestions": ["sneezing", "drooling", "coughing"]}]
+        )
+        self.assertEqual(["why is my cat"], list(cache.entries))
+        self.assertEqual(1, report.duplicates)
+
+    async def test_import_continues_past_repeated_failures(self):
+        async def handle(request):
+            phrase = request.query["q"].strip()
+            if phrase.startswith("down"):
+                return web.Response(status=503, text="Service Unavailable")
+            suggestions = [f"{phrase} {word}" for word in ["one", "two", "three"]]
+            return web.json_response([phrase, suggestions])
+
+        app = web.Application()
+        app.router.add_get("/complete/search", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        self.addAsyncCleanup(runner.cleanup)
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        client = bulkSuggestionClient(1)
+        client.url = f"http://127.0.0.1:{port}/complete/search"
+        client.retries = 0
+        self.addAsyncCleanup(client.close)
+        phrases = [f"down {i}" for i in range(8)] + [f"up {i}" for i in range(3)]
+
+        report = await importPhrases(phrases, phraseBankDB([]), client.fetch, concurrency=1)
+
+        self.assertEqual(8, report.failed)
+        self.assertEqual(3, report.imported)
+
+    async def test_fetches_are_bounded_and_inserts_batched(self):
+        phrases = [f"phrase {i}" for i in range(20)]
+        server = SuggestServer({phrase: ["one", "two", "three"] for phrase in phrases})
+        gfeuddb = phraseBankDB([])
+
+        report = await importPhrases(
+            phrases, gfeuddb, server.fetch, concurrency=4, batch_size=8
+        )
+
+        self.assertEqual(4, server.most_in_flight)
+        self.assertEqual(20, report.imported)
+        self.assertEqual(
+            [8, 8, 4],
+            [len(call.args[0]) for call in gfeuddb.addGoogleSearchPhrases.await_args_list],
+        )
+        self.assertGreater(report.rate(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
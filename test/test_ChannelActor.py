@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+
+from googlefeud.ChannelActor import ChannelActors
+
+
+class Recorder:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.batches = []
+        self.running = 0
+        self.most_running = 0
+
+    async def __call__(self, items):
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        self.batches.append(items)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return [item * 10 for item in items]
+
+
+class TestChannelActors(unittest.IsolatedAsyncioTestCase):
+    async def test_results_in_arrival_order(self):
+        recorder = Recorder()
+        sut = ChannelActors(recorder, window=0)
+
+        results = await asyncio.gather(*[sut.submit("channel", i) for i in range(5)])
+
+        self.assertEqual([0, 10, 20, 30, 40], results)
+        self.assertEqual(list(range(5)), [item for batch in recorder.batches for item in batch])
+
+    async def test_concurrent_items_are_batched(self):
+        recorder = Recorder()
+        sut = ChannelActors(recorder, window=0.01)
+
+        await asyncio.gather(*[sut.submit("channel", i) for i in range(10)])
+
+        self.assertEqual([list(range(10))], recorder.batches)
+        self.assertEqual((1, 10), (sut.batches, sut.items))
+
+    async def test_items_arriving_during_a_batch_make_the_next_batch(self):
+        recorder = Recorder(delay=0.05)
+        sut = ChannelActors(recorder, window=0)
+
+        first = asyncio.ensure_future(sut.submit("channel", 0))
+        await asyncio.sleep(0.01)
+        rest = [asyncio.ensure_future(sut.submit("channel", i)) for i in range(1, 4)]
+        await asyncio.gather(first, *rest)
+
+        self.assertEqual([[0], [1, 2, 3]], recorder.batches)
+        self.assertEqual(1, recorder.most_running)
+
+    async def test_batch_size_is_bounded(self):
+        recorder = Recorder()
+        sut = ChannelActors(recorder, window=0.01, max_batch=3)
+
+        await asyncio.gather(*[sut.submit("channel", i) for i in range(7)])
+
+        self.assertEqual([3, 3, 1], [len(batch) for batch in recorder.batches])
+
+    async def test_channels_run_concurrently(self):
+        recorder = Recorder()
+        sut = ChannelActors(recorder, window=0)
+
+        await asyncio.gather(*[sut.submit(f"channel {i}", i) for i in range(3)])
+
+        self.assertEqual(3, recorder.most_running)
+
+    async def test_idle_actors_are_dropped(self):
+        sut = ChannelActors(Recorder(), window=0)
+
+        await sut.submit("channel", 1)
+
+        self.assertEqual({}, sut.actors)
+        self.assertEqual(20, await sut.submit("channel", 2))
+
+    async def test_failed_batch_fails_its_items(self):
+        async def fail(items):
+            raise RuntimeError("broken")
+
+        sut = ChannelActors(fail, window=0)
+
+        with self.assertRaises(RuntimeError):
+            await sut.submit("channel", 1)
+        self.assertEqual({}, sut.actors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from googlefeud.CircuitBreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sut = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def test_opens_after_failures_in_a_row(self):
+        for _ in range(2):
+            self.sut.recordFailure()
+        self.sut.recordSuccess()
+        for _ in range(2):
+            self.sut.recordFailure()
+        self.assertTrue(self.sut.allow())
+
+        self.sut.recordFailure()
+        self.assertEqual(OPEN, self.sut.state)
+        self.assertFalse(self.sut.allow())
+
+    def test_lets_one_trial_through_after_reset_timeout(self):
+        for _ in range(3):
+            self.sut.recordFailure()
+        self.clock.now += 30
+
+        self.assertTrue(self.sut.allow())
+        self.assertEqual(HALF_OPEN, self.sut.state)
+        self.assertFalse(self.sut.allow())
+
+        self.sut.recordFailure()
+        self.assertEqual(OPEN, self.sut.state)
+        self.clock.now += 30
+        self.assertTrue(self.sut.allow())
+        self.sut.recordSuccess()
+        self.assertEqual(CLOSED, self.sut.state)
+        self.assertTrue(self.sut.allow())
+
+    def test_trial_that_never_reports_back(self):
+        for _ in range(3):
+            self.sut.recordFailure()
+        self.clock.now += 30
+        self.assertTrue(self.sut.allow())
+
+        self.clock.now += 30
+        self.assertTrue(self.sut.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import itertools
+import tempfile
+import unittest
+
+from googlefeud.Cluster import Cluster, shardOfGuild, shardRanges, workerOfGuild
+
+pids = itertools.count(1000)
+
+
+class FakeProcess:
+    def __init__(self, env):
+        self.env = env
+        self.pid = next(pids)
+        self.returncode = None
+        self._exited = asyncio.Event()
+
+    def exit(self, code):
+        self.returncode = code
+        self._exited.set()
+
+    def send_signal(self, signum):
+        self.exit(0)
+
+    def kill(self):
+        self.exit(-9)
+
+    async def wait(self):
+        await self._exited.wait()
+        return self.returncode
+
+
+class FakeSpawner:
+    def __init__(self):
+        self.processes = []
+
+    async def __call__(self, *command, env):
+        process = FakeProcess(env)
+        self.processes.append(process)
+        return process
+
+    def of(self, worker_id):
+        return [p for p in self.processes if p.env["CLUSTER_WORKER_ID"] == str(worker_id)]
+
+
+class TestShardRouting(unittest.TestCase):
+    def test_shard_ranges_cover_every_shard_once(self):
+        ranges = shardRanges(10, 3)
+
+        self.assertEqual([[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]], ranges)
+
+    def test_no_more_workers_than_shards(self):
+        self.assertEqual([[0], [1]], shardRanges(2, 4))
+
+    def test_guild_belongs_to_the_worker_of_its_shard(self):
+        guild_id = 81384788765712384
+        shard_id = shardOfGuild(guild_id, 16)
+
+        worker_id = workerOfGuild(guild_id, 16, 4)
+
+        self.assertEqual((guild_id >> 22) % 16, shard_id)
+        self.assertIn(shard_id, shardRanges(16, 4)[worker_id])
+        self.assertEqual(0, shardOfGuild(None, 16))
+
+
+class TestCluster(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.spawner = FakeSpawner()
+        self.sut = Cluster(
+            workers=2,
+            shard_count=4,
+            env={"TRACE_FILE": "trace.json"},
+            metrics_dir=tempfile.mkdtemp(),
+            restart_delay=0,
+            spawn=self.spawner,
+        )
+
+    async def asyncTearDown(self):
+        await self.sut.stop()
+
+    async def test_workers_get_their_shards(self):
+        await self.sut.start()
+        await asyncio.sleep(0)
+
+        envs = [process.env for process in self.spawner.processes]
+        self.assertEqual(["0,1", "2,3"], [env["SHARD_IDS"] for env in envs])
+        self.assertEqual({"4"}, {env["SHARD_COUNT"] for env in envs})
+        self.assertEqual({"0"}, {env["METRICS_PORT"] for env in envs})
+        self.assertEqual("trace.1.json", envs[1]["TRACE_FILE"])
+        self.assertEqual("ok", self.sut.health()["status"])
+
+    async def test_crashed_worker_restarts_alone(self):
+        await self.sut.start()
+        await asyncio.sleep(0)
+
+        self.spawner.of(0)[0].exit(1)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        self.assertEqual(2, len(self.spawner.of(0)))
+        self.assertEqual(1, len(self.spawner.of(1)))
+        self.assertIsNone(self.spawner.of(1)[0].returncode)
+        health = self.sut.health()
+        self.assertEqual("ok", health["status"])
+        self.assertEqual([1, 0], [worker["restarts"] for worker in health["workers"]])
+        self.assertEqual(1, health["workers"][0]["last_exit_code"])
+
+    async def test_dead_worker_is_degraded(self):
+        self.sut.workers[0].restart_delay = 60
+        await self.sut.start()
+        await asyncio.sleep(0)
+
+        self.spawner.of(0)[0].exit(1)
+        await asyncio.sleep(0)
+
+        self.assertEqual("degraded", self.sut.health()["status"])
+
+    async def test_stop_asks_workers_to_shut_down(self):
+        await self.sut.start()
+        await asyncio.sleep(0)
+
+        await self.sut.stop()
+
+        self.assertEqual([0, 0], [process.returncode for process in self.spawner.processes])
+        self.assertEqual(2, len(self.spawner.processes))
+
+
+if __name__ == "__main__":
+    unittest.main()
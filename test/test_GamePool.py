@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from unittest.mock import Mock
+from googlefeud.GamePool import GamePool
+
+
+class PhraseBank:
+    """
+    Hands out prepared games, returning None for phrases without suggestions
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self.prepared = 0
+
+    async def prepare(self):
+        self.prepared += 1
+        phrase = self.phrases.pop(0)
+        if phrase is None:
+            return None
+        return (phrase, {"suggestion": {"solved": False, "score": 1000, "solvedBy": ""}})
+
+
+async def until(condition, timeout=1):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Timed out waiting for the game pool")
+
+
+class TestGamePool(unittest.IsolatedAsyncioTestCase):
+    async def test_fills_up_to_depth(self):
+        bank = PhraseBank([f"phrase {i}" for i in range(10)])
+        sut = GamePool(bank.prepare, depth=3, appMetrics=Mock())
+        sut.start()
+        await until(lambda: len(sut.games) == 3)
+        await asyncio.sleep(0.05)
+        await sut.stop()
+
+        self.assertEqual(3, bank.prepared)
+        sut.appMetrics.setGamePoolDepth.assert_called_with(3)
+
+    async def test_pop_refills(self):
+        bank = PhraseBank([f"phrase {i}" for i in range(10)])
+        sut = GamePool(bank.prepare, depth=2, appMetrics=Mock())
+        sut.start()
+        await until(lambda: len(sut.games) == 2)
+
+        self.assertEqual("phrase 0", sut.pop()[0])
+        await until(lambda: len(sut.games) == 2)
+        await sut.stop()
+
+        self.assertEqual(["phrase 1", "phrase 2"], [game[0] for game in sut.games])
+
+    async def test_pop_skips_games_that_are_not_accepted(self):
+        bank = PhraseBank([f"phrase {i}" for i in range(10)])
+        sut = GamePool(bank.prepare, depth=3, appMetrics=Mock())
+        sut.start()
+        await until(lambda: len(sut.games) == 3)
+        await sut.stop()
+
+        game = sut.pop(accept=lambda game: game[0] != "phrase 0")
+        self.assertEqual("phrase 1", game[0])
+        self.assertIsNone(sut.pop(accept=lambda game: False))
+        self.assertEqual(["phrase 0", "phrase 2"], [game[0] for game in sut.games])
+
+    async def test_unplayable_phrases_are_skipped(self):
+        bank = PhraseBank(["phrase 0", None, None, "phrase 3", "phrase 4"])
+        sut = GamePool(bank.prepare, depth=3, appMetrics=Mock())
+        sut.start()
+        await until(lambda: len(sut.games) == 3)
+        await sut.stop()
+
+        self.assertEqual(["phrase 0", "phrase 3", "phrase 4"], [game[0] for game in sut.games])
+        self.assertEqual(2, sut.skipped)
+
+    async def test_underflow(self):
+        bank = PhraseBank([])
+        sut = GamePool(bank.prepare, depth=1, appMetrics=Mock(), retry_delay=10)
+
+        self.assertIsNone(sut.pop())
+        self.assertEqual(1, sut.underflows)
+        sut.appMetrics.gamePoolUnderflow.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
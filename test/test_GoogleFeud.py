@@ -1,28 +1,22 @@
 import unittest
-import requests
 import json
 
 from unittest import mock
-from unittest.mock import MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 from googlefeud.GoogleFeud import GoogleFeud
-from googlefeud.GoogleFeud import getWinners
-
-
-def mocked_requests_get(*args, **kwargs):
-    class MockResponse:
-        def __init__(self, text_data, status_code):
-            self.text = text_data
-            self.status_code = status_code
-
-        def text(self):
-            return self.text
-
-    if (
-        args[0]
-        == "http://suggestqueries.google.com/complete/search?output=firefox&q=why+is+my+cat+ "
-    ):
-        return MockResponse(
-            json.dumps(
+from googlefeud.GoogleFeud import getWinners, PreparedGame, sessionKey, trimSuggestions
+from googlefeud.PhraseDeck import PhraseBank
+from googlefeud.SessionStore import SessionStore
+from googlefeud.SuggestionCache import SuggestionCache
+from googlefeud.SuggestionClient import SuggestionClient
+from googlefeud.SuggestionProvider import CacheProvider, ChainProvider, HttpProvider
+
+
+class MockSuggestionClient:
+    async def fetch(self, phrase):
+        if phrase == "why is my cat":
+            return (
+                phrase.lower(),
                 [
                     "why is my cat  ",
                     [
@@ -37,12 +31,16 @@ def mocked_requests_get(*args, **kwargs):
                         "why is my cat so clingy",
                         "why is my cat licking me",
                     ],
-                ]
-            ),
-            200,
-        )
+                ],
+            )
+
+        raise json.JSONDecodeError("Not found", "", 0)
 
-    return MockResponse(None, 404)
+
+def mockProvider():
+    return ChainProvider(
+        [CacheProvider(SuggestionCache()), HttpProvider(MockSuggestionClient().fetch)]
+    )
 
 
 class DiscordUser:
@@ -51,17 +49,19 @@ class DiscordUser:
         self.display_name = "Defsin"
 
 
-class TestGoogleFeud(unittest.TestCase):
+class TestGoogleFeud(unittest.IsolatedAsyncioTestCase):
     @classmethod
     def setUpClass(cls):
         context = Mock()
-        cls.sut = GoogleFeud(context)
-        cls.sut.gfeuddb = Mock()
+        cls.sut = GoogleFeud(context, Mock())
+        cls.sut.gfeuddb = AsyncMock()
+        cls.sut.gfeuddb.commitGuess.return_value = None
+        cls.sut.suggestionProvider = mockProvider()
+        cls.sut.sessionStore = SessionStore(flush_delay=0)
 
-    @mock.patch("requests.get", side_effect=mocked_requests_get)
-    def test_mock_fetchSuggestions(self, mock_get):
+    async def test_mock_fetchSuggestions(self):
         self.sut.phrase = "why is my cat"
-        self.sut.fetchSuggestions()
+        await self.sut.fetchSuggestions()
 
         expected_suggestions = {
             "sneezing": {"solved": False, "score": 1000, "solvedBy": ""},
@@ -76,12 +76,114 @@ class TestGoogleFeud(unittest.TestCase):
 
         self.assertEqual(self.sut.suggestions, expected_suggestions)
 
-    def test_real_fetchSuggestions(self):
+    async def test_real_fetchSuggestions(self):
         self.sut.phrase = "why is my cat"
-        self.sut.fetchSuggestions()
+        real_client = SuggestionClient()
+        with mock.patch.object(
+            self.sut, "suggestionProvider", ChainProvider([HttpProvider(real_client.fetch)])
+        ):
+            await self.sut.fetchSuggestions()
+        await real_client.close()
 
         self.assertTrue(len(self.sut.suggestions) > 0)
 
+    async def test_start_game_from_game_pool(self):
+        suggestions = {"sneezing": {"solved": False, "score": 1000, "solvedBy": ""}}
+        game_pool = Mock()
+        game_pool.pop.return_value = PreparedGame("why is my cat", suggestions)
+        sut = GoogleFeud(Mock(), Mock(), game_pool)
+        sut.gfeuddb = AsyncMock()
+        sut.gfeuddb.getSession.return_value = None
+        sut.sessionStore = SessionStore(flush_delay=0)
+
+        await sut.startGame()
+
+        self.assertEqual("why is my cat", sut.phrase)
+        self.assertEqual(suggestions, sut.suggestions)
+        self.assertEqual(5, sut.turns)
+        sut.gfeuddb.getGoogleSearchPhrase.assert_not_called()
+        saved_session = sut.gfeuddb.saveSession.await_args.args[0]
+        self.assertEqual(suggestions, saved_session["suggestions"])
+
+    async def test_start_game_draws_from_phrase_deck(self):
+        bank = PhraseBank()
+        bank.add("why is my cat")
+        sut = GoogleFeud(Mock(), Mock())
+        sut.gfeuddb = AsyncMock()
+        sut.gfeuddb.getSession.return_value = None
+        sut.sessionStore = SessionStore(flush_delay=0)
+        sut.suggestionProvider = mockProvider()
+        sut.phraseDeck = bank.deck(("guild", "channel"))
+
+        await sut.startGame()
+
+        self.assertEqual("why is my cat", sut.phrase)
+        self.assertEqual(0, sut.phraseDeck.remaining())
+        sut.gfeuddb.getGoogleSearchPhrase.assert_not_called()
+
+    async def test_only_starting_a_game_creates_a_deck(self):
+        bank = PhraseBank()
+        bank.add("why is my cat")
+        sut = GoogleFeud(Mock(), Mock())
+        sut.gfeuddb = AsyncMock(guild="guild", channel="channel")
+        sut.gfeuddb.getSession.return_value = None
+        sut.sessionStore = SessionStore(flush_delay=0)
+        sut.suggestionProvider = mockProvider()
+
+        with mock.patch("googlefeud.GoogleFeud.getPhraseBank", return_value=bank):
+            await sut.loadSession()
+            self.assertEqual({}, bank.decks)
+            await sut.startGame()
+
+        self.assertEqual([("guild", "channel")], list(bank.decks))
+
+    async def startedGame(self):
+        suggestions = {
+            "sneezing": {"solved": False, "score": 1000, "solvedBy": ""},
+            "drooling": {"solved": False, "score": 900, "solvedBy": ""},
+        }
+        game_pool = Mock()
+        game_pool.pop.return_value = PreparedGame("why is my cat", suggestions)
+        sut = GoogleFeud(Mock(), Mock(), game_pool)
+        sut.gfeuddb = AsyncMock()
+        sut.gfeuddb.getSession.return_value = None
+        sut.sessionStore = SessionStore(flush_delay=0)
+        await sut.startGame()
+        sut.gfeuddb.saveSession.reset_mock()
+        return sut
+
+    def guessContext(self):
+        ctx = Mock()
+        ctx.author = DiscordUser()
+        return ctx
+
+    async def test_check_guesses_commits_once(self):
+        sut = await self.startedGame()
+        ctx = self.guessContext()
+
+        outcomes = await sut.checkGuesses([(ctx, "sneezing"), (ctx, "spaghetti"), (ctx, "lasagna")])
+
+        self.assertEqual(["correct", "miss", "miss"], outcomes)
+        self.assertEqual(3, sut.turns)
+        self.assertEqual(1000, sut.scores["12345"]["score"])
+        self.assertEqual(3, len(sut.statusMessage.split("\n")))
+        sut.gfeuddb.saveSession.assert_awaited_once()
+        self.assertEqual(3, sut.gfeuddb.saveSession.await_args.args[0]["turns"])
+        sut.gfeuddb.commitGuess.assert_not_awaited()
+
+    async def test_check_guesses_stops_when_game_is_over(self):
+        sut = await self.startedGame()
+        ctx = self.guessContext()
+
+        outcomes = await sut.checkGuesses(
+            [(ctx, "sneezing"), (ctx, "drooling"), (ctx, "spaghetti")]
+        )
+
+        self.assertEqual(["correct", "correct", "game_over"], outcomes)
+        self.assertTrue(sut.isGameOver())
+        self.assertEqual(5, sut.turns)
+        self.assertIn("*spaghetti* came after the game was over", sut.statusMessage.split("\n")[2])
+
     def test_get_winner_response(self):
         self.sut.scores = {"12345": {"score": 1000, "display_name": "Billy.Bob"}}
         response = self.sut.getWinnerResponse()
@@ -141,6 +243,25 @@ class TestGoogleFeud(unittest.TestCase):
 
         self.assertEqual({"12345": 200, "98767": 200}, winners)
 
+    def test_get_winners_keeps_ties_in_order(self):
+        scores = {
+            "1": {"score": 200, "display_name": "Georgy"},
+            "2": {"score": 1000, "display_name": "Billy.Bob"},
+            "3": {"score": 500, "display_name": "Defsin"},
+            "4": {"score": 1000, "display_name": "Ana"},
+        }
+
+        self.assertEqual(["Billy.Bob", "Ana"], list(getWinners(scores)))
+        self.assertEqual({}, getWinners({}))
+
+    def test_trim_suggestions(self):
+        suggestions = [
+            "why is my cat ",
+            ["why is my cat sneezing", "why is my cat ", "is my dog cute", "so why is my cat  so clingy"],
+        ]
+
+        self.assertEqual(["sneezing", "so clingy"], trimSuggestions("why is my cat", suggestions))
+
     def test_get_scoreboard(self):
         self.sut.scores = {
             "12345": {"score": 1000, "display_name": "Billy.Bob"},
@@ -173,27 +294,65 @@ class TestGoogleFeud(unittest.TestCase):
         expected_scoreboard = ">>> ***Scoreboard***\nNo one has guessed right :rofl:"
         self.assertEqual(expected_scoreboard, actual_scoreboard)
 
-    def test_check_phrase_in_suggestion_miss_phrase(self):
+    async def test_check_phrase_in_suggestion_miss_phrase(self):
         guess = "sphagett"
         discord_user = DiscordUser()
-        self.sut.checkPhraseInSuggestions(guess, discord_user)
+        await self.sut.checkPhraseInSuggestions(guess, discord_user)
         expected_status_message = (
             "No auto-complete found with the phrase, *sphagett*  :sweat:"
         )
         self.assertEqual(self.sut.statusMessage, expected_status_message)
 
-    @mock.patch("requests.get", side_effect=mocked_requests_get)
-    def test_check_phrase_in_suggestion_miss_phrase(self, mock_get):
+    async def test_check_phrase_in_suggestion_miss_phrase(self):
         self.sut.phrase = "why is my cat"
-        self.sut.fetchSuggestions()
+        await self.sut.fetchSuggestions()
 
         discord_user = DiscordUser()
         guess = "drooling"
-        self.sut.checkPhraseInSuggestions(guess, discord_user)
+        await self.sut.checkPhraseInSuggestions(guess, discord_user)
         expected_status_message = (
             ":clap:  Great answer, Defsin! 700 points for you  :partying_face:"
         )
         self.assertEqual(self.sut.statusMessage, expected_status_message)
+        self.sut.gfeuddb.commitGuess.assert_awaited_with(
+            suggestion="drooling", user_id="12345", display_name="Defsin", score=700
+        )
+
+    async def test_check_phrase_in_suggestion_ignores_case_and_punctuation(self):
+        self.sut.phrase = "why is my cat"
+        await self.sut.fetchSuggestions()
+
+        discord_user = DiscordUser()
+        self.assertTrue(await self.sut.checkPhraseInSuggestions("Peeing!", discord_user))
+        self.assertEqual("12345", self.sut.suggestions["peeing everywhere"]["solvedBy"])
+        self.assertTrue(await self.sut.checkPhraseInSuggestions("Throwing Up", discord_user))
+        self.assertEqual("12345", self.sut.suggestions["throwing up"]["solvedBy"])
+
+    async def test_check_phrase_in_suggestion_meaningless_word(self):
+        self.sut.phrase = "why is my cat"
+        await self.sut.fetchSuggestions()
+
+        self.assertFalse(await self.sut.checkPhraseInSuggestions("so", DiscordUser()))
+
+    def test_session_key_uses_ids_not_names(self):
+        ctx = Mock()
+        ctx.guild.id = 111
+        ctx.channel.id = 222
+        other_ctx = Mock()
+        other_ctx.guild.id = 333
+        other_ctx.channel.id = 444
+        for context in [ctx, other_ctx]:
+            context.guild.__str__ = Mock(return_value="My Rad Server")
+            context.channel.__str__ = Mock(return_value="general")
+
+        self.assertEqual(("111", "222"), sessionKey(ctx))
+        self.assertNotEqual(sessionKey(ctx), sessionKey(other_ctx))
+
+    def test_session_key_of_direct_messages(self):
+        ctx = Mock(guild=None)
+        ctx.channel.id = 222
+
+        self.assertEqual(("None", "222"), sessionKey(ctx))
 
 
 if __name__ == "__main__":
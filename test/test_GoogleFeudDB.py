@@ -2,6 +2,7 @@ import unittest
 
 from unittest import mock
 from unittest.mock import MagicMock, Mock
+from pymongo.errors import BulkWriteError
 from googlefeud.GoogleFeudDB import GoogleFeudDB
 
 guild = "My Rad Server"
@@ -52,5 +53,55 @@ class TestGoogleFeudDB(unittest.TestCase):
         self.assertEqual(expected, leaderboard_2)
 
 
+class TestGoogleFeudDBOperations(unittest.TestCase):
+    def setUp(self):
+        self.sut = GoogleFeudDB(guild=guild, channel=channel, db=MagicMock())
+        self.sut.db.reset_mock()
+
+    def test_commit_correct_guess_is_one_round_trip(self):
+        self.sut.commitGuess(
+            suggestion="drooling", user_id=user_id, display_name="Defsin", score=700
+        )
+
+        self.assertEqual(
+            [mock.call.sessions.find_one_and_update(mock.ANY, mock.ANY, return_document=mock.ANY)],
+            self.sut.db.mock_calls,
+        )
+        query, update = self.sut.db.sessions.find_one_and_update.call_args.args
+        self.assertEqual(
+            {"guild": guild, "channel": channel, "suggestions.drooling.solved": False},
+            query,
+        )
+        self.assertEqual({f"scores.{user_id}.score": 700}, update["$inc"])
+        self.assertTrue(update["$set"]["suggestions.drooling.solved"])
+        self.assertEqual(user_id, update["$set"]["suggestions.drooling.solvedBy"])
+        self.assertEqual("Defsin", update["$set"][f"scores.{user_id}.display_name"])
+
+    def test_add_search_phrases_skips_existing_phrases(self):
+        phrases = [{"phrase": "why is my cat"}, {"phrase": "how to dance"}]
+        self.sut.db.searchphrases.insert_many.side_effect = BulkWriteError(
+            {"nInserted": 1, "writeErrors": [{"code": 11000}]}
+        )
+
+        self.assertEqual(1, self.sut.addGoogleSearchPhrases(phrases))
+        self.sut.db.searchphrases.insert_many.assert_called_once_with(phrases, ordered=False)
+
+    def test_commit_wrong_guess_decrements_turns(self):
+        self.sut.commitGuess(turns=-1)
+
+        query, update = self.sut.db.sessions.find_one_and_update.call_args.args
+        self.assertEqual({"guild": guild, "channel": channel}, query)
+        self.assertEqual({"turns": -1}, update["$inc"])
+
+    def test_update_score_is_scoped_to_session(self):
+        user = Mock(id=user_id, display_name="Defsin")
+        self.sut.updateScoreForUser(user, 700)
+
+        self.sut.db.sessions.find_one.assert_not_called()
+        self.sut.db.sessions.update_one.assert_called_once()
+        query, update = self.sut.db.sessions.update_one.call_args.args
+        self.assertEqual({"guild": guild, "channel": channel}, query)
+
+
 if __name__ == "__main__":
     unittest.main()
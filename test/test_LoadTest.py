@@ -0,0 +1,66 @@
+import unittest
+
+from benchmarks.loadtest import generateCommands, parseArgs, percentile
+from benchmarks.memory_mongo import MemoryMongoClient
+from googlefeud.GoogleFeudDB import GoogleFeudDB, newSession
+
+
+class TestMemoryMongo(unittest.TestCase):
+    def setUp(self):
+        self.db = MemoryMongoClient()["gfeuddb"]
+        self.gfeuddb = GoogleFeudDB("guild", "channel", db=self.db)
+        suggestions = {"sneezing": {"solved": False, "score": 1000, "solvedBy": ""}}
+        self.gfeuddb.saveSession(newSession("guild", "channel", "why is my cat", suggestions))
+
+    def test_sessions(self):
+        session = self.gfeuddb.commitGuess("sneezing", "1", "player", 1000, -1)
+
+        self.assertTrue(session["suggestions"]["sneezing"]["solved"])
+        self.assertEqual({"1": {"display_name": "player", "score": 1000}}, session["scores"])
+        self.assertEqual(4, session["turns"])
+        self.assertIsNone(self.gfeuddb.commitGuess("sneezing", "2", "other", 1000))
+        self.assertEqual(1, self.gfeuddb.terminateSession().deleted_count)
+        self.assertIsNone(self.gfeuddb.getSession())
+        self.assertEqual(
+            {"update": 1, "findAndModify": 2, "delete": 1, "find": 1}, dict(self.db.ops)
+        )
+
+    def test_search_phrases_after(self):
+        self.db.searchphrases.insert_many([{"phrase": f"phrase {i}"} for i in range(3)])
+
+        first = list(self.gfeuddb.getGoogleSearchPhrasesAfter())
+        after = list(self.gfeuddb.getGoogleSearchPhrasesAfter(first[0]["_id"]))
+
+        self.assertEqual(["phrase 1", "phrase 2"], [record["phrase"] for record in after])
+        self.assertEqual(["_id", "phrase"], sorted(after[0]))
+
+    def test_leaderboard(self):
+        self.gfeuddb.updateLeaderboard("1")
+        self.gfeuddb.updateLeaderboard("1")
+        self.gfeuddb.updateLeaderboard("2")
+
+        wins = {record["user_id"]: record["wins"] for record in self.gfeuddb.getLeaderboard(["1"])}
+        self.assertEqual({"1": 2}, wins)
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_commands_follow_each_channels_script(self):
+        options = parseArgs(["--guilds", "2", "--channels", "1", "--rate", "50", "--guesses", "2"])
+
+        commands = list(generateCommands(options))
+
+        self.assertEqual(commands, list(generateCommands(options)))
+        for channel in [0, 1]:
+            script = [command for _, command, index, _ in commands if index == channel]
+            self.assertEqual(["start", "a", "a", "end"] * 3, script[:12])
+
+    def test_percentile(self):
+        latencies = list(range(1, 101))
+
+        self.assertEqual(50, percentile(latencies, 50))
+        self.assertEqual(99, percentile(latencies, 99))
+        self.assertIsNone(percentile([], 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from unittest.mock import MagicMock
+from pymongo.errors import OperationFailure
+from googlefeud.Migrations import (
+    INDEXES,
+    hasCollectionScan,
+    migrate,
+    verifyIndexes,
+)
+from googlefeud.SessionStore import SESSION_IDLE_TIMEOUT
+
+
+def database(existing_indexes, session_timeout=SESSION_IDLE_TIMEOUT):
+    """
+    Mock database where every collection already has the given index names
+    """
+    db = MagicMock()
+    db.__getitem__.return_value.index_information.return_value = {
+        name: {"expireAfterSeconds": session_timeout} if name == "last_modified_ttl" else {}
+        for name in existing_indexes
+    }
+    return db
+
+
+class TestMigrations(unittest.TestCase):
+    def test_migrate_creates_missing_indexes(self):
+        db = database(["_id_"])
+        created = migrate(db)
+
+        self.assertIn(("sessions", "guild_channel"), created)
+        self.assertIn(("contributions", "submitted_on"), created)
+        self.assertEqual(sum(len(indexes) for indexes in INDEXES.values()), len(created))
+
+    def test_migrate_is_idempotent(self):
+        db = database(
+            ["_id_", "guild_channel", "last_modified_ttl", "phrase", "submitted_on", "user_id"]
+        )
+
+        self.assertEqual([], migrate(db))
+        self.assertEqual([], verifyIndexes(db))
+        db.__getitem__.return_value.create_indexes.assert_not_called()
+        db.command.assert_not_called()
+
+    def test_migrate_updates_changed_session_timeout(self):
+        db = database(
+            ["_id_", "guild_channel", "last_modified_ttl", "phrase", "submitted_on", "user_id"],
+            session_timeout=60,
+        )
+
+        self.assertEqual([("sessions", "last_modified_ttl")], verifyIndexes(db))
+        self.assertEqual([("sessions", "last_modified_ttl")], migrate(db))
+        db.command.assert_called_once_with(
+            "collMod",
+            "sessions",
+            index={
+                "keyPattern": {"last_modified": 1},
+                "expireAfterSeconds": SESSION_IDLE_TIMEOUT,
+            },
+        )
+
+    def test_duplicated_keys_skip_the_unique_index(self):
+        db = database(["_id_"])
+        leaderboard = MagicMock()
+        leaderboard.index_information.return_value = {"_id_": {}}
+        leaderboard.create_indexes.side_effect = OperationFailure("E11000 duplicate key", code=11000)
+        leaderboard.aggregate.return_value = [{"_id": {"user_id": 7}, "ids": [1, 2, 3]}]
+        collections = {"leaderboard": leaderboard}
+        db.__getitem__.side_effect = lambda name: collections.get(name, db.__getitem__.return_value)
+
+        created = migrate(db)
+
+        self.assertNotIn(("leaderboard", "user_id"), created)
+        self.assertIn(("sessions", "guild_channel"), created)
+        leaderboard.delete_many.assert_not_called()
+
+        leaderboard.create_indexes.side_effect = None
+        leaderboard.delete_many.return_value.deleted_count = 2
+        self.assertIn(("leaderboard", "user_id"), migrate(db, dedupe=True))
+        leaderboard.delete_many.assert_called_once_with({"_id": {"$in": [2, 3]}})
+
+    def test_collection_scan_is_found_in_plan_tree(self):
+        index_plan = {
+            "stage": "LIMIT",
+            "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+        }
+        collection_scan_plan = {
+            "stage": "SORT",
+            "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]},
+        }
+
+        self.assertFalse(hasCollectionScan(index_plan))
+        self.assertTrue(hasCollectionScan(collection_scan_plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
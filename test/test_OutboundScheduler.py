@@ -0,0 +1,195 @@
+import asyncio
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from discord.errors import RateLimited
+from prometheus_client import CollectorRegistry
+from googlefeud.AppMetrics import AppMetrics
+from googlefeud.OutboundScheduler import (
+    CRITICAL,
+    INFO,
+    OutboundScheduler,
+    RateLimitBucket,
+    isScheduledCall,
+)
+
+
+class FakeDiscord:
+    """
+    Answers POST /channels/{channel}/messages, allowing rate messages per period in a channel
+    and answering the rest with a 429 like Discord does
+    """
+
+    def __init__(self, rate, period):
+        self.rate = rate
+        self.period = period
+        self.sent = {}
+        self.times = {}
+        self.rate_limited = 0
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/channels/{channel}/messages", self.createMessage)
+        return app
+
+    async def createMessage(self, request):
+        channel = request.match_info["channel"]
+        now = asyncio.get_running_loop().time()
+        times = [time for time in self.times.get(channel, []) if now - time < self.period]
+        if len(times) >= self.rate:
+            self.rate_limited += 1
+            retry_after = self.period - (now - times[0])
+            return web.json_response({"retry_after": retry_after, "global": False}, status=429)
+        times.append(now)
+        self.times[channel] = times
+        content = (await request.json())["content"]
+        self.sent.setdefault(channel, []).append(content)
+        return web.json_response({"id": len(self.sent[channel]), "content": content})
+
+
+class TestOutboundScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.discord = FakeDiscord(rate=2, period=0.2)
+        self.server = TestServer(self.discord.app())
+        await self.server.start_server()
+        self.session = aiohttp.ClientSession()
+        self.registry = CollectorRegistry()
+        self.sut = OutboundScheduler(
+            AppMetrics(registry=self.registry, legacy_user_labels=False),
+            routes={"send": (2, 0.2)},
+        )
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    def send(self, channel, content):
+        async def createMessage():
+            url = self.server.make_url(f"/channels/{channel}/messages")
+            async with self.session.post(url, json={"content": content}) as response:
+                data = await response.json()
+                if response.status == 429:
+                    raise RateLimited(data["retry_after"])
+                return data
+
+        return createMessage
+
+    async def test_burst_stays_within_rate_limit(self):
+        results = await asyncio.gather(
+            *[self.sut.submit("1", self.send("1", f"message {i}")) for i in range(6)]
+        )
+
+        self.assertEqual([f"message {i}" for i in range(6)], self.discord.sent["1"])
+        self.assertEqual(0, self.discord.rate_limited)
+        self.assertEqual("message 5", results[5]["content"])
+        self.assertEqual({}, self.sut.queues)
+
+    async def test_channels_have_their_own_buckets(self):
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(
+            *[self.sut.submit(channel, self.send(channel, "board")) for channel in "1234"]
+        )
+
+        # Sharing a bucket, the last two would wait for the period
+        self.assertLess(asyncio.get_running_loop().time() - start, self.discord.period)
+        self.assertEqual(4, len(self.discord.sent))
+
+    async def test_idle_buckets_are_swept(self):
+        await asyncio.gather(
+            *[self.sut.submit(channel, self.send(channel, "board")) for channel in range(100)]
+        )
+        await asyncio.sleep(self.discord.period)
+        await self.sut.submit("last", self.send("last", "board"))
+
+        self.assertEqual([("last", "send")], list(self.sut.buckets))
+
+    async def test_superseded_boards_are_merged(self):
+        first = asyncio.ensure_future(self.sut.submit("1", self.send("1", "board 1"), coalesce="board"))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.ensure_future(self.sut.submit("1", self.send("1", f"board {i}"), coalesce="board"))
+            for i in range(2, 5)
+        ]
+        results = await asyncio.gather(first, *queued)
+
+        self.assertEqual(["board 1", "board 4"], self.discord.sent["1"])
+        self.assertEqual({"board 4"}, {result["content"] for result in results[1:]})
+        self.assertEqual(2.0, self.registry.get_sample_value("gfeud_outbound_coalesced_total"))
+
+    async def test_board_doesnt_overtake_winners(self):
+        calls = [
+            ("board 1", "board"),
+            ("board 2", "board"),
+            ("winners", None),
+            ("next game", "board"),
+        ]
+        await asyncio.gather(
+            *[
+                self.sut.submit("1", self.send("1", content), CRITICAL, coalesce=coalesce)
+                for content, coalesce in calls
+            ]
+        )
+
+        self.assertEqual(["board 2", "winners", "next game"], self.discord.sent["1"])
+
+    async def test_critical_goes_before_info(self):
+        calls = [("stats", INFO), ("help", INFO), ("scoreboard", INFO), ("board", CRITICAL)]
+        await asyncio.gather(
+            *[
+                self.sut.submit("1", self.send("1", content), priority)
+                for content, priority in calls
+            ]
+        )
+
+        self.assertEqual(["board", "stats", "help", "scoreboard"], self.discord.sent["1"])
+        self.assertIsNotNone(
+            self.registry.get_sample_value("gfeud_outbound_wait_seconds_count", {"priority": "info"})
+        )
+        self.assertEqual(
+            0.0, self.registry.get_sample_value("gfeud_outbound_queue_depth", {"priority": "info"})
+        )
+
+    async def test_429_pauses_the_channel_and_retries(self):
+        # The scheduler thinks it can send more than Discord allows
+        self.sut.routes = {"send": (5, 0.2)}
+
+        await asyncio.gather(
+            *[self.sut.submit("1", self.send("1", f"message {i}")) for i in range(4)]
+        )
+
+        self.assertGreater(self.discord.rate_limited, 0)
+        self.assertEqual([f"message {i}" for i in range(4)], self.discord.sent["1"])
+
+    async def test_sends_made_by_a_call_go_out_directly(self):
+        async def call():
+            return isScheduledCall()
+
+        self.assertTrue(await self.sut.submit("1", call))
+        self.assertFalse(isScheduledCall())
+
+
+class TestRateLimitBucket(unittest.TestCase):
+    def test_bucket(self):
+        now = [0.0]
+        sut = RateLimitBucket(2, 1.0, clock=lambda: now[0])
+
+        sut.take()
+        now[0] = 0.25
+        sut.take()
+        self.assertEqual(0.75, sut.delay())
+        # The second call finished at 1.0, so it counts until 2.0
+        now[0] = 1.0
+        sut.finished()
+        self.assertEqual(0.0, sut.delay())
+        sut.take()
+        self.assertEqual(1.0, sut.delay())
+        now[0] = 2.0
+        self.assertTrue(sut.isIdle())
+        sut.pause(3)
+        self.assertEqual(3.0, sut.delay())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import unittest
+
+from bson import ObjectId
+from unittest.mock import AsyncMock
+from googlefeud.PhraseDeck import PhraseBank
+
+phrases = [f"why is my cat {i}" for i in range(50)]
+
+
+def phraseBank(phrases):
+    bank = PhraseBank(random.Random(7))
+    for phrase in phrases:
+        bank.add(phrase)
+    return bank
+
+
+class TestPhraseDeck(unittest.TestCase):
+    def test_no_repeats_until_the_bank_is_exhausted(self):
+        deck = phraseBank(phrases).deck(("guild", "channel"))
+
+        first_pass = [deck.draw() for _ in phrases]
+        second_pass = [deck.draw() for _ in phrases]
+
+        self.assertEqual(sorted(phrases), sorted(first_pass))
+        self.assertEqual(sorted(phrases), sorted(second_pass))
+        self.assertNotEqual(phrases, first_pass)
+
+    def test_least_recently_used_decks_are_dropped(self):
+        bank = PhraseBank(random.Random(7), max_decks=2)
+        first = bank.deck(("guild", "first"))
+        bank.deck(("guild", "second"))
+        bank.deck(("guild", "first"))
+        bank.deck(("guild", "third"))
+
+        self.assertEqual([("guild", "first"), ("guild", "third")], list(bank.decks))
+        self.assertIs(first, bank.deck(("guild", "first")))
+        bank.dropDeck(("guild", "first"))
+        self.assertNotIn(("guild", "first"), bank.decks)
+
+    def test_channels_have_their_own_decks(self):
+        bank = phraseBank(phrases)
+        deck = bank.deck(("guild", "channel"))
+        other_deck = bank.deck(("guild", "other channel"))
+
+        deck.draw()
+
+        self.assertIs(deck, bank.deck(("guild", "channel")))
+        self.assertEqual(len(phrases), other_deck.remaining())
+
+    def test_added_phrases_join_the_current_pass(self):
+        bank = phraseBank(phrases[:10])
+        deck = bank.deck(("guild", "channel"))
+        drawn = [deck.draw() for _ in range(5)]
+
+        bank.add(phrases[10])
+        self.assertFalse(bank.add(phrases[10]))
+        drawn += [deck.draw() for _ in range(6)]
+
+        self.assertEqual(sorted(phrases[:11]), sorted(drawn))
+
+    def test_mark_drawn(self):
+        deck = phraseBank(phrases[:3]).deck(("guild", "channel"))
+
+        self.assertTrue(deck.markDrawn(phrases[1]))
+        self.assertFalse(deck.markDrawn(phrases[1]))
+        self.assertTrue(deck.markDrawn("a phrase nobody added"))
+        self.assertEqual(sorted([phrases[0], phrases[2]]), sorted([deck.draw(), deck.draw()]))
+
+    def test_empty_bank(self):
+        self.assertIsNone(PhraseBank().deck(("guild", "channel")).draw())
+
+
+class TestPhraseBank(unittest.IsolatedAsyncioTestCase):
+    async def test_refresh_loads_only_new_phrases(self):
+        ids = [ObjectId() for _ in range(3)]
+        gfeuddb = AsyncMock()
+        gfeuddb.getGoogleSearchPhrasesAfter.side_effect = [
+            [{"_id": ids[0], "phrase": phrases[0]}, {"_id": ids[1], "phrase": phrases[1]}],
+            [{"_id": ids[2], "phrase": phrases[2]}],
+        ]
+        sut = PhraseBank()
+
+        self.assertEqual(2, await sut.refresh(gfeuddb))
+        self.assertEqual(1, await sut.refresh(gfeuddb))
+
+        self.assertEqual(phrases[:3], sut.phrases)
+        gfeuddb.getGoogleSearchPhrasesAfter.assert_awaited_with(ids[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import asyncio
+import unittest
+
+from unittest.mock import MagicMock, Mock
+from pymongo.errors import AutoReconnect
+from googlefeud.AsyncGoogleFeudDB import AsyncGoogleFeudDB
+from googlefeud.GoogleFeudDB import newSession
+from googlefeud.SessionStore import SessionStore
+
+guild = "My Rad Server"
+channel = "My Even Radder Channel"
+
+
+class FakeSessions:
+    """
+    Stands in for the sessions collection and counts the round trips made to it
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.reads = 0
+        self.writes = 0
+
+    def handle(self, guild, channel):
+        sessions = self
+        gfeuddb = Mock(guild=guild, channel=channel)
+
+        async def getSession():
+            sessions.reads += 1
+            await asyncio.sleep(0)
+            return sessions.documents.get((guild, channel))
+
+        async def saveSession(session):
+            sessions.writes += 1
+            sessions.documents[(guild, channel)] = session
+
+        async def terminateSession():
+            sessions.writes += 1
+            existed = sessions.documents.pop((guild, channel), None) is not None
+            return Mock(deleted_count=1 if existed else 0)
+
+        gfeuddb.getSession = getSession
+        gfeuddb.saveSession = saveSession
+        gfeuddb.terminateSession = terminateSession
+        return gfeuddb
+
+
+class TestSessionStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.sessions = FakeSessions()
+        self.gfeuddb = self.sessions.handle(guild, channel)
+        self.sut = SessionStore(flush_delay=0.05)
+
+    async def test_reads_are_served_from_memory(self):
+        self.sessions.documents[(guild, channel)] = newSession(guild, channel, "why is my cat")
+
+        for _ in range(10):
+            session = await self.sut.get(self.gfeuddb)
+
+        self.assertEqual("why is my cat", session["phrase"])
+        self.assertEqual(1, self.sessions.reads)
+
+    async def test_missing_session_is_remembered(self):
+        self.assertIsNone(await self.sut.get(self.gfeuddb))
+        self.assertIsNone(await self.sut.get(self.gfeuddb))
+        self.assertEqual(1, self.sessions.reads)
+
+    async def test_concurrent_reads_load_once(self):
+        await asyncio.gather(*[self.sut.get(self.gfeuddb) for _ in range(10)])
+        self.assertEqual(1, self.sessions.reads)
+
+    async def test_changes_are_written_behind(self):
+        session = newSession(guild, channel, "why is my cat")
+        self.sut.put(self.gfeuddb, session)
+        for turns in [4, 3, 2]:
+            session["turns"] = turns
+            await self.sut.commit(self.gfeuddb)
+
+        self.assertEqual(0, self.sessions.writes)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(1, self.sessions.writes)
+        self.assertEqual(2, self.sessions.documents[(guild, channel)]["turns"])
+
+    async def test_commit_during_flush_is_written(self):
+        other = self.sessions.handle(guild, "Another Channel")
+        save = self.gfeuddb.saveSession
+
+        async def slowSave(session):
+            await asyncio.sleep(0.05)
+            await save(session)
+
+        self.gfeuddb.saveSession = slowSave
+        self.sut.put(self.gfeuddb, newSession(guild, channel, "why is my cat"))
+        await self.sut.commit(self.gfeuddb)
+        await asyncio.sleep(0.07)
+
+        self.sut.put(other, newSession(guild, "Another Channel", "why is my dog"))
+        await self.sut.commit(other)
+        await asyncio.sleep(0.15)
+
+        self.assertEqual({}, self.sut.dirty)
+        self.assertIn((guild, "Another Channel"), self.sessions.documents)
+
+    async def test_failed_save_is_retried(self):
+        db = MagicMock()
+        db.sessions.replace_one.side_effect = [AutoReconnect("Mongo is down"), Mock()]
+        gfeuddb = AsyncGoogleFeudDB(guild, channel, db=db)
+        self.sut.put(gfeuddb, newSession(guild, channel, "why is my cat"))
+        await self.sut.commit(gfeuddb)
+        await asyncio.sleep(0.15)
+
+        self.assertEqual({}, self.sut.dirty)
+        self.assertEqual(2, db.sessions.replace_one.call_count)
+
+    async def test_restart_rebuilds_from_mongo(self):
+        self.sut.put(self.gfeuddb, newSession(guild, channel, "why is my cat"))
+        await self.sut.commit(self.gfeuddb)
+        await self.sut.close()
+
+        restarted = SessionStore()
+        session = await restarted.get(self.sessions.handle(guild, channel))
+        self.assertEqual("why is my cat", session["phrase"])
+
+    async def test_deleted_session_is_not_flushed(self):
+        self.sut.put(self.gfeuddb, newSession(guild, channel, "why is my cat"))
+        await self.sut.commit(self.gfeuddb)
+
+        self.assertTrue(await self.sut.delete(self.gfeuddb))
+        await asyncio.sleep(0.1)
+
+        self.assertNotIn((guild, channel), self.sessions.documents)
+        self.assertIsNone(await self.sut.get(self.gfeuddb))
+        self.assertFalse(await self.sut.delete(self.gfeuddb))
+
+    async def test_idle_games_are_reaped(self):
+        now = 0
+        sut = SessionStore(flush_delay=0, idle_timeout=60, clock=lambda: now)
+        other = self.sessions.handle(guild, "Another Channel")
+        sut.put(self.gfeuddb, newSession(guild, channel, "why is my cat"))
+        await sut.commit(self.gfeuddb)
+        sut.put(other, newSession(guild, "Another Channel", "why is my dog"))
+        await sut.commit(other)
+
+        now = 30
+        await sut.get(other)
+        now = 61
+
+        self.assertEqual(1, await sut.reap())
+        self.assertNotIn((guild, channel), self.sessions.documents)
+        self.assertNotIn((guild, channel), sut.sessions)
+        self.assertIn((guild, "Another Channel"), self.sessions.documents)
+        self.assertEqual("why is my dog", (await sut.get(other))["phrase"])
+
+    async def test_channels_without_games_are_forgotten(self):
+        now = 0
+        sut = SessionStore(idle_timeout=60, clock=lambda: now)
+        sut.on_reap = Mock()
+        await sut.get(self.gfeuddb)
+
+        now = 60
+        self.assertEqual(0, await sut.reap())
+        self.assertEqual({}, sut.sessions)
+        self.assertEqual({}, sut.handles)
+        sut.on_reap.assert_called_once_with((guild, channel))
+
+    async def test_reaped_channels_drop_their_locks(self):
+        now = 0
+        sut = SessionStore(flush_delay=0, idle_timeout=60, clock=lambda: now)
+        sut.put(self.gfeuddb, newSession(guild, channel, "why is my cat"))
+        await sut.commit(self.gfeuddb)
+        self.assertIn((guild, channel), sut._locks)
+
+        now = 60
+        self.assertEqual(1, await sut.reap())
+        self.assertEqual({}, sut._locks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from unittest.mock import Mock
+from prometheus_client import CollectorRegistry
+from googlefeud.AppMetrics import AppMetrics
+from googlefeud.Sharding import ShardMonitor, guildsPerShard, shardConfig
+
+
+def guilds(*shard_ids):
+    return [Mock(shard_id=shard_id) for shard_id in shard_ids]
+
+
+class TestShardConfig(unittest.TestCase):
+    def test_nothing_set_lets_discord_decide(self):
+        self.assertEqual({}, shardConfig("", ""))
+
+    def test_shard_count_only_connects_every_shard(self):
+        self.assertEqual({"shard_count": 4}, shardConfig("4", ""))
+
+    def test_shard_ids(self):
+        self.assertEqual(
+            {"shard_count": 8, "shard_ids": [2, 3, 5]}, shardConfig("8", "5, 2,3,3")
+        )
+
+    def test_shard_ids_need_shard_count(self):
+        with self.assertRaises(ValueError):
+            shardConfig("", "0,1")
+
+    def test_shard_ids_outside_of_shard_count(self):
+        with self.assertRaises(ValueError):
+            shardConfig("4", "3,4")
+
+
+class TestShardMonitor(unittest.TestCase):
+    def test_guilds_per_shard(self):
+        self.assertEqual({0: 2, 1: 1}, guildsPerShard(guilds(0, 1, 0)))
+
+    def test_report(self):
+        registry = CollectorRegistry()
+        bot = Mock(guilds=guilds(0, 1, 1), latencies=[(0, 0.05), (1, 0.1), (2, float("inf"))])
+        sut = ShardMonitor(bot, AppMetrics(registry=registry, legacy_user_labels=False))
+
+        sut.report()
+
+        self.assertEqual(0.1, registry.get_sample_value("gfeud_shard_latency_seconds", {"shard": "1"}))
+        self.assertIsNone(registry.get_sample_value("gfeud_shard_latency_seconds", {"shard": "2"}))
+        self.assertEqual(2.0, registry.get_sample_value("gfeud_shard_guilds", {"shard": "1"}))
+        self.assertEqual(0.0, registry.get_sample_value("gfeud_shard_guilds", {"shard": "2"}))
+        self.assertEqual(3.0, registry.get_sample_value("gfeud_active_servers"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from googlefeud.SuggestionCache import FileSuggestionStore, SuggestionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSuggestionCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sut = SuggestionCache(max_size=2, ttl=60, clock=self.clock)
+
+    async def test_hit_and_miss(self):
+        self.assertIsNone(await self.sut.get("why is my cat"))
+        await self.sut.set("why is my cat", ["sneezing", "drooling"])
+
+        self.assertEqual(["sneezing", "drooling"], await self.sut.get("why is my cat"))
+        self.assertEqual(1, self.sut.hits)
+        self.assertEqual(1, self.sut.misses)
+
+    async def test_phrase_is_normalized(self):
+        await self.sut.set("Why is  my cat ", ["sneezing"])
+
+        self.assertEqual(["sneezing"], await self.sut.get("why is my cat"))
+
+    async def test_least_recently_used_is_evicted(self):
+        await self.sut.set("phrase 1", ["a1"])
+        await self.sut.set("phrase 2", ["a2"])
+        await self.sut.get("phrase 1")
+        await self.sut.set("phrase 3", ["a3"])
+
+        self.assertIsNone(await self.sut.get("phrase 2"))
+        self.assertEqual(["a1"], await self.sut.get("phrase 1"))
+        self.assertEqual(1, self.sut.evictions)
+
+    async def test_entries_expire(self):
+        await self.sut.set("why is my cat", ["sneezing"])
+        self.clock.now += 61
+
+        self.assertIsNone(await self.sut.get("why is my cat"))
+        self.assertEqual(1, self.sut.expirations)
+
+    async def test_file_store_survives_restart(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.jsonl")
+        cache = SuggestionCache(store=FileSuggestionStore(path), clock=self.clock)
+        await cache.set("why is my cat", ["sneezing"])
+
+        restarted = SuggestionCache(store=FileSuggestionStore(path), clock=self.clock)
+        self.assertEqual(["sneezing"], await restarted.get("why is my cat"))
+        self.assertEqual(1, restarted.stats()["size"])
+
+        self.clock.now += restarted.ttl
+        expired = SuggestionCache(store=FileSuggestionStore(path), clock=self.clock)
+        self.assertIsNone(await expired.get("why is my cat"))
+
+    def test_file_store_is_bounded_and_compacted(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.jsonl")
+        store = FileSuggestionStore(path, max_entries=3)
+        for i in range(10):
+            store.set(f"phrase {i % 4}", [f"a{i}"], 100)
+
+        self.assertLessEqual(store.lines, 6)
+        restarted = FileSuggestionStore(path, max_entries=3)
+        with open(path) as file:
+            self.assertEqual(3, len(file.readlines()))
+        self.assertEqual(["phrase 3", "phrase 0", "phrase 1"], list(restarted.entries))
+        self.assertEqual((["a9"], 100), restarted.get("phrase 1"))
+        self.assertIsNone(restarted.get("phrase 2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import unittest
+from collections import deque
+
+from aiohttp import ClientResponseError, web
+from time import monotonic
+from googlefeud.CircuitBreaker import CircuitOpenError
+from googlefeud.SuggestionClient import SuggestionClient
+
+cat_suggestions = [
+    "why is my cat sneezing",
+    "why is my cat throwing up",
+    "why is my cat drooling",
+]
+
+
+class SuggestServer:
+    """
+    Local stand-in for suggestqueries.google.com.
+    Requests take the faults queued in faults in turn: slow answers after slow_delay seconds, error
+    answers with a 503, throttle with a 429 and page with an HTML error page.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.slow_delay = 1
+        self.faults = deque()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request):
+        self.requests.append(dict(request.query))
+        fault = self.faults.popleft() if self.faults else None
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.slow_delay if fault == "slow" else self.delay)
+            if fault == "error":
+                return web.Response(status=503, text="Service Unavailable")
+            if fault == "throttle":
+                return web.Response(status=429, text="Too Many Requests")
+            if fault == "page":
+                return web.Response(text="<html>We're sorry...</html>", content_type="text/html")
+            return web.Response(
+                text=json.dumps([request.query["q"], cat_suggestions]),
+                content_type="text/javascript",
+            )
+        finally:
+            self.in_flight -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/complete/search", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/complete/search"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSuggestionClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = SuggestServer()
+        self.url = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def test_fetch(self):
+        sut = SuggestionClient(url=self.url)
+        lower_phrase, suggestions = await sut.fetch("Why is my cat")
+        await sut.close()
+
+        self.assertEqual("why is my cat", lower_phrase)
+        self.assertEqual(["Why is my cat ", cat_suggestions], suggestions)
+        self.assertEqual("firefox", self.server.requests[0]["output"])
+
+    async def test_concurrency_is_bounded(self):
+        self.server.delay = 0.05
+        sut = SuggestionClient(url=self.url, max_concurrency=3)
+        await asyncio.gather(*[sut.fetch(f"phrase {i}") for i in range(12)])
+        await sut.close()
+
+        self.assertEqual(12, len(self.server.requests))
+        self.assertEqual(3, self.server.max_in_flight)
+
+    async def test_timeout(self):
+        self.server.delay = 1
+        sut = SuggestionClient(url=self.url, timeout=0.1)
+        start = monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            await sut.fetch("why is my cat")
+        await sut.close()
+
+        self.assertLess(monotonic() - start, 0.5)
+
+    async def test_retries_share_the_deadline(self):
+        self.server.faults.extend(["error", "error", "error"])
+        sut = SuggestionClient(url=self.url, timeout=0.2, retries=3, retry_backoff=0.5, hedge_delay=0)
+        start = monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            await sut.fetch("why is my cat")
+        await sut.close()
+
+        self.assertLess(monotonic() - start, 0.4)
+
+    async def test_slow_phrase_does_not_delay_others(self):
+        sut = SuggestionClient(url=self.url, max_concurrency=2)
+        self.server.delay = 0.3
+        slow = asyncio.create_task(sut.fetch("slow phrase"))
+        await asyncio.sleep(0.01)
+        self.server.delay = 0
+        start = monotonic()
+        await sut.fetch("fast phrase")
+        elapsed = monotonic() - start
+        await slow
+        await sut.close()
+
+        self.assertLess(elapsed, 0.2)
+
+    async def test_failed_request_is_retried(self):
+        self.server.faults.extend(["error", "page"])
+        sut = SuggestionClient(url=self.url, retries=2, retry_backoff=0.01, hedge_delay=0)
+        _, suggestions = await sut.fetch("why is my cat")
+        await sut.close()
+
+        self.assertEqual(cat_suggestions, suggestions[1])
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(2, sut.retried)
+
+    async def test_error_page_is_an_error(self):
+        self.server.faults.append("page")
+        sut = SuggestionClient(url=self.url, retries=0)
+        with self.assertRaises(ValueError):
+            await sut.fetch("why is my cat")
+        await sut.close()
+
+    async def test_throttled_request_is_not_retried(self):
+        self.server.faults.append("throttle")
+        sut = SuggestionClient(url=self.url, retries=2, retry_backoff=0.01)
+        with self.assertRaises(ClientResponseError):
+            await sut.fetch("why is my cat")
+        await sut.close()
+
+        self.assertEqual(1, len(self.server.requests))
+
+    async def test_slow_request_is_hedged(self):
+        self.server.faults.append("slow")
+        sut = SuggestionClient(url=self.url, hedge_delay=0.05)
+        start = monotonic()
+        _, suggestions = await sut.fetch("why is my cat")
+        elapsed = monotonic() - start
+        await sut.close()
+
+        self.assertEqual(cat_suggestions, suggestions[1])
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(2, len(self.server.requests))
+        self.assertEqual(1, sut.hedged)
+
+    async def test_breaker_opens_after_repeated_failures(self):
+        self.server.faults.extend(["error", "error"])
+        clock = FakeClock()
+        sut = SuggestionClient(
+            url=self.url, retries=0, breaker_failures=2, breaker_reset=30, clock=clock
+        )
+        for _ in range(2):
+            with self.assertRaises(ClientResponseError):
+                await sut.fetch("why is my cat")
+        start = monotonic()
+        with self.assertRaises(CircuitOpenError):
+            await sut.fetch("why is my cat")
+
+        self.assertLess(monotonic() - start, 0.05)
+        self.assertEqual(2, len(self.server.requests))
+        clock.now += 30
+        await sut.fetch("why is my cat")
+        await sut.close()
+        self.assertEqual("closed", sut.breaker.state)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from googlefeud.SuggestionCache import SuggestionCache
+from googlefeud.SuggestionProvider import (
+    CacheProvider,
+    ChainProvider,
+    FakeProvider,
+    HttpProvider,
+    SnapshotProvider,
+    buildSuggestionProvider,
+)
+from googlefeud.SuggestionSnapshot import SuggestionSnapshot, writeSnapshot
+
+
+class CountingFetch:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, phrase):
+        self.calls += 1
+        if self.fail:
+            raise TimeoutError("suggestqueries timed out")
+        lower_phrase = phrase.lower()
+        return (lower_phrase, [lower_phrase, [f"{lower_phrase} sneezing", f"{lower_phrase} drooling"]])
+
+
+class TestSuggestionProvider(unittest.IsolatedAsyncioTestCase):
+    async def test_live_answers_are_cached(self):
+        fetch = CountingFetch()
+        http = HttpProvider(fetch)
+        sut = ChainProvider([CacheProvider(SuggestionCache()), http])
+
+        self.assertEqual(["sneezing", "drooling"], await sut.suggest("Why is my cat"))
+        self.assertEqual(["sneezing", "drooling"], await sut.suggest("why is my cat"))
+
+        self.assertEqual(1, fetch.calls)
+        self.assertEqual(
+            {"cache": (1, 1, 0), "http": (1, 0, 0)},
+            {
+                name: (stats["hits"], stats["misses"], stats["errors"])
+                for name, stats in sut.stats().items()
+            },
+        )
+
+    async def test_failed_provider_is_skipped(self):
+        appMetrics = Mock()
+        sut = ChainProvider(
+            [HttpProvider(CountingFetch(fail=True), appMetrics), FakeProvider(appMetrics=appMetrics)]
+        )
+
+        self.assertEqual(8, len(await sut.suggest("why is my cat")))
+        outcomes = [call.args[:2] for call in appMetrics.recordSuggestionProvider.call_args_list]
+        self.assertEqual([("http", "error"), ("fake", "hit")], outcomes)
+
+        with self.assertRaises(TimeoutError):
+            await ChainProvider([HttpProvider(CountingFetch(fail=True))]).suggest("why is my cat")
+
+    async def test_expired_suggestions_are_served_when_google_fails(self):
+        cache = SuggestionCache(ttl=0)
+        await cache.set("why is my cat", ["purring"])
+        sut = ChainProvider([CacheProvider(cache), HttpProvider(CountingFetch(fail=True))])
+
+        self.assertEqual(["purring"], await sut.suggest("why is my cat"))
+        self.assertEqual(1, cache.stale_hits)
+        with self.assertRaises(TimeoutError):
+            await sut.suggest("how to dance")
+
+    async def test_nobody_has_the_phrase(self):
+        sut = ChainProvider([CacheProvider(SuggestionCache())])
+
+        self.assertEqual([], await sut.suggest("why is my cat"))
+
+    async def test_snapshot_answers_are_refreshed(self):
+        path = os.path.join(tempfile.mkdtemp(), "suggestions.snap")
+        writeSnapshot(path, [("why is my cat", ["purring"])])
+        snapshot = SuggestionSnapshot(path)
+        self.addCleanup(snapshot.close)
+        fetch = CountingFetch()
+        sut = ChainProvider(
+            [CacheProvider(SuggestionCache()), SnapshotProvider(snapshot), HttpProvider(fetch)]
+        )
+        sut.refresher = Mock()
+
+        self.assertEqual(["purring"], await sut.suggest("Why is my  cat"))
+        sut.refresher.schedule.assert_called_once_with("Why is my  cat")
+        self.assertEqual(0, fetch.calls)
+
+        self.assertEqual(["sneezing", "drooling"], await sut.refresh("why is my cat"))
+        self.assertEqual(["sneezing", "drooling"], await sut.suggest("why is my cat"))
+        self.assertEqual(1, fetch.calls)
+
+    async def test_fake_provider_is_deterministic(self):
+        sut = FakeProvider(count=5)
+
+        suggestions = await sut.suggest("why is my cat")
+
+        self.assertEqual(5, len(set(suggestions)))
+        self.assertEqual(suggestions, await FakeProvider(count=5).suggest("Why is my cat "))
+
+    def test_build_from_names(self):
+        sut = buildSuggestionProvider(["cache", " fake", "snapshot"])
+
+        # No snapshot is configured, so it's left out
+        self.assertEqual(["cache", "fake"], [provider.name for provider in sut.providers])
+        with self.assertRaises(ValueError):
+            buildSuggestionProvider(["cache", "carrier pigeon"])
+
+
+if __name__ == "__main__":
+    unittest.main()
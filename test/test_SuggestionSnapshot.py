@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock
+
+from googlefeud.SnapshotBuilder import buildSnapshot
+from googlefeud.SuggestionSnapshot import SnapshotRefresher, SuggestionSnapshot, writeSnapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSuggestionSnapshot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "suggestions.snap")
+
+    def open(self, entries):
+        writeSnapshot(self.path, entries)
+        snapshot = SuggestionSnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_lookup(self):
+        entries = [(f"phrase {i}", [f"a{i}", f"b{i}"]) for i in range(100)]
+        entries.append(("pourquoi mon chat", ["éternue", "ronronne"]))
+        snapshot = self.open(entries)
+
+        self.assertEqual(101, len(snapshot))
+        for key, suggestions in entries:
+            self.assertEqual(suggestions, snapshot.get(key))
+        self.assertIsNone(snapshot.get("phrase 100"))
+        self.assertNotIn("why is my cat", snapshot)
+
+    def test_empty_snapshot(self):
+        snapshot = self.open([])
+
+        self.assertEqual(0, len(snapshot))
+        self.assertIsNone(snapshot.get("why is my cat"))
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a snapshot at all")
+
+        with self.assertRaises(ValueError):
+            SuggestionSnapshot(self.path)
+
+    async def test_refresher_skips_recently_scheduled_phrases(self):
+        clock = FakeClock()
+        refresh = AsyncMock()
+        refresher = SnapshotRefresher(refresh, delay=0, interval=60, max_pending=2, clock=clock)
+
+        for phrase in ["why is my cat", "why is my cat", "how to dance", "is it cold"]:
+            refresher.schedule(phrase)
+        self.assertEqual(["why is my cat", "how to dance"], list(refresher.pending))
+
+        refresher.start()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await refresher.stop()
+        self.assertEqual(2, refresher.refreshed)
+        refresh.assert_awaited_with("how to dance")
+
+        refresher.schedule("why is my cat")
+        self.assertEqual(0, len(refresher.pending))
+        clock.now += 61
+        refresher.schedule("why is my cat")
+        self.assertEqual(["why is my cat"], list(refresher.pending))
+
+    async def test_build_snapshot(self):
+        gfeuddb = AsyncMock()
+        gfeuddb.getGoogleSearchPhrasesWithSuggestions.return_value = [
+            {"_id": 1, "phrase": "Why is my cat", "suggestions": ["sneezing", "drooling"]},
+            {"_id": 2, "phrase": "how to dance"},
+            {"_id": 3, "phrase": "is it cold"},
+            {"_id": 4, "phrase": "why is  my cat"},
+        ]
+        payloads = {
+            "how to dance": ["how to dance", ["how to dance salsa", "how to dance salsa fast"]],
+            "is it cold": ["is it cold", ["why is it cold"]],
+        }
+
+        async def fetch(phrase):
+            return (phrase, payloads[phrase])
+
+        report = await buildSnapshot(self.path, gfeuddb, fetch, concurrency=2)
+
+        snapshot = SuggestionSnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        self.assertEqual(["sneezing", "drooling"], snapshot.get("why is my cat"))
+        self.assertEqual(["salsa"], snapshot.get("how to dance"))
+        self.assertIsNone(snapshot.get("is it cold"))
+        self.assertEqual(
+            (3, 1, 2, 1, 2),
+            (report.phrases, report.stored, report.fetched, report.empty, report.written),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
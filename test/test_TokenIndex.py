@@ -0,0 +1,57 @@
+import unittest
+
+from googlefeud.TokenIndex import buildTokenIndex, foldPlural, matchGuess
+
+suggestions = [
+    "sneezing",
+    "throwing up",
+    "meowing so much",
+    "peeing everywhere",
+    "peeing on my bed",
+    "licking me",
+]
+ignored = frozenset(["so", "my", "me"])
+
+
+class TestTokenIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = buildTokenIndex(suggestions, ignored, fold_plurals=False)
+
+    def test_single_word_guess(self):
+        self.assertEqual(["sneezing"], matchGuess(self.index, "sneezing", ignored))
+        self.assertEqual(
+            ["peeing everywhere", "peeing on my bed"], matchGuess(self.index, "peeing", ignored)
+        )
+        self.assertEqual([], matchGuess(self.index, "spaghetti", ignored))
+
+    def test_guess_is_normalized(self):
+        self.assertEqual(["sneezing"], matchGuess(self.index, "  Sneezing?!", ignored))
+
+    def test_multi_word_guess(self):
+        self.assertEqual(["peeing on my bed"], matchGuess(self.index, "peeing on bed", ignored))
+        self.assertEqual(["throwing up"], matchGuess(self.index, "Throwing Up", ignored))
+        self.assertEqual([], matchGuess(self.index, "throwing bed", ignored))
+
+    def test_ignored_words_never_match(self):
+        self.assertNotIn("so", self.index["tokens"])
+        self.assertEqual([], matchGuess(self.index, "so", ignored))
+        self.assertEqual([], matchGuess(self.index, "my so", ignored))
+        self.assertEqual(["licking me"], matchGuess(self.index, "licking me", ignored))
+
+    def test_plural_folding(self):
+        index = buildTokenIndex(["cats", "watches tv", "puppies", "glass"], fold_plurals=True)
+
+        self.assertEqual(["cats"], matchGuess(index, "cat"))
+        self.assertEqual(["watches tv"], matchGuess(index, "watch"))
+        self.assertEqual(["puppies"], matchGuess(index, "puppy"))
+        self.assertEqual(["glass"], matchGuess(index, "glass"))
+        self.assertEqual([], matchGuess(self.index, "sneezings", ignored))
+
+    def test_fold_plural(self):
+        self.assertEqual("bus", foldPlural("bus"))
+        self.assertEqual("box", foldPlural("boxes"))
+        self.assertEqual("dog", foldPlural("dogs"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from unittest.mock import Mock
+from googlefeud.Tracing import Tracer, detachTrace
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+def readTraceFile(path):
+    with open(path, encoding="utf-8") as file:
+        # The closing bracket is optional in the Chrome trace array format
+        return json.loads(file.read().rstrip().rstrip(",") + "]")
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.sut = Tracer(appMetrics=Mock(), trace_file="", clock=Clock())
+
+    async def test_stages_are_recorded_per_command(self):
+        trace = self.sut.startTrace("a")
+        with self.sut.span("load_session"):
+            with self.sut.span("mongo.getSession"):
+                await asyncio.sleep(0)
+        with self.sut.span("match"):
+            pass
+        self.sut.endTrace(trace)
+
+        self.assertEqual(
+            [("a", "mongo.getSession", 1.0), ("a", "load_session", 3.0), ("a", "match", 1.0)],
+            [call.args for call in self.sut.appMetrics.recordStage.call_args_list],
+        )
+
+    async def test_spans_outside_a_command_do_nothing(self):
+        with self.sut.span("mongo.saveSession") as span:
+            self.assertIsNone(span)
+        self.sut.appMetrics.recordStage.assert_not_called()
+
+    async def test_background_tasks_can_detach(self):
+        async def flush():
+            detachTrace()
+            with self.sut.span("mongo.saveSession"):
+                pass
+
+        trace = self.sut.startTrace("a")
+        task = asyncio.create_task(flush())
+        self.sut.endTrace(trace)
+        await task
+
+        self.sut.appMetrics.recordStage.assert_not_called()
+
+    async def test_commands_in_concurrent_tasks_have_their_own_traces(self):
+        async def command(name):
+            trace = self.sut.startTrace(name)
+            await asyncio.sleep(0)
+            with self.sut.span("match"):
+                await asyncio.sleep(0)
+            self.sut.endTrace(trace)
+
+        await asyncio.gather(command("a"), command("start"))
+
+        self.assertEqual(
+            ["a", "start"],
+            sorted(call.args[0] for call in self.sut.appMetrics.recordStage.call_args_list),
+        )
+
+    def test_trace_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            sut = Tracer(trace_file=path, clock=Clock())
+            for _ in range(2):
+                trace = sut.startTrace("a")
+                with sut.span("match"):
+                    pass
+                sut.endTrace(trace)
+                sut.flush()
+
+            events = readTraceFile(path)
+
+        self.assertEqual(["match", "a", "match", "a"], [event["name"] for event in events])
+        self.assertTrue(all(event["ph"] == "X" for event in events))
+        match, command = events[0], events[1]
+        self.assertEqual(command["args"]["span_id"], match["args"]["parent_id"])
+        self.assertEqual(command["tid"], match["tid"])
+        self.assertEqual(1e6, match["dur"])
+
+
+if __name__ == "__main__":
+    unittest.main()